@@ -0,0 +1,253 @@
+import json
+import os
+import sqlite3
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+from duel_log import chronological, match_timestamp
+
+DB_FILENAME = "analytics.db"
+
+SCHEMA = """
+CREATE TABLE matches (
+    grupo TEXT NOT NULL,
+    match_id TEXT NOT NULL,
+    date TEXT,
+    time TEXT,
+    ts TEXT,
+    venue TEXT,
+    status TEXT,
+    home_team TEXT,
+    away_team TEXT,
+    score_home INTEGER,
+    score_away INTEGER,
+    home_side_code TEXT,
+    away_side_code TEXT,
+    PRIMARY KEY (grupo, match_id)
+);
+CREATE TABLE games (
+    grupo TEXT NOT NULL,
+    match_id TEXT NOT NULL,
+    game_index INTEGER NOT NULL,
+    seq INTEGER NOT NULL,
+    ts TEXT,
+    home_code TEXT,
+    away_code TEXT,
+    home_player TEXT,
+    away_player TEXT,
+    home_team TEXT,
+    away_team TEXT,
+    home_score INTEGER,
+    away_score INTEGER,
+    home_sets TEXT,
+    away_sets TEXT,
+    PRIMARY KEY (grupo, match_id, game_index)
+);
+CREATE TABLE players (
+    grupo TEXT NOT NULL,
+    player TEXT NOT NULL,
+    club TEXT,
+    first_ts TEXT,
+    last_ts TEXT,
+    PRIMARY KEY (grupo, player)
+);
+CREATE TABLE teams (
+    grupo TEXT NOT NULL,
+    team TEXT NOT NULL,
+    position INTEGER,
+    matches INTEGER,
+    wins INTEGER,
+    losses INTEGER,
+    points_for INTEGER,
+    points_against INTEGER,
+    points_diff INTEGER,
+    points INTEGER,
+    PRIMARY KEY (grupo, team)
+);
+CREATE TABLE ratings (
+    grupo TEXT NOT NULL,
+    player TEXT NOT NULL,
+    rank INTEGER,
+    elo INTEGER,
+    club TEXT,
+    matches INTEGER,
+    wins INTEGER,
+    win_rate REAL,
+    PRIMARY KEY (grupo, player)
+);
+CREATE TABLE history (
+    grupo TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    player TEXT NOT NULL,
+    match_id TEXT,
+    date TEXT,
+    elo_before INTEGER,
+    elo_after INTEGER,
+    PRIMARY KEY (grupo, seq)
+);
+CREATE INDEX idx_matches_date ON matches (grupo, ts);
+CREATE INDEX idx_matches_home_team ON matches (home_team, ts);
+CREATE INDEX idx_matches_away_team ON matches (away_team, ts);
+CREATE INDEX idx_games_match ON games (match_id);
+CREATE INDEX idx_games_date ON games (grupo, ts);
+CREATE INDEX idx_games_home_player ON games (home_player, seq);
+CREATE INDEX idx_games_away_player ON games (away_player, seq);
+CREATE INDEX idx_games_home_team ON games (home_team);
+CREATE INDEX idx_games_away_team ON games (away_team);
+CREATE INDEX idx_ratings_elo ON ratings (grupo, elo DESC);
+CREATE INDEX idx_history_player ON history (player, grupo, seq);
+CREATE INDEX idx_history_match ON history (match_id);
+"""
+
+def _iso(match: Dict[str, Any]) -> Optional[str]:
+    timestamp = match_timestamp(match)
+    return timestamp.isoformat() if timestamp else None
+
+def build_database(path: str, groups: Dict[str, Dict[str, Any]]) -> Dict[str, int]:
+    """Write the analytics database for groups to path, replacing it atomically.
+
+    Each group maps to its "matches" (enriched), "ranking" (elo_*.json),
+    "history" (elo_history_*.json) and "standings" (the team list of
+    standings_*.json); missing parts are simply left out. Returns the row
+    count of each table.
+    """
+    tmp_path = path + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.executescript(SCHEMA)
+        for grupo, data in groups.items():
+            _insert_group(conn, grupo, data)
+        conn.commit()
+        counts = {table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                  for table in ("matches", "games", "players", "teams", "ratings", "history")}
+    finally:
+        conn.close()
+
+    os.replace(tmp_path, path)
+    return counts
+
+def _insert_group(conn: sqlite3.Connection, grupo: str, data: Dict[str, Any]) -> None:
+    match_rows = []
+    game_rows = []
+    seen: Dict[str, List[Any]] = {}
+
+    for match in chronological(data.get("matches") or []):
+        ts = _iso(match)
+        match_id = str(match.get("match_id"))
+        match_rows.append((
+            grupo, match_id, match.get("date"), match.get("time"), ts, match.get("venue"), match.get("status"),
+            match.get("home_team"), match.get("away_team"), match.get("score_home"), match.get("score_away"),
+            match.get("home_side_code"), match.get("away_side_code")
+        ))
+        for game_index, g in enumerate(match.get("games") or []):
+            game_rows.append((
+                grupo, match_id, game_index, len(game_rows), ts, g.get("home_code"), g.get("away_code"),
+                g.get("home_player"), g.get("away_player"), g.get("home_team"), g.get("away_team"),
+                g.get("home_score"), g.get("away_score"),
+                json.dumps(g.get("home_sets", [])), json.dumps(g.get("away_sets", []))
+            ))
+            for side in ("home", "away"):
+                player = g.get(f"{side}_player")
+                if not player:
+                    continue
+                if player not in seen:
+                    seen[player] = [g.get(f"{side}_team"), ts, ts]
+                else:
+                    seen[player][2] = ts
+
+    ranking = data.get("ranking") or []
+    clubs = {entry["player"]: entry.get("club") for entry in ranking}
+    player_rows = [(grupo, player, clubs.get(player, club), first_ts, last_ts)
+                   for player, (club, first_ts, last_ts) in seen.items()]
+
+    team_rows = [(grupo, t.get("team"), t.get("position"), t.get("matches"), t.get("wins"), t.get("losses"),
+                  t.get("points_for"), t.get("points_against"), t.get("points_diff"), t.get("points"))
+                 for t in data.get("standings") or []]
+
+    rating_rows = [(grupo, entry["player"], rank, entry.get("elo"), entry.get("club"), entry.get("matches"),
+                    entry.get("wins"), entry.get("win_rate"))
+                   for rank, entry in enumerate(ranking, 1)]
+
+    history = data.get("history") or {}
+    names = history.get("players", [])
+    columns = history.get("columns", {})
+    history_rows = [(grupo, seq, names[idx], None if match_id is None else str(match_id), date, before, after)
+                    for seq, (idx, match_id, date, before, after) in enumerate(zip(
+                        columns.get("player", []), columns.get("match_id", []), columns.get("date", []),
+                        columns.get("elo_before", []), columns.get("elo_after", [])))]
+
+    conn.executemany("INSERT OR REPLACE INTO matches VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", match_rows)
+    conn.executemany("INSERT OR REPLACE INTO games VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", game_rows)
+    conn.executemany("INSERT OR REPLACE INTO players VALUES (?, ?, ?, ?, ?)", player_rows)
+    conn.executemany("INSERT OR REPLACE INTO teams VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", team_rows)
+    conn.executemany("INSERT OR REPLACE INTO ratings VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rating_rows)
+    conn.executemany("INSERT INTO history VALUES (?, ?, ?, ?, ?, ?, ?)", history_rows)
+
+def connect(path: str) -> Optional[sqlite3.Connection]:
+    """Open the database read-only, or return None when it has not been published"""
+    if not os.path.exists(path):
+        return None
+    try:
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        conn.row_factory = sqlite3.Row
+        return conn
+    except sqlite3.Error:
+        return None
+
+@contextmanager
+def reading(path: str) -> Iterator[Optional[sqlite3.Connection]]:
+    """A read-only connection closed on exit, so no connection outlives its query or thread"""
+    conn = connect(path)
+    try:
+        yield conn
+    finally:
+        if conn is not None:
+            conn.close()
+
+def player_games(conn: sqlite3.Connection, grupo: str, player: str) -> List[sqlite3.Row]:
+    """Games of player in chronological order, served by the player indexes"""
+    return conn.execute(
+        """
+        SELECT * FROM games WHERE grupo = ? AND home_player = ?
+        UNION ALL
+        SELECT * FROM games WHERE grupo = ? AND away_player = ?
+        ORDER BY seq
+        """,
+        (grupo, player, grupo, player)
+    ).fetchall()
+
+def team_player_appearances(conn: sqlite3.Connection, grupo: str, team: str) -> List[sqlite3.Row]:
+    """Players who played for team with their number of games, most frequent first"""
+    return conn.execute(
+        """
+        SELECT player, COUNT(*) AS games FROM (
+            SELECT home_player AS player FROM games WHERE grupo = ? AND home_team = ?
+            UNION ALL
+            SELECT away_player AS player FROM games WHERE grupo = ? AND away_team = ?
+        )
+        GROUP BY player
+        ORDER BY games DESC
+        """,
+        (grupo, team, grupo, team)
+    ).fetchall()
+
+def team_matches(conn: sqlite3.Connection, grupo: str, team: str) -> List[sqlite3.Row]:
+    return conn.execute(
+        """
+        SELECT * FROM matches WHERE grupo = ? AND home_team = ?
+        UNION ALL
+        SELECT * FROM matches WHERE grupo = ? AND away_team = ?
+        ORDER BY ts
+        """,
+        (grupo, team, grupo, team)
+    ).fetchall()
+
+def player_rating(conn: sqlite3.Connection, grupo: str, player: str) -> Optional[sqlite3.Row]:
+    return conn.execute("SELECT * FROM ratings WHERE grupo = ? AND player = ?", (grupo, player)).fetchone()
+
+def player_history(conn: sqlite3.Connection, grupo: str, player: str) -> List[int]:
+    rows = conn.execute("SELECT elo_after FROM history WHERE player = ? AND grupo = ? ORDER BY seq", (player, grupo))
+    return [row[0] for row in rows]
@@ -2,101 +2,146 @@ import streamlit as st
 import json
 import os
 import io
+import sqlite3
+import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
 from datetime import datetime
-from typing import Dict, List, Set, Tuple, Any, Optional
+from typing import Dict, List, NamedTuple, Set, Tuple, Any, Optional, Iterator
+from duel_log import DuelEvent, DuelLog, build_duel_log, chronological, match_timestamp, player_side, sort_key
+import analytics_db
+from duels_table import INT_COLUMNS, MAX_SETS, duel_columns, read_duels_table
+import json_codec
+import charts
 
 INITIAL_ELO = 1400
-K_FACTOR = 100
 ABC_CODES = {"A", "B", "C", "ABC"}
 XYZ_CODES = {"X", "Y", "Z", "XYZ"}
 INVALID_PLAYER_NAMES = {"DOBLE", "A", "B", "C", "X", "Y", "Z", "ABC", "XYZ"}
 RESULT_WIN = "Victoria"
 RESULT_LOSS = "Derrota"
 DATE_FORMAT = "%d %b %Y"
+HISTORICAL_FILES = ["historique_grupo6_complete", "historique_grupo7_complete"]
+EXPECTED_COLS = ["match_id", "date", "home_team", "away_team", "games", "score_home", "score_away"]
+LEADERBOARD_COLUMNS = ["Ranking", "Jugador", "Equipo", "Elo", "V", "D", "% Victoria"]
+
+# Loaders below are cached across sessions with st.cache_resource, keyed by the
+# file actually read and its mtime/size, so reruns skip the I/O until the file
+# is replaced. The returned objects are shared: callers must not mutate them.
+FileVersion = Tuple[Optional[str], int, int]
+
+def stat_version(path: Optional[str]) -> FileVersion:
+    if path is None or not os.path.exists(path):
+        return (None, 0, 0)
+    stat = os.stat(path)
+    return (path, stat.st_mtime_ns, stat.st_size)
+
+def file_version(path: str) -> FileVersion:
+    return stat_version(json_codec.resolve(path))
+
+def with_expected_cols(df: pd.DataFrame) -> pd.DataFrame:
+    for col in EXPECTED_COLS:
+        if col not in df.columns:
+            df[col] = None
+    return df
 
-def load_matches_data() -> pd.DataFrame:
-    try:
-        df_g6 = pd.read_json("data/matches_Grupo6_enriched.json")
-    except (FileNotFoundError, json.JSONDecodeError):
-        df_g6 = pd.DataFrame()
+def load_matches_by_group(grupo: str) -> pd.DataFrame:
+    grupo_id = grupo.replace(" ", "")
+    return read_matches_by_group(file_version(f"data/matches_{grupo_id}_enriched.json"))
 
+@st.cache_resource
+def read_matches_by_group(version: FileVersion) -> pd.DataFrame:
+    path = version[0]
     try:
-        df_g7 = pd.read_json("data/matches_Grupo7_enriched.json")
+        df = sort_matches_df(pd.DataFrame(json_codec.load(path))) if path else pd.DataFrame()
     except (FileNotFoundError, json.JSONDecodeError):
-        df_g7 = pd.DataFrame()
-    
-    return pd.concat([df_g6, df_g7], ignore_index=True)
+        df = pd.DataFrame()
+    return with_expected_cols(df)
 
-def load_matches_by_group(grupo: str) -> pd.DataFrame:
-    try:
-        grupo_id = grupo.replace(" ", "")
-        df = pd.read_json(f"data/matches_{grupo_id}_enriched.json")
+def sort_matches_df(df: pd.DataFrame) -> pd.DataFrame:
+    if df.empty or "date" not in df.columns:
         return df
-    except (FileNotFoundError, json.JSONDecodeError):
-        return pd.DataFrame()
+    times = df["time"] if "time" in df.columns else [None] * len(df)
+    keys = [sort_key(match_timestamp({"date": d, "time": t})) for d, t in zip(df["date"], times)]
+    order = sorted(range(len(df)), key=keys.__getitem__)
+    return df.iloc[order].reset_index(drop=True)
+
+def resolve_historical_path(basename: str) -> Optional[str]:
+    for ext in (".jsonl.zst", ".jsonl.gz", ".jsonl", ".json"):
+        path = basename + ext
+        if os.path.exists(path):
+            return path
+    return None
+
+def iter_historical_file(path: str) -> Iterator[Dict[str, Any]]:
+    if path.endswith(".json"):
+        yield from json_codec.load(path)
+        return
+
+    with json_codec.open_binary(path, "rb") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json_codec.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+def iter_historical_matches(player: str) -> Iterator[Dict[str, Any]]:
+    versions = tuple(stat_version(resolve_historical_path(basename)) for basename in HISTORICAL_FILES)
+    yield from read_historical_index(versions).get(player, [])
 
-def load_historical_matches() -> List[Dict[str, Any]]:
-    all_matches = []
+@st.cache_resource
+def read_historical_index(versions: Tuple[FileVersion, ...]) -> Dict[str, List[Dict[str, Any]]]:
+    """Historical records grouped by player, without repeated (match_id, result) entries per player"""
+    index: Dict[str, List[Dict[str, Any]]] = {}
     seen_match_combinations = set()
-    
-    for filename in ["historique_grupo6_complete.json", "historique_grupo7_complete.json"]:
+
+    for path, _, _ in versions:
+        if path is None:
+            continue
         try:
-            with open(filename, "r", encoding="utf-8") as f:
-                matches = json.load(f)
-                for match in matches:
-                    match_id = match.get("match_id")
-                    result = match.get("result")
-                    combination = (match_id, result)
-                    
-                    if combination not in seen_match_combinations:
-                        all_matches.append(match)
-                        seen_match_combinations.add(combination)
-        except (FileNotFoundError, json.JSONDecodeError):
+            for match in iter_historical_file(path):
+                player = match.get("player_name")
+                combination = (player, match.get("match_id"), match.get("result"))
+                if combination in seen_match_combinations:
+                    continue
+                seen_match_combinations.add(combination)
+                index.setdefault(player, []).append(match)
+        except (OSError, json.JSONDecodeError):
             continue
-    
-    return all_matches
+    return index
 
-def get_historical_matches_by_player(player: str, historical_matches: List[Dict[str, Any]]) -> pd.DataFrame:
+def get_historical_matches_by_player(player: str) -> pd.DataFrame:
     matches_data = []
-    for match in historical_matches:
-        if match.get("player_name") == player:
-            matches_data.append({
-                "Fecha": match.get("date", ""),
-                "Rival": match.get("home_player") if match.get("away_player") == player else match.get("away_player"),
-                "Marcador": f"{match.get('home_score', 0)} - {match.get('away_score', 0)}" if match.get("home_player") == player else f"{match.get('away_score', 0)} - {match.get('home_score', 0)}",
-                "Resultado": match.get("result", "").capitalize(),
-                "Liga": match.get("league", "")
-            })
+    for match in iter_historical_matches(player):
+        matches_data.append({
+            "Fecha": match.get("date", ""),
+            "Rival": match.get("home_player") if match.get("away_player") == player else match.get("away_player"),
+            "Marcador": f"{match.get('home_score', 0)} - {match.get('away_score', 0)}" if match.get("home_player") == player else f"{match.get('away_score', 0)} - {match.get('home_score', 0)}",
+            "Resultado": match.get("result", "").capitalize(),
+            "Liga": match.get("league", "")
+        })
     return pd.DataFrame(matches_data) if matches_data else pd.DataFrame()
 
-def get_historical_h2h(player1: str, player2: str, historical_matches: List[Dict[str, Any]]) -> List[Dict[str, str]]:
+def get_historical_h2h(player1: str, player2: str) -> List[Dict[str, str]]:
     h2h_matches = []
-    for match in historical_matches:
-        if match.get("player_name") == player1:
-            opponent = match.get("home_player") if match.get("away_player") == player1 else match.get("away_player")
-            if opponent == player2:
-                is_home = match.get("home_player") == player1
-                score1 = match.get("home_score", 0) if is_home else match.get("away_score", 0)
-                score2 = match.get("away_score", 0) if is_home else match.get("home_score", 0)
-                h2h_matches.append({
-                    "date": match.get("date", ""),
-                    "player1": player1,
-                    "score1": score1,
-                    "score2": score2,
-                    "player2": player2,
-                    "league": match.get("league", "")
-                })
+    for match in iter_historical_matches(player1):
+        opponent = match.get("home_player") if match.get("away_player") == player1 else match.get("away_player")
+        if opponent == player2:
+            is_home = match.get("home_player") == player1
+            score1 = match.get("home_score", 0) if is_home else match.get("away_score", 0)
+            score2 = match.get("away_score", 0) if is_home else match.get("home_score", 0)
+            h2h_matches.append({
+                "date": match.get("date", ""),
+                "player1": player1,
+                "score1": score1,
+                "score2": score2,
+                "player2": player2,
+                "league": match.get("league", "")
+            })
     return h2h_matches
 
-df_all = load_matches_data()
-
-EXPECTED_COLS = ["match_id", "date", "home_team", "away_team", "games", "score_home", "score_away"]
-for col in EXPECTED_COLS:
-    if col not in df_all.columns:
-        df_all[col] = None
-
 data_dir = os.path.join(os.path.dirname(__file__), "data")
 st.set_page_config(page_title="Comparador Elo", layout="wide")
 
@@ -169,6 +214,11 @@ with st.sidebar:
 grupo_id = grupo.replace(" ", "")
 ELO_FILE = os.path.join(data_dir, f"elo_{grupo_id}.json")
 MATCHES_FILE = os.path.join(data_dir, f"matches_{grupo_id}_enriched.json")
+ELO_HISTORY_FILE = os.path.join(data_dir, f"elo_history_{grupo_id}.json")
+ANALYTICS_DB_FILE = os.path.join(data_dir, analytics_db.DB_FILENAME)
+DUELS_TABLE_FILE = os.path.join(data_dir, f"duels_{grupo_id}.arrow")
+HOME_SET_COLUMNS = [f"home_set{i}" for i in range(1, MAX_SETS + 1)]
+AWAY_SET_COLUMNS = [f"away_set{i}" for i in range(1, MAX_SETS + 1)]
 
 division_map = {
     "Grupo 6": "DHA",
@@ -211,21 +261,90 @@ def get_page_title():
 
 def load_elo_data(filepath: str) -> pd.DataFrame:
     try:
-        with open(filepath, "r", encoding="utf-8") as f:
-            elo_data = json.load(f)
-        return pd.DataFrame(elo_data).sort_values(by="elo", ascending=False)
+        return read_elo_data(filepath, file_version(filepath))
     except (FileNotFoundError, json.JSONDecodeError) as e:
         st.error(f"Error loading ELO data: {e}")
         return pd.DataFrame()
 
+@st.cache_resource
+def read_elo_data(filepath: str, version: FileVersion) -> pd.DataFrame:
+    return pd.DataFrame(json_codec.load(filepath)).sort_values(by="elo", ascending=False)
+
+class PlayerInfo(NamedTuple):
+    elo: int
+    club: str
+    matches: int
+    wins: int
+    rank: int
+
+def load_player_lookup(filepath: str) -> pd.DataFrame:
+    try:
+        return read_player_lookup(filepath, file_version(filepath))
+    except (FileNotFoundError, json.JSONDecodeError, KeyError):
+        return pd.DataFrame(columns=list(PlayerInfo._fields))
+
+@st.cache_resource
+def read_player_lookup(filepath: str, version: FileVersion) -> pd.DataFrame:
+    """The ranking indexed by player, first row of each player as in elo_df, for map/merge"""
+    df = read_elo_data(filepath, version).reset_index(drop=True)
+    df["rank"] = range(1, len(df) + 1)
+    for column in ("matches", "wins"):
+        if column not in df.columns:
+            df[column] = 0
+    return df.drop_duplicates("player").set_index("player")[list(PlayerInfo._fields)]
+
+def load_player_info(filepath: str) -> Dict[str, PlayerInfo]:
+    try:
+        return read_player_info(filepath, file_version(filepath))
+    except (FileNotFoundError, json.JSONDecodeError, KeyError):
+        return {}
+
+@st.cache_resource
+def read_player_info(filepath: str, version: FileVersion) -> Dict[str, PlayerInfo]:
+    lookup = read_player_lookup(filepath, version)
+    return {player: PlayerInfo(*row) for player, row in zip(lookup.index, lookup.itertuples(index=False, name=None))}
+
+def player_elo(player: str, default: Optional[int] = None) -> Optional[int]:
+    info = load_player_info(ELO_FILE).get(player)
+    return info.elo if info is not None else default
+
+def map_player_elo(players: pd.Series, default: int) -> pd.Series:
+    return players.map(load_player_lookup(ELO_FILE)["elo"]).fillna(default).astype("int64")
+
 def load_matches(filepath: str) -> List[Dict[str, Any]]:
     try:
-        with open(filepath, "r", encoding="utf-8") as f:
-            return json.load(f)
+        return read_matches(filepath, file_version(filepath))
     except (FileNotFoundError, json.JSONDecodeError) as e:
         st.error(f"Error loading matches: {e}")
         return []
 
+@st.cache_resource
+def read_matches(filepath: str, version: FileVersion) -> List[Dict[str, Any]]:
+    return chronological(json_codec.load(filepath))
+
+def load_duel_log(filepath: str) -> DuelLog:
+    version = file_version(filepath)
+    try:
+        return read_duel_log(filepath, version)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return build_duel_log([])
+
+@st.cache_resource
+def read_duel_log(filepath: str, version: FileVersion) -> DuelLog:
+    return build_duel_log(read_matches(filepath, version), teams=get_game_teams)
+
+def load_duel_games(filepath: str) -> List[Tuple[Dict[str, Any], Dict[str, Any]]]:
+    version = file_version(filepath)
+    try:
+        return read_duel_games(filepath, version)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return []
+
+@st.cache_resource
+def read_duel_games(filepath: str, version: FileVersion) -> List[Tuple[Dict[str, Any], Dict[str, Any]]]:
+    """(match, game) of every duel, aligned with the seq of the duel log events"""
+    return [(match, game) for match in chronological(read_matches(filepath, version)) for game in match.get("games") or []]
+
 def navigate_to_player(player: str) -> None:
     st.session_state.nav_jugador = player
     st.session_state.nav_vista = "Resumen por jugador"
@@ -239,86 +358,244 @@ def navigate_to_team(team: str) -> None:
 def load_standings(grupo_id: str) -> pd.DataFrame:
     try:
         filepath = os.path.join(data_dir, f"standings_{grupo_id}.json")
-        with open(filepath, "r", encoding="utf-8") as f:
-            standings_data = json.load(f)
-        
-        target_group = f"Grupo {grupo_id[-1]}"
-        teams_list = standings_data.get(target_group, [])
-        
-        if not teams_list:
-            return pd.DataFrame()
-        
-        df = pd.DataFrame(teams_list)
-        return df.sort_values(by="points", ascending=False).reset_index(drop=True)
+        return read_standings(filepath, file_version(filepath), f"Grupo {grupo_id[-1]}")
     except (FileNotFoundError, json.JSONDecodeError, KeyError) as e:
         st.error(f"Error loading standings: {e}")
         return pd.DataFrame()
 
+@st.cache_resource
+def read_standings(filepath: str, version: FileVersion, target_group: str) -> pd.DataFrame:
+    standings_data = json_codec.load(filepath)
+    teams_list = standings_data.get(target_group, [])
+
+    if not teams_list:
+        return pd.DataFrame()
+
+    df = pd.DataFrame(teams_list)
+    return df.sort_values(by="points", ascending=False).reset_index(drop=True)
+
+@st.cache_resource
+def read_duels_df(path: str, version: FileVersion) -> Optional[pd.DataFrame]:
+    table = read_duels_table(path)
+    return table.to_pandas() if table is not None else None
+
+def load_duels_df() -> pd.DataFrame:
+    if os.path.exists(DUELS_TABLE_FILE):
+        df = read_duels_df(DUELS_TABLE_FILE, stat_version(DUELS_TABLE_FILE))
+        if df is not None:
+            return df
+    return build_duels_df(MATCHES_FILE, file_version(MATCHES_FILE))
+
+@st.cache_resource
+def build_duels_df(filepath: str, version: FileVersion) -> pd.DataFrame:
+    try:
+        source = read_matches(filepath, version)
+    except (FileNotFoundError, json.JSONDecodeError):
+        source = []
+    return pd.DataFrame(duel_columns(source)).astype(INT_COLUMNS)
+
+class TeamStats(NamedTuple):
+    elo_avg: float
+    best_player: Optional[str]
+    best_elo: float
+    sets_won: int
+    sets_lost: int
+    sets_games: int
+    sets_diff: int
+    # One entry per match of the team in calendar order: 1 won, 0 lost, -1 no score
+    outcomes: List[int]
+    # Won (1) or lost (0) for the matches with an acta and a non 0-0 score
+    trend: List[int]
+
+EMPTY_TEAM_STATS = TeamStats(0.0, None, 0.0, 0, 0, 0, 0, [], [])
+
+def team_sides(home_team: pd.Series, away_team: pd.Series) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Long (team, row) layout of a table with a home and an away team: every row from the
+    home side, and from the away side unless both sides are the same team.
+
+    Returns the team of each long row, the home rows and the away rows.
+    """
+    home = home_team.to_numpy(dtype=object)
+    away = away_team.to_numpy(dtype=object)
+    home_rows = np.arange(len(home))
+    away_rows = home_rows[away != home]
+    return np.concatenate([home[home_rows], away[away_rows]]), home_rows, away_rows
+
+def build_team_stats(matches_df: pd.DataFrame, duels: pd.DataFrame, lookup: pd.DataFrame) -> Dict[str, TeamStats]:
+    """Every team metric of the dashboards for all teams at once, from the matches and duels tables"""
+    # Match results, one row per (team, match) in calendar order. A score stored as None
+    # has no result; any other score that is not a win (NaN included) counts as a loss.
+    teams, home_rows, away_rows = team_sides(matches_df["home_team"], matches_df["away_team"])
+    score_home = pd.to_numeric(matches_df["score_home"], errors="coerce").to_numpy(dtype=float)
+    score_away = pd.to_numeric(matches_df["score_away"], errors="coerce").to_numpy(dtype=float)
+    missing = np.array([h is None or a is None for h, a in zip(matches_df["score_home"], matches_df["score_away"])], dtype=bool)
+    has_games = np.array([isinstance(g, list) and len(g) > 0 for g in matches_df["games"]], dtype=bool)
+    counted = has_games & ~missing & ~((score_home == 0) & (score_away == 0))
+    same_team = np.ones(len(matches_df), dtype=bool)
+    same_team[away_rows] = False
+    home_won = (score_home > score_away) | (same_team & (score_away > score_home))
+    away_won = score_away > score_home
+
+    won = np.concatenate([home_won[home_rows], away_won[away_rows]]).astype(int)
+    results = pd.DataFrame({
+        "team": teams,
+        "order": np.concatenate([home_rows, away_rows]),
+        "won": won,
+        "outcome": np.where(np.concatenate([missing[home_rows], missing[away_rows]]), -1, won),
+        "counted": np.concatenate([counted[home_rows], counted[away_rows]])
+    }).sort_values("order", kind="stable")
+
+    # Players and sets of every game from the side of the match team
+    teams, home_rows, away_rows = team_sides(duels["match_home_team"], duels["match_away_team"])
+    h = duels[HOME_SET_COLUMNS].to_numpy(dtype=np.int64)
+    a = duels[AWAY_SET_COLUMNS].to_numpy(dtype=np.int64)
+    own = np.concatenate([h[home_rows], a[away_rows]])
+    opp = np.concatenate([a[home_rows], h[away_rows]])
+    played = (own > 0) | (opp > 0)
+    games = pd.DataFrame({
+        "team": teams,
+        "player": np.concatenate([duels["home_player"].to_numpy(dtype=object)[home_rows], duels["away_player"].to_numpy(dtype=object)[away_rows]]),
+        "won": (played & (own > opp)).sum(axis=1),
+        "lost": (played & ~(own > opp)).sum(axis=1),
+        "diff": np.where(played, own - opp, 0).sum(axis=1)
+    })
+    sets = games.groupby("team").agg(won=("won", "sum"), lost=("lost", "sum"), games=("won", "size"), diff=("diff", "sum"))
+
+    lineups = games.loc[games["player"].fillna("").astype(bool), ["team", "player"]]
+    lineups = lineups.join(lookup[["elo", "rank"]], on="player", how="inner")
+    elo_avg = lineups.groupby("team")["elo"].mean()
+    best = lineups.sort_values("rank", kind="stable").drop_duplicates("team").set_index("team")["player"]
+
+    stats: Dict[str, TeamStats] = {}
+    by_team = dict(list(results.groupby("team", sort=False)))
+    for team in set(by_team) | set(sets.index):
+        group = by_team.get(team)
+        team_sets = sets.loc[team] if team in sets.index else None
+        best_player = best.get(team)
+        stats[team] = TeamStats(
+            elo_avg=round(float(elo_avg[team]), 1) if team in elo_avg.index else 0.0,
+            best_player=best_player,
+            best_elo=lookup.at[best_player, "elo"] if best_player is not None else 0.0,
+            sets_won=int(team_sets["won"]) if team_sets is not None else 0,
+            sets_lost=int(team_sets["lost"]) if team_sets is not None else 0,
+            sets_games=int(team_sets["games"]) if team_sets is not None else 0,
+            sets_diff=int(team_sets["diff"]) if team_sets is not None else 0,
+            outcomes=group["outcome"].tolist() if group is not None else [],
+            trend=group.loc[group["counted"], "won"].tolist() if group is not None else []
+        )
+    return stats
+
+def load_team_stats() -> Dict[str, TeamStats]:
+    versions = (stat_version(DUELS_TABLE_FILE), file_version(MATCHES_FILE), file_version(ELO_FILE))
+    return cached_team_stats(grupo_id, versions, load_matches_by_group(grupo), load_duels_df(), load_player_lookup(ELO_FILE))
+
+@st.cache_resource
+def cached_team_stats(grupo_id: str, versions: Tuple[FileVersion, ...], _matches_df: pd.DataFrame,
+                      _duels: pd.DataFrame, _lookup: pd.DataFrame) -> Dict[str, TeamStats]:
+    return build_team_stats(_matches_df, _duels, _lookup)
+
+# The database is opened per query: the results are cached by the callers, and a
+# connection is never shared between session threads or left open once replaced
+def player_games(player: str, until: Optional[datetime] = None) -> List[Any]:
+    with analytics_db.reading(ANALYTICS_DB_FILE) as conn:
+        if conn is None:
+            return load_duel_log(MATCHES_FILE).for_player(player, until)
+        rows = analytics_db.player_games(conn, grupo_id, player)
+    if until is not None:
+        rows = [r for r in rows if r["ts"] is not None and r["ts"] <= until.isoformat()]
+    return [duel_log_event(r) for r in rows]
+
+def duel_log_event(row: sqlite3.Row) -> DuelEvent:
+    return DuelEvent(
+        seq=row["seq"],
+        timestamp=datetime.fromisoformat(row["ts"]) if row["ts"] else None,
+        match_id=row["match_id"],
+        game_index=row["game_index"],
+        date=None,
+        home_player=row["home_player"],
+        away_player=row["away_player"],
+        home_score=row["home_score"],
+        away_score=row["away_score"],
+        home_sets=json_codec.loads(row["home_sets"]),
+        away_sets=json_codec.loads(row["away_sets"]),
+        home_team=row["home_team"],
+        away_team=row["away_team"]
+    )
+
+def get_duels(player: str, until: Optional[datetime] = None) -> List[Dict[str, str]]:
+    # Keyed on both sources of player_games: the database, or the matches without it
+    versions = (stat_version(ANALYTICS_DB_FILE), file_version(MATCHES_FILE))
+    return cached_duels(versions, grupo_id, player, until)
+
 @st.cache_data
-def get_duels(player: str) -> List[Dict[str, str]]:
+def cached_duels(versions: Tuple[FileVersion, ...], grupo_id: str, player: str, until: Optional[datetime]) -> List[Dict[str, str]]:
     duels = []
-    for match in matches:
-        for g in match.get("games", []):
-            if g.get("home_player") == player or g.get("away_player") == player:
-                is_home = g["home_player"] == player
-                score = g["home_score"] if is_home else g["away_score"]
-                opp_score = g["away_score"] if is_home else g["home_score"]
-                opponent = g["away_player"] if is_home else g["home_player"]
-                result = RESULT_WIN if score > opp_score else RESULT_LOSS
-                casa_away = "Casa" if is_home else "Away"
-                duels.append({
-                    "rival": opponent,
-                    "marcador": f"{score} - {opp_score}",
-                    "resultado": result,
-                    "casa_away": casa_away
-                })
+    for d in (player_side(e, player) for e in player_games(player, until)):
+        result = RESULT_WIN if d.score > d.opp_score else RESULT_LOSS
+        casa_away = "Casa" if d.is_home else "Away"
+        duels.append({
+            "rival": d.opponent,
+            "marcador": f"{d.score} - {d.opp_score}",
+            "resultado": result,
+            "casa_away": casa_away
+        })
     return duels
 
-@st.cache_data
 def get_stats(player: str) -> Tuple[int, int]:
     duels = get_duels(player)
     wins = sum(1 for d in duels if d["resultado"] == RESULT_WIN)
     losses = sum(1 for d in duels if d["resultado"] == RESULT_LOSS)
     return wins, losses
 
-@st.cache_data
 def get_common_opponents(p1: str, p2: str) -> List[str]:
     opp1 = {d["rival"] for d in get_duels(p1)}
     opp2 = {d["rival"] for d in get_duels(p2)}
     return sorted(opp1 & opp2)
 
-@st.cache_data
+def load_elo_history(filepath: str) -> Dict[str, List[int]]:
+    return read_elo_history(filepath, file_version(filepath))
+
+@st.cache_resource
+def read_elo_history(filepath: str, version: FileVersion) -> Dict[str, List[int]]:
+    try:
+        history = json_codec.load(filepath)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+    players = history.get("players", [])
+    columns = history.get("columns", {})
+    by_player: Dict[str, List[int]] = {}
+    for idx, elo_after in zip(columns.get("player", []), columns.get("elo_after", [])):
+        by_player.setdefault(players[idx], []).append(elo_after)
+    return by_player
+
 def plot_elo(player: str) -> List[int]:
-    elo = INITIAL_ELO
-    history = []
-    for match in matches:
-        for g in match.get("games", []):
-            if g.get("home_player") == player or g.get("away_player") == player:
-                is_home = g["home_player"] == player
-                score = g["home_score"] if is_home else g["away_score"]
-                opp_score = g["away_score"] if is_home else g["home_score"]
-                
-                h_sets = g.get("home_sets", [])
-                a_sets = g.get("away_sets", [])
-                
-                if is_home:
-                    player_sets = h_sets
-                    opp_sets = a_sets
-                else:
-                    player_sets = a_sets
-                    opp_sets = h_sets
-                
-                player_points = sum(s for s in player_sets if s > 0)
-                opp_points = sum(s for s in opp_sets if s > 0)
-                
-                sets_result = score / (score + opp_score) if (score + opp_score) > 0 else 0.5
-                points_result = player_points / (player_points + opp_points) if (player_points + opp_points) > 0 else 0.5
-                
-                result = 0.7 * sets_result + 0.3 * points_result
-                
-                elo += K_FACTOR * (result - 0.5)
-                history.append(round(elo))
-    return history
+    with analytics_db.reading(ANALYTICS_DB_FILE) as conn:
+        if conn is not None:
+            return analytics_db.player_history(conn, grupo_id, player)
+    return load_elo_history(ELO_HISTORY_FILE).get(player, [])
+
+# Elo chart of each view, as options of charts.elo_lines_png
+ELO_CHART_STYLES: Dict[str, Dict[str, Any]] = {
+    "comparar": {},
+    "perfil": {"color": "blue"},
+    "equipo": {"figsize": (10, 5), "marker": "o", "grid": True},
+    "avanzado": {"figsize": (12, 5), "marker": "o", "linewidth": 2, "color": "steelblue", "fill": True, "grid": True,
+                 "legend": False, "ylabel": "Elo Rating"}
+}
+
+def show_elo_chart(players: List[str], style: str) -> None:
+    # Keyed on the files plot_elo reads, so a rebuilt database or history redraws the chart
+    versions = (stat_version(ANALYTICS_DB_FILE), file_version(ELO_HISTORY_FILE))
+    st.image(cached_elo_chart(versions, grupo_id, tuple(players), style), use_container_width=True)
+
+@st.cache_data(max_entries=256)
+def cached_elo_chart(versions: Tuple[FileVersion, ...], grupo_id: str, players: Tuple[str, ...], style: str) -> bytes:
+    return charts.elo_lines_png([(player, plot_elo(player)) for player in players], **ELO_CHART_STYLES[style])
+
+@st.cache_data(max_entries=16)
+def cached_points_chart(teams: Tuple[str, ...], points: Tuple[float, ...], title: str) -> bytes:
+    return charts.points_barh_png(teams, points, title)
 
 def get_team_players(match: Dict[str, Any], team_name: str) -> Dict[str, Dict[str, int]]:
     players = {}
@@ -330,12 +607,13 @@ def get_team_players(match: Dict[str, Any], team_name: str) -> Dict[str, Dict[st
     return players
 
 def build_team_table(players: Dict[str, Dict[str, int]], team_name: str) -> pd.DataFrame:
+    player_info = load_player_info(ELO_FILE)
     rows = []
     for name, stats in players.items():
-        info = elo_df[elo_df["player"] == name]
-        if not info.empty:
-            elo = info.iloc[0]["elo"]
-            club = info.iloc[0]["club"]
+        info = player_info.get(name)
+        if info is not None:
+            elo = info.elo
+            club = info.club
             wins, losses = get_stats(name)
         else:
             elo = None
@@ -362,6 +640,11 @@ def build_team_table(players: Dict[str, Dict[str, int]], team_name: str) -> pd.D
     return df
 
 def get_real_team(code: str, match: Dict[str, Any]) -> str:
+    home_side_code = match.get("home_side_code")
+    if home_side_code:
+        abc_team, xyz_team = (match["home_team"], match["away_team"]) if home_side_code == "ABC" else (match["away_team"], match["home_team"])
+        return abc_team if code in ABC_CODES else xyz_team if code in XYZ_CODES else "Inconnu"
+
     abc_wins = 0
     xyz_wins = 0
 
@@ -393,13 +676,17 @@ def get_real_team(code: str, match: Dict[str, Any]) -> str:
         return xyz_team
     return "Inconnu"
 
+def get_game_teams(game: Dict[str, Any], match: Dict[str, Any]) -> Tuple[str, str]:
+    if "home_team" in game:
+        return game["home_team"], game["away_team"]
+    return get_real_team(game.get("home_code", ""), match), get_real_team(game.get("away_code", ""), match)
+
 def hay_doble(match: Dict[str, Any], equipo: str) -> bool:
     for g in match.get("games", []):
         code_home = g.get("home_code", "")
         code_away = g.get("away_code", "")
 
-        team_home = get_real_team(code_home, match)
-        team_away = get_real_team(code_away, match)
+        team_home, team_away = get_game_teams(g, match)
 
         if team_home == equipo and code_home in ABC_CODES:
             return True
@@ -420,16 +707,15 @@ def extract_player_match_data(game: Dict[str, Any], match: Dict[str, Any], playe
     if not is_home and game.get("away_player") != player:
         return None
     
-    code = game.get("home_code") if is_home else game.get("away_code")
     score = game["home_score"] if is_home else game["away_score"]
     opp_score = game["away_score"] if is_home else game["home_score"]
     opponent = game["away_player"] if is_home else game["home_player"]
-    opponent_code = game["away_code"] if is_home else game["home_code"]
     sets_home = game.get("home_sets", []) if is_home else game.get("away_sets", [])
     sets_away = game.get("away_sets", []) if is_home else game.get("home_sets", [])
     
-    player_team = get_real_team(code, match)
-    opponent_team = get_real_team(opponent_code, match)
+    home_team, away_team = get_game_teams(game, match)
+    player_team = home_team if is_home else away_team
+    opponent_team = away_team if is_home else home_team
     result = RESULT_WIN if score > opp_score else RESULT_LOSS
     
     sets_html = []
@@ -460,73 +746,60 @@ def is_valid_player_name(nombre: str) -> bool:
         return False
     return n not in INVALID_PLAYER_NAMES
 
+class RosterEntry(NamedTuple):
+    appearances: int
+    last_seq: int
+    last_match_id: Any
+    last_date: Optional[str]
+    # Side codes the player was lined up with (A, B, C, ABC, X, Y, Z, XYZ)
+    codes: Tuple[str, ...]
+
+def build_team_rosters(log: DuelLog, games: List[Tuple[Dict[str, Any], Dict[str, Any]]]) -> Dict[str, Dict[str, RosterEntry]]:
+    """Players of every team with their appearances, most frequent first and most recently seen first among ties"""
+    counts: Dict[str, Dict[str, List[Any]]] = {}
+    for e in log.events:
+        _, game = games[e.seq]
+        for player, team, code in ((e.home_player, e.home_team, game.get("home_code", "")),
+                                   (e.away_player, e.away_team, game.get("away_code", ""))):
+            if not is_valid_player_name(player):
+                continue
+            entry = counts.setdefault(team, {}).setdefault(player, [0, None, set()])
+            entry[0] += 1
+            entry[1] = e
+            entry[2].add(code)
+
+    rosters: Dict[str, Dict[str, RosterEntry]] = {}
+    for team, players in counts.items():
+        ordered = sorted(players.items(), key=lambda item: (-item[1][0], -item[1][1].seq))
+        rosters[team] = {
+            player: RosterEntry(n, last.seq, last.match_id, last.date, tuple(sorted(codes)))
+            for player, (n, last, codes) in ordered
+        }
+    return rosters
+
+def load_team_rosters() -> Dict[str, Dict[str, RosterEntry]]:
+    return cached_team_rosters(grupo_id, file_version(MATCHES_FILE), load_duel_log(MATCHES_FILE), load_duel_games(MATCHES_FILE))
+
+@st.cache_resource
+def cached_team_rosters(grupo_id: str, version: FileVersion, _log: DuelLog,
+                        _games: List[Tuple[Dict[str, Any], Dict[str, Any]]]) -> Dict[str, Dict[str, RosterEntry]]:
+    return build_team_rosters(_log, _games)
+
 def get_team_regular_players(equipo: str) -> pd.Series:
-    jugadores = []
-    for match in matches:
-        if equipo not in [match["home_team"], match["away_team"]]:
-            continue
-        
-        games = match.get("games", [])
-        if not games:
-            continue
-        
-        for g in games:
-            home = g.get("home_player", "").strip()
-            away = g.get("away_player", "").strip()
-            code_h = g.get("home_code", "")
-            code_a = g.get("away_code", "")
-            
-            team_h = get_real_team(code_h, match)
-            team_a = get_real_team(code_a, match)
-            
-            if is_valid_player_name(home) and team_h == equipo:
-                jugadores.append(home)
-            
-            if is_valid_player_name(away) and team_a == equipo:
-                jugadores.append(away)
-    
-    return pd.Series(jugadores).value_counts()
-
-def get_team_elo_average(df: pd.DataFrame, equipo: str) -> float:
-    elos = []
-    for _, row in df.iterrows():
-        for g in row.get("games", []):
-            if row["home_team"] == equipo and g.get("home_player"):
-                p = g["home_player"]
-                info = elo_df[elo_df["player"] == p]
-                if not info.empty:
-                    elos.append(info["elo"].iloc[0])
-            
-            if row["away_team"] == equipo and g.get("away_player"):
-                p = g["away_player"]
-                info = elo_df[elo_df["player"] == p]
-                if not info.empty:
-                    elos.append(info["elo"].iloc[0])
-    
-    return round(sum(elos) / len(elos), 1) if elos else 0.0
-
-def get_team_sets_average_diff(df: pd.DataFrame, equipo: str) -> float:
-    diffs = []
-    for _, row in df.iterrows():
-        for g in row.get("games", []):
-            if row["home_team"] == equipo:
-                diffs.append(sum([h - a for h, a in zip(g["home_sets"], g["away_sets"]) if h or a]))
-            elif row["away_team"] == equipo:
-                diffs.append(sum([a - h for h, a in zip(g["home_sets"], g["away_sets"]) if h or a]))
-    return round(sum(diffs) / len(diffs), 2) if diffs else 0.0
-
-def get_team_recent_form(df: pd.DataFrame, equipo: str) -> str:
-    filas = df[(df["home_team"] == equipo) | (df["away_team"] == equipo)].tail(5)
-    r = []
-    for _, p in filas.iterrows():
-        sh, sa = p.get("score_home"), p.get("score_away")
-        if sh is None or sa is None:
-            continue
-        if (p["home_team"] == equipo and sh > sa) or (p["away_team"] == equipo and sa > sh):
-            r.append("🟩")
-        else:
-            r.append("🟥")
-    return "".join(r)
+    roster = load_team_rosters().get(equipo, {})
+    return pd.Series({player: entry.appearances for player, entry in roster.items()}, dtype="int64")
+
+def get_team_elo_average(equipo: str) -> float:
+    return load_team_stats().get(equipo, EMPTY_TEAM_STATS).elo_avg
+
+def get_team_sets_average_diff(equipo: str) -> float:
+    stats = load_team_stats().get(equipo, EMPTY_TEAM_STATS)
+    if stats.sets_games == 0:
+        return 0.0
+    return round(float(stats.sets_diff) / stats.sets_games, 2)
+
+def get_team_recent_form(equipo: str) -> str:
+    return "".join("🟩" if o else "🟥" for o in load_team_stats().get(equipo, EMPTY_TEAM_STATS).outcomes[-5:] if o >= 0)
 
 def get_team_opponents(df: pd.DataFrame, equipo: str) -> Set[str]:
     r = []
@@ -547,24 +820,9 @@ def get_h2h_matches(df: pd.DataFrame, j1: str, j2: str) -> List[str]:
                 res.append(f"{j2} {g['home_score']} - {g['away_score']} {j1}")
     return res
 
-def get_best_player(df: pd.DataFrame, equipo: str) -> Tuple[Optional[str], float]:
-    jugadores = []
-    for _, row in df.iterrows():
-        for g in row.get("games", []):
-            if row["home_team"] == equipo and g.get("home_player"):
-                jugadores.append(g["home_player"])
-            elif row["away_team"] == equipo and g.get("away_player"):
-                jugadores.append(g["away_player"])
-    
-    if not jugadores:
-        return None, 0.0
-    
-    tabla = elo_df[elo_df["player"].isin(jugadores)]
-    if tabla.empty:
-        return None, 0.0
-    
-    fila = tabla.sort_values("elo", ascending=False).iloc[0]
-    return fila["player"], fila["elo"]
+def get_best_player(equipo: str) -> Tuple[Optional[str], float]:
+    stats = load_team_stats().get(equipo, EMPTY_TEAM_STATS)
+    return stats.best_player, stats.best_elo
 
 def build_team_comparison_table(df: pd.DataFrame) -> pd.DataFrame:
     rows = []
@@ -590,74 +848,48 @@ def build_team_comparison_table(df: pd.DataFrame) -> pd.DataFrame:
     return result_df
 
 def get_global_leaderboard() -> pd.DataFrame:
-    rows = []
-    for _, player_row in elo_df.iterrows():
-        player = player_row["player"]
-        elo = player_row["elo"]
-        club = player_row["club"]
-        wins, losses = get_stats(player)
-        total_matches = wins + losses
-        win_rate = round(wins / total_matches * 100, 1) if total_matches > 0 else 0.0
-        
-        rows.append({
-            "Ranking": None,
-            "Jugador": player,
-            "Equipo": club,
-            "Elo": elo,
-            "V": wins,
-            "D": losses,
-            "Total": total_matches,
-            "% Victoria": f"{win_rate}%"
-        })
-    
-    result_df = pd.DataFrame(rows).sort_values(by="Elo", ascending=False).reset_index(drop=True)
+    elo_df = load_elo_data(ELO_FILE)
+    records = load_player_records()
+    wins = elo_df["player"].map(records["wins"]).fillna(0).astype("int64")
+    losses = elo_df["player"].map(records["losses"]).fillna(0).astype("int64")
+    total = wins + losses
+    win_rate = [round(w / t * 100, 1) if t > 0 else 0.0 for w, t in zip(wins.tolist(), total.tolist())]
+
+    result_df = pd.DataFrame({
+        "Ranking": None,
+        "Jugador": elo_df["player"].to_numpy(),
+        "Equipo": elo_df["club"].to_numpy(),
+        "Elo": elo_df["elo"].to_numpy(),
+        "V": wins.to_numpy(),
+        "D": losses.to_numpy(),
+        "Total": total.to_numpy(),
+        "% Victoria": [f"{rate}%" for rate in win_rate]
+    }).sort_values(by="Elo", ascending=False).reset_index(drop=True)
     result_df["Ranking"] = range(1, len(result_df) + 1)
     return result_df[["Ranking", "Jugador", "Equipo", "Elo", "V", "D", "Total", "% Victoria"]]
 
-def get_team_recent_form_trend(df: pd.DataFrame, equipo: str, last_n: int = 10) -> List[int]:
-    filas = df[(df["home_team"] == equipo) | (df["away_team"] == equipo)]
-    trend = []
-    
-    for _, p in filas.iterrows():
-        try:
-            games = p["games"]
-            if not isinstance(games, list) or len(games) == 0:
-                continue
-            sh = p["score_home"]
-            sa = p["score_away"]
-            if sh is None or sa is None or (sh == 0 and sa == 0):
-                continue
-            if (p["home_team"] == equipo and sh > sa) or (p["away_team"] == equipo and sa > sh):
-                trend.append(1)
-            else:
-                trend.append(0)
-        except (KeyError, TypeError):
-            continue
-    
-    return trend[-last_n:] if trend else []
+def get_team_recent_form_trend(equipo: str, last_n: int = 10) -> List[int]:
+    return load_team_stats().get(equipo, EMPTY_TEAM_STATS).trend[-last_n:]
 
-def get_team_win_rate(df: pd.DataFrame, equipo: str, last_n: int = 10) -> float:
-    trend = get_team_recent_form_trend(df, equipo, last_n)
+def get_team_win_rate(equipo: str, last_n: int = 10) -> float:
+    trend = get_team_recent_form_trend(equipo, last_n)
     if not trend:
         return 0.0
     return round(sum(trend) / len(trend) * 100, 1)
 
-def get_team_strengths_weaknesses(df: pd.DataFrame, team1: str, team2: str) -> Dict[str, List[str]]:
-    team1_stats = get_team_sets_stats(df, team1)
-    team2_stats = get_team_sets_stats(df, team2)
+def get_team_strengths_weaknesses(team1: str, team2: str) -> Dict[str, List[str]]:
+    team1_stats = get_team_sets_stats(team1)
+    team2_stats = get_team_sets_stats(team2)
     
-    team1_elo_avg = get_team_elo_average(df, team1)
-    team2_elo_avg = get_team_elo_average(df, team2)
+    team1_elo_avg = get_team_elo_average(team1)
+    team2_elo_avg = get_team_elo_average(team2)
     
-    team1_trend = get_team_recent_form_trend(df, team1, 10)
-    team2_trend = get_team_recent_form_trend(df, team2, 10)
+    team1_trend = get_team_recent_form_trend(team1, 10)
+    team2_trend = get_team_recent_form_trend(team2, 10)
     
     team1_win_rate = round(sum(team1_trend) / len(team1_trend) * 100, 1) if team1_trend else 0.0
     team2_win_rate = round(sum(team2_trend) / len(team2_trend) * 100, 1) if team2_trend else 0.0
     
-    team1_form = get_team_recent_form_trend(df, team1, 5)
-    team2_form = get_team_recent_form_trend(df, team2, 5)
-    
     strengths_1 = []
     weaknesses_1 = []
     strengths_2 = []
@@ -718,28 +950,75 @@ def get_player_vs_opponent_stats(player: str, opponent: str) -> Dict[str, Any]:
         "win_rate": win_rate
     }
 
-def build_h2h_matrix(df: pd.DataFrame) -> pd.DataFrame:
-    all_players = sorted(elo_df["player"].unique())
-    matrix = []
-    
-    for p1 in all_players:
-        row = {"Jugador": p1}
-        for p2 in all_players:
-            if p1 == p2:
-                row[p2] = "-"
-            else:
-                stats = get_player_vs_opponent_stats(p1, p2)
-                if stats["matches"] > 0:
-                    row[p2] = f"{stats['wins']}-{stats['losses']}"
-                else:
-                    row[p2] = ""
-        matrix.append(row)
-    
-    return pd.DataFrame(matrix)
+def player_codes(values: np.ndarray, players: List[str]) -> np.ndarray:
+    """Position of each value in players, -1 for the names that are not in it"""
+    return pd.Index(players).get_indexer(values)
+
+def build_h2h_counts(duels: pd.DataFrame, players: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """Wins and losses of each player (rows) against each rival (columns) in one pass over the duels.
+
+    As in get_duels, anything but a won game counts as a loss.
+    """
+    home = duels["home_player"].to_numpy(dtype=object)
+    away = duels["away_player"].to_numpy(dtype=object)
+    home_score = duels["home_score"].to_numpy(dtype=np.int64)
+    away_score = duels["away_score"].to_numpy(dtype=np.int64)
+
+    player = player_codes(np.concatenate([home, away]), players)
+    rival = player_codes(np.concatenate([away, home]), players)
+    won = np.concatenate([home_score > away_score, away_score > home_score])
+    # A duel against oneself is listed once, from the home side, like in the duel log
+    keep = (player >= 0) & (rival >= 0) & np.concatenate([np.ones(len(home), bool), home != away])
+
+    size = len(players)
+    wins = np.zeros((size, size), dtype=np.int64)
+    losses = np.zeros((size, size), dtype=np.int64)
+    np.add.at(wins, (player[keep & won], rival[keep & won]), 1)
+    np.add.at(losses, (player[keep & ~won], rival[keep & ~won]), 1)
+    return wins, losses
 
-def get_best_worst_streaks(df: pd.DataFrame, equipo: str, window: int = 5) -> Tuple[str, str]:
-    filas = df[(df["home_team"] == equipo) | (df["away_team"] == equipo)].tail(window)
-    streak = get_team_recent_form_trend(df, equipo, window)
+def build_player_records(duels: pd.DataFrame, players: List[str]) -> pd.DataFrame:
+    """Wins and losses of each player over all their duels, counted like get_stats"""
+    home = duels["home_player"].to_numpy(dtype=object)
+    away = duels["away_player"].to_numpy(dtype=object)
+    home_score = duels["home_score"].to_numpy(dtype=np.int64)
+    away_score = duels["away_score"].to_numpy(dtype=np.int64)
+
+    player = player_codes(np.concatenate([home, away]), players)
+    won = np.concatenate([home_score > away_score, away_score > home_score])
+    keep = (player >= 0) & np.concatenate([np.ones(len(home), bool), home != away])
+    return pd.DataFrame({
+        "wins": np.bincount(player[keep & won], minlength=len(players)),
+        "losses": np.bincount(player[keep & ~won], minlength=len(players))
+    }, index=pd.Index(players, name="player"))
+
+def load_player_records() -> pd.DataFrame:
+    versions = (stat_version(DUELS_TABLE_FILE), file_version(MATCHES_FILE), file_version(ELO_FILE))
+    return cached_player_records(grupo_id, versions, load_duels_df(), sorted(load_elo_data(ELO_FILE)["player"].unique()))
+
+@st.cache_resource
+def cached_player_records(grupo_id: str, versions: Tuple[FileVersion, ...], _duels: pd.DataFrame, _players: List[str]) -> pd.DataFrame:
+    return build_player_records(_duels, _players)
+
+def build_h2h_matrix(duels: pd.DataFrame, players: List[str]) -> pd.DataFrame:
+    wins, losses = build_h2h_counts(duels, players)
+    cells = np.char.add(np.char.add(wins.astype(str), "-"), losses.astype(str)).astype(object)
+    cells[(wins + losses) == 0] = ""
+    np.fill_diagonal(cells, "-")
+    matrix = pd.DataFrame(cells, columns=players)
+    matrix.insert(0, "Jugador", players)
+    return matrix
+
+def load_h2h_matrix() -> pd.DataFrame:
+    versions = (stat_version(DUELS_TABLE_FILE), file_version(MATCHES_FILE), file_version(ELO_FILE))
+    return cached_h2h_matrix(grupo_id, versions, load_duels_df(), sorted(load_elo_data(ELO_FILE)["player"].unique()))
+
+@st.cache_resource
+def cached_h2h_matrix(grupo_id: str, versions: Tuple[FileVersion, ...], _duels: pd.DataFrame, _players: List[str]) -> pd.DataFrame:
+    return build_h2h_matrix(_duels, _players)
+
+def get_best_worst_streaks(equipo: str, window: int = 5) -> Tuple[str, str]:
+    streak = get_team_recent_form_trend(equipo, window)
     
     if not streak:
         return "N/A", "N/A"
@@ -795,18 +1074,8 @@ def get_player_momentum(player: str, last_n: int = 5) -> Dict[str, Any]:
         "total": len(recent_duels)
     }
 
-def get_team_momentum(df: pd.DataFrame, equipo: str, last_n: int = 5) -> Dict[str, Any]:
-    filas = df[(df["home_team"] == equipo) | (df["away_team"] == equipo)].tail(last_n)
-    trend = []
-    
-    for _, p in filas.iterrows():
-        sh, sa = p.get("score_home"), p.get("score_away")
-        if sh is None or sa is None:
-            continue
-        if (p["home_team"] == equipo and sh > sa) or (p["away_team"] == equipo and sa > sh):
-            trend.append(1)
-        else:
-            trend.append(0)
+def get_team_momentum(equipo: str, last_n: int = 5) -> Dict[str, Any]:
+    trend = [o for o in load_team_stats().get(equipo, EMPTY_TEAM_STATS).outcomes[-last_n:] if o >= 0]
     
     if not trend:
         return {"wins": 0, "losses": 0, "momentum": 0.0, "streak": "N/A"}
@@ -829,27 +1098,14 @@ def get_player_sets_stats(player: str) -> Dict[str, float]:
     sets_lost = 0
     matches_count = 0
     
-    for match in matches:
-        for g in match.get("games", []):
-            if g.get("home_player") == player or g.get("away_player") == player:
-                is_home = g["home_player"] == player
-                h_sets = g.get("home_sets", [])
-                a_sets = g.get("away_sets", [])
-                
-                for h, a in zip(h_sets, a_sets):
-                    if h > 0 or a > 0:
-                        if is_home:
-                            if h > a:
-                                sets_won += 1
-                            else:
-                                sets_lost += 1
-                        else:
-                            if a > h:
-                                sets_won += 1
-                            else:
-                                sets_lost += 1
-                
-                matches_count += 1
+    for d in load_duel_log(MATCHES_FILE).player_duels(player):
+        for own, opp in zip(d.sets, d.opp_sets):
+            if own > 0 or opp > 0:
+                if own > opp:
+                    sets_won += 1
+                else:
+                    sets_lost += 1
+        matches_count += 1
     
     avg_sets_won = round(sets_won / matches_count, 2) if matches_count > 0 else 0.0
     avg_sets_lost = round(sets_lost / matches_count, 2) if matches_count > 0 else 0.0
@@ -862,37 +1118,11 @@ def get_player_sets_stats(player: str) -> Dict[str, float]:
         "matches": matches_count
     }
 
-def get_team_sets_stats(df: pd.DataFrame, equipo: str) -> Dict[str, float]:
-    sets_won = 0
-    sets_lost = 0
-    matches_count = 0
-    
-    for _, row in df.iterrows():
-        is_home = row["home_team"] == equipo
-        is_away = row["away_team"] == equipo
-        
-        if not (is_home or is_away):
-            continue
-        
-        for g in row.get("games", []):
-            h_sets = g.get("home_sets", [])
-            a_sets = g.get("away_sets", [])
-            
-            if is_home:
-                for h, a in zip(h_sets, a_sets):
-                    if h > 0 or a > 0:
-                        if h > a:
-                            sets_won += 1
-                        else:
-                            sets_lost += 1
-            else:
-                for h, a in zip(h_sets, a_sets):
-                    if h > 0 or a > 0:
-                        if a > h:
-                            sets_won += 1
-                        else:
-                            sets_lost += 1
-            matches_count += 1
+def get_team_sets_stats(equipo: str) -> Dict[str, float]:
+    stats = load_team_stats().get(equipo, EMPTY_TEAM_STATS)
+    sets_won = stats.sets_won
+    sets_lost = stats.sets_lost
+    matches_count = stats.sets_games
     
     avg_sets_won = round(sets_won / matches_count, 2) if matches_count > 0 else 0.0
     avg_sets_lost = round(sets_lost / matches_count, 2) if matches_count > 0 else 0.0
@@ -998,6 +1228,13 @@ def style_match_results(df: pd.DataFrame):
     
     return df.style.map(color_resultado, subset=['Resultado'])
 
+def player_selection_table(df: pd.DataFrame, player_col: str, columns: List[str], key: str) -> None:
+    """One virtualized table instead of a row of widgets per player: selecting a row opens that player's profile"""
+    event = st.dataframe(df, use_container_width=True, hide_index=True, column_order=columns,
+                         on_select="rerun", selection_mode="single-row", key=key)
+    if event.selection.rows:
+        navigate_to_player(df.iloc[event.selection.rows[0]][player_col])
+
 def display_match_duels_acta(games: list, home_team: str, away_team: str):
     regular_duels = [g for g in games if g.get('home_code') != "ABC" and g.get('away_code') != "XYZ"]
     
@@ -1067,7 +1304,7 @@ def df_to_excel(df: pd.DataFrame) -> bytes:
 
 def get_player_form_divergence() -> pd.DataFrame:
     rows = []
-    for _, row in elo_df.iterrows():
+    for _, row in load_elo_data(ELO_FILE).iterrows():
         player = row["player"]
         elo = row["elo"]
         momentum = get_player_momentum(player, 5)
@@ -1089,7 +1326,7 @@ def get_player_form_divergence() -> pd.DataFrame:
 
 def get_doubles_pairs_stats(equipo: Optional[str] = None) -> pd.DataFrame:
     pairs: Dict[tuple, Dict] = {}
-    for match in matches:
+    for match in load_matches(MATCHES_FILE):
         home_team = match["home_team"]
         away_team = match["away_team"]
         for g in match.get("games", []):
@@ -1126,144 +1363,140 @@ def get_doubles_pairs_stats(equipo: Optional[str] = None) -> pd.DataFrame:
     )
     return df.sort_values("V", ascending=False).reset_index(drop=True)
 
-elo_df = load_elo_data(ELO_FILE)
-matches = load_matches(MATCHES_FILE)
-df_grupo = load_matches_by_group(grupo)
-historical_matches = load_historical_matches()
-
-for col in EXPECTED_COLS:
-    if col not in df_grupo.columns:
-        df_grupo[col] = None
-
 vista = st.session_state.nav_vista
 page_title = get_page_title()
 st.title(f"🏓 {page_title}")
 
+# Each view loads only the datasets it reads, and the helpers above call the
+# cached loaders themselves, so a page pays for what it shows.
+
 # 👤 Comparar jugadores
 if vista == "Comparar jugadores":
-    st.subheader("👤 Comparación entre dos jugadores")
+    elo_df = load_elo_data(ELO_FILE)
+    player_info = load_player_info(ELO_FILE)
 
-    equipos = sorted(elo_df["club"].unique())
-    col1, col2 = st.columns(2)
+    @st.fragment
+    def vista_comparar_jugadores():
+        st.subheader("👤 Comparación entre dos jugadores")
 
-    with col1:
-        equipo1 = st.selectbox("Equipo para Jugador 1", ["Todos"] + equipos, key="jugador1_equipo")
-    with col2:
-        equipo2 = st.selectbox("Equipo para Jugador 2", ["Todos"] + equipos, key="jugador2_equipo")
-
-    jugadores1 = elo_df["player"].tolist() if equipo1 == "Todos" else elo_df[elo_df["club"] == equipo1]["player"].tolist()
-    jugadores2 = elo_df["player"].tolist() if equipo2 == "Todos" else elo_df[elo_df["club"] == equipo2]["player"].tolist()
-
-    col1, col2 = st.columns(2)
-    with col1:
-        jugador1 = st.selectbox("Jugador 1", jugadores1, key="jugador1")
-    with col2:
-        jugador2 = st.selectbox("Jugador 2", jugadores2, key="jugador2")
+        equipos = sorted(elo_df["club"].unique())
+        col1, col2 = st.columns(2)
 
-    anadir_tercero = st.checkbox("Añadir tercer jugador", key="cb_tercero")
-    jugador3 = None
-    if anadir_tercero:
-        col1, col2, col3 = st.columns(3)
         with col1:
-            equipo3 = st.selectbox("Equipo para Jugador 3", ["Todos"] + equipos, key="jugador3_equipo")
-        jugadores3 = elo_df["player"].tolist() if equipo3 == "Todos" else elo_df[elo_df["club"] == equipo3]["player"].tolist()
+            equipo1 = st.selectbox("Equipo para Jugador 1", ["Todos"] + equipos, key="jugador1_equipo")
         with col2:
-            jugador3 = st.selectbox("Jugador 3", jugadores3, key="jugador3")
+            equipo2 = st.selectbox("Equipo para Jugador 2", ["Todos"] + equipos, key="jugador2_equipo")
+
+        jugadores1 = elo_df["player"].tolist() if equipo1 == "Todos" else elo_df[elo_df["club"] == equipo1]["player"].tolist()
+        jugadores2 = elo_df["player"].tolist() if equipo2 == "Todos" else elo_df[elo_df["club"] == equipo2]["player"].tolist()
 
-    def mostrar_ficha(jugador, col_key):
-        info = elo_df[elo_df["player"] == jugador].iloc[0]
-        wins, losses = get_stats(jugador)
-        momentum = get_player_momentum(jugador, 5)
-        sets_stats = get_player_sets_stats(jugador)
-        st.markdown(f"### {jugador}")
-        st.write(f"**Equipo** : {info['club']}")
-        st.write(f"**Elo** : {info['elo']}")
-        st.write(f"**Victorias** : {wins} | **Derrotas** : {losses}")
-        recent_matches_df = get_player_recent_matches(jugador, 5)
-        if not recent_matches_df.empty:
-            st.subheader("📅 Últimos 5 partidos")
-            st.dataframe(style_match_results(recent_matches_df), use_container_width=True, hide_index=True)
-        st.write(f"**Sets**: Ø {sets_stats['avg_sets_won']} ganados / {sets_stats['avg_sets_lost']} perdidos")
-        col_btn1, col_btn2 = st.columns(2)
-        with col_btn1:
-            if st.button(f"📋 Perfil", key=f"profile_{col_key}"):
-                navigate_to_player(jugador)
-        with col_btn2:
-            if st.button(f"⚽ Equipo", key=f"team_{col_key}"):
-                navigate_to_team(info['club'])
-
-    if jugador3:
-        col1, col2, col3 = st.columns(3)
-        with col1:
-            mostrar_ficha(jugador1, "j1")
-        with col2:
-            mostrar_ficha(jugador2, "j2")
-        with col3:
-            mostrar_ficha(jugador3, "j3")
-    else:
         col1, col2 = st.columns(2)
         with col1:
-            mostrar_ficha(jugador1, "j1")
+            jugador1 = st.selectbox("Jugador 1", jugadores1, key="jugador1")
         with col2:
-            mostrar_ficha(jugador2, "j2")
+            jugador2 = st.selectbox("Jugador 2", jugadores2, key="jugador2")
 
-    st.subheader("🎯 Probabilidad ELO de victoria")
-    elo1 = elo_df[elo_df["player"] == jugador1]["elo"].iloc[0] if not elo_df[elo_df["player"] == jugador1].empty else INITIAL_ELO
-    elo2 = elo_df[elo_df["player"] == jugador2]["elo"].iloc[0] if not elo_df[elo_df["player"] == jugador2].empty else INITIAL_ELO
-    prob1 = elo_win_probability(elo1, elo2)
-    prob2 = 100 - prob1
-    col1, col2 = st.columns(2)
-    with col1:
-        st.metric(f"{jugador1} gana", f"{prob1}%")
-        st.progress(int(prob1))
-    with col2:
-        st.metric(f"{jugador2} gana", f"{prob2}%")
-        st.progress(int(prob2))
-    if jugador3:
-        elo3 = elo_df[elo_df["player"] == jugador3]["elo"].iloc[0] if not elo_df[elo_df["player"] == jugador3].empty else INITIAL_ELO
-        st.markdown("**Probabilidades adicionales:**")
-        col1, col2, col3 = st.columns(3)
+        anadir_tercero = st.checkbox("Añadir tercer jugador", key="cb_tercero")
+        jugador3 = None
+        if anadir_tercero:
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                equipo3 = st.selectbox("Equipo para Jugador 3", ["Todos"] + equipos, key="jugador3_equipo")
+            jugadores3 = elo_df["player"].tolist() if equipo3 == "Todos" else elo_df[elo_df["club"] == equipo3]["player"].tolist()
+            with col2:
+                jugador3 = st.selectbox("Jugador 3", jugadores3, key="jugador3")
+
+        def mostrar_ficha(jugador, col_key):
+            info = player_info[jugador]
+            wins, losses = get_stats(jugador)
+            momentum = get_player_momentum(jugador, 5)
+            sets_stats = get_player_sets_stats(jugador)
+            st.markdown(f"### {jugador}")
+            st.write(f"**Equipo** : {info.club}")
+            st.write(f"**Elo** : {info.elo}")
+            st.write(f"**Victorias** : {wins} | **Derrotas** : {losses}")
+            recent_matches_df = get_player_recent_matches(jugador, 5)
+            if not recent_matches_df.empty:
+                st.subheader("📅 Últimos 5 partidos")
+                st.dataframe(style_match_results(recent_matches_df), use_container_width=True, hide_index=True)
+            st.write(f"**Sets**: Ø {sets_stats['avg_sets_won']} ganados / {sets_stats['avg_sets_lost']} perdidos")
+            col_btn1, col_btn2 = st.columns(2)
+            with col_btn1:
+                if st.button(f"📋 Perfil", key=f"profile_{col_key}"):
+                    navigate_to_player(jugador)
+            with col_btn2:
+                if st.button(f"⚽ Equipo", key=f"team_{col_key}"):
+                    navigate_to_team(info.club)
+
+        if jugador3:
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                mostrar_ficha(jugador1, "j1")
+            with col2:
+                mostrar_ficha(jugador2, "j2")
+            with col3:
+                mostrar_ficha(jugador3, "j3")
+        else:
+            col1, col2 = st.columns(2)
+            with col1:
+                mostrar_ficha(jugador1, "j1")
+            with col2:
+                mostrar_ficha(jugador2, "j2")
+
+        st.subheader("🎯 Probabilidad ELO de victoria")
+        elo1 = player_elo(jugador1, INITIAL_ELO)
+        elo2 = player_elo(jugador2, INITIAL_ELO)
+        prob1 = elo_win_probability(elo1, elo2)
+        prob2 = 100 - prob1
+        col1, col2 = st.columns(2)
         with col1:
-            p = elo_win_probability(elo1, elo3)
-            st.write(f"**{jugador1}** vs **{jugador3}**: {p}% / {100-p}%")
+            st.metric(f"{jugador1} gana", f"{prob1}%")
+            st.progress(int(prob1))
         with col2:
-            p = elo_win_probability(elo2, elo3)
-            st.write(f"**{jugador2}** vs **{jugador3}**: {p}% / {100-p}%")
-
-    st.subheader("📈 Evolución Elo")
-    fig, ax = plt.subplots()
-    ax.plot(plot_elo(jugador1), label=jugador1)
-    ax.plot(plot_elo(jugador2), label=jugador2)
-    if jugador3:
-        ax.plot(plot_elo(jugador3), label=jugador3)
-    ax.set_ylabel("Elo")
-    ax.set_xlabel("Partidos")
-    ax.legend()
-    st.pyplot(fig)
-
-    st.subheader("🔁 Oponentes comunes")
-    comunes = get_common_opponents(jugador1, jugador2)
-    if comunes:
-        for o in comunes:
-            d1 = next((d for d in get_duels(jugador1) if d["rival"] == o), None)
-            d2 = next((d for d in get_duels(jugador2) if d["rival"] == o), None)
-            st.write(f"🆚 {o}")
-            st.write(f"• {jugador1} : {d1['marcador']} ({d1['resultado']})")
-            st.write(f"• {jugador2} : {d2['marcador']} ({d2['resultado']})")
-    else:
-        st.info("No hay oponentes comunes.")
-    
-    st.subheader("⚔️ Confrontaciones de años anteriores")
-    h2h_historical = get_historical_h2h(jugador1, jugador2, historical_matches)
-    if h2h_historical:
-        st.write(f"**Confrontaciones entre {jugador1} y {jugador2}:**")
-        for match in h2h_historical:
-            st.write(f"• {match['date']}: {match['player1']} {match['score1']} - {match['score2']} {match['player2']} ({match['league']})")
-    else:
-        st.info("No hay confrontaciones previas en el histórico")
+            st.metric(f"{jugador2} gana", f"{prob2}%")
+            st.progress(int(prob2))
+        if jugador3:
+            elo3 = player_elo(jugador3, INITIAL_ELO)
+            st.markdown("**Probabilidades adicionales:**")
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                p = elo_win_probability(elo1, elo3)
+                st.write(f"**{jugador1}** vs **{jugador3}**: {p}% / {100-p}%")
+            with col2:
+                p = elo_win_probability(elo2, elo3)
+                st.write(f"**{jugador2}** vs **{jugador3}**: {p}% / {100-p}%")
+
+        st.subheader("📈 Evolución Elo")
+        show_elo_chart([j for j in (jugador1, jugador2, jugador3) if j], "comparar")
+
+        st.subheader("🔁 Oponentes comunes")
+        comunes = get_common_opponents(jugador1, jugador2)
+        if comunes:
+            for o in comunes:
+                d1 = next((d for d in get_duels(jugador1) if d["rival"] == o), None)
+                d2 = next((d for d in get_duels(jugador2) if d["rival"] == o), None)
+                st.write(f"🆚 {o}")
+                st.write(f"• {jugador1} : {d1['marcador']} ({d1['resultado']})")
+                st.write(f"• {jugador2} : {d2['marcador']} ({d2['resultado']})")
+        else:
+            st.info("No hay oponentes comunes.")
+
+        st.subheader("⚔️ Confrontaciones de años anteriores")
+        h2h_historical = get_historical_h2h(jugador1, jugador2)
+        if h2h_historical:
+            st.write(f"**Confrontaciones entre {jugador1} y {jugador2}:**")
+            for match in h2h_historical:
+                st.write(f"• {match['date']}: {match['player1']} {match['score1']} - {match['score2']} {match['player2']} ({match['league']})")
+        else:
+            st.info("No hay confrontaciones previas en el histórico")
+
+    vista_comparar_jugadores()
 
 # 👥 Comparar equipos
 elif vista == "Comparar equipos":
+    elo_df = load_elo_data(ELO_FILE)
+    df_grupo = load_matches_by_group(grupo)
+
     st.subheader("👥 Comparación entre dos equipos")
     equipos = sorted(elo_df["club"].unique())
     
@@ -1287,10 +1520,10 @@ elif vista == "Comparar equipos":
     df1 = elo_df[elo_df["club"] == equipo1]
     df2 = elo_df[elo_df["club"] == equipo2]
 
-    momentum1 = get_team_momentum(df_grupo, equipo1, 5)
-    momentum2 = get_team_momentum(df_grupo, equipo2, 5)
-    sets1 = get_team_sets_stats(df_grupo, equipo1)
-    sets2 = get_team_sets_stats(df_grupo, equipo2)
+    momentum1 = get_team_momentum(equipo1, 5)
+    momentum2 = get_team_momentum(equipo2, 5)
+    sets1 = get_team_sets_stats(equipo1)
+    sets2 = get_team_sets_stats(equipo2)
 
     col1, col2 = st.columns(2)
     with col1:
@@ -1328,61 +1561,63 @@ elif vista == "Comparar equipos":
         if st.button(f"📊 Dashboard {equipo2}", key="dash_equipo2"):
             navigate_to_team(equipo2)
 elif vista == "Resumen por jugador":
-    st.subheader("📋 Perfil detallado del jugador")
+    elo_df = load_elo_data(ELO_FILE)
+    player_info = load_player_info(ELO_FILE)
+    duel_log: DuelLog = load_duel_log(MATCHES_FILE)
+    duel_games = load_duel_games(MATCHES_FILE)
 
-    jugadores = elo_df["player"].tolist()
-    
-    default_idx = 0
-    if st.session_state.nav_jugador and st.session_state.nav_jugador in jugadores:
-        default_idx = jugadores.index(st.session_state.nav_jugador)
-        st.session_state.nav_jugador = None
-    
-    jugador = st.selectbox("Selecciona un jugador", jugadores, index=default_idx, key="perfil_jugador")
+    @st.fragment
+    def vista_resumen_jugador():
+        st.subheader("📋 Perfil detallado del jugador")
 
-    info = elo_df[elo_df["player"] == jugador].iloc[0]
-    wins, losses = get_stats(jugador)
-    momentum = get_player_momentum(jugador, 5)
-    sets_stats = get_player_sets_stats(jugador)
+        jugadores = elo_df["player"].tolist()
 
-    st.markdown(f"### {jugador}")
-    col1, col2 = st.columns([3, 1])
-    with col1:
-        st.write(f"**Equipo**: {info['club']}")
-        st.write(f"**Elo actual**: {info['elo']}")
-        st.write(f"**Victorias**: {wins}")
-        st.write(f"**Derrotas**: {losses}")
-    with col2:
-        if st.button(f"📊 Ver equipo", key="team_button"):
-            navigate_to_team(info['club'])
-    
-    col1, col2, col3, col4 = st.columns(4)
-    with col1:
-        st.metric("Momentum (últimos 5)", f"{momentum['momentum']}%")
-    with col2:
-        st.metric("Partidos", len(get_duels(jugador)))
-    with col3:
-        st.metric("Ø Sets Ganados", sets_stats['avg_sets_won'])
-    with col4:
-        st.metric("Ø Sets Perdidos", sets_stats['avg_sets_lost'])
-    
-    recent_df = get_player_recent_matches(jugador, 5)
-    if not recent_df.empty:
-        st.subheader("📅 Últimos 5 partidos")
-        st.dataframe(style_match_results(recent_df), use_container_width=True, hide_index=True)
-
-    st.subheader("📈 Evolución Elo")
-    fig, ax = plt.subplots()
-    ax.plot(plot_elo(jugador), label=jugador, color="blue")
-    ax.set_ylabel("Elo")
-    ax.set_xlabel("Partidos")
-    ax.legend()
-    st.pyplot(fig)
-
-    st.subheader("📊 Historial de partidos")
-
-    historial = []
-    for match in matches:
-        for g in match.get("games", []):
+        default_idx = 0
+        if st.session_state.nav_jugador and st.session_state.nav_jugador in jugadores:
+            default_idx = jugadores.index(st.session_state.nav_jugador)
+            st.session_state.nav_jugador = None
+
+        jugador = st.selectbox("Selecciona un jugador", jugadores, index=default_idx, key="perfil_jugador")
+
+        info = player_info[jugador]
+        wins, losses = get_stats(jugador)
+        momentum = get_player_momentum(jugador, 5)
+        sets_stats = get_player_sets_stats(jugador)
+
+        st.markdown(f"### {jugador}")
+        col1, col2 = st.columns([3, 1])
+        with col1:
+            st.write(f"**Equipo**: {info.club}")
+            st.write(f"**Elo actual**: {info.elo}")
+            st.write(f"**Victorias**: {wins}")
+            st.write(f"**Derrotas**: {losses}")
+        with col2:
+            if st.button(f"📊 Ver equipo", key="team_button"):
+                navigate_to_team(info.club)
+
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("Momentum (últimos 5)", f"{momentum['momentum']}%")
+        with col2:
+            st.metric("Partidos", len(get_duels(jugador)))
+        with col3:
+            st.metric("Ø Sets Ganados", sets_stats['avg_sets_won'])
+        with col4:
+            st.metric("Ø Sets Perdidos", sets_stats['avg_sets_lost'])
+
+        recent_df = get_player_recent_matches(jugador, 5)
+        if not recent_df.empty:
+            st.subheader("📅 Últimos 5 partidos")
+            st.dataframe(style_match_results(recent_df), use_container_width=True, hide_index=True)
+
+        st.subheader("📈 Evolución Elo")
+        show_elo_chart([jugador], "perfil")
+
+        st.subheader("📊 Historial de partidos")
+
+        historial = []
+        for e in duel_log.for_player(jugador):
+            match, g = duel_games[e.seq]
             match_data = extract_player_match_data(g, match, jugador)
             if match_data:
                 historial.append(match_data)
@@ -1390,27 +1625,31 @@ elif vista == "Resumen por jugador":
 
 
 
-    df_historial = pd.DataFrame(historial)
-    df_historial.index += 1
-    st.write("📊 verde = ganado, rojo = perdido")
-    st.write(df_historial.to_html(escape=False, index=True), unsafe_allow_html=True)
-    
-    if historial:
-        st.subheader("📥 Exportar historial")
-        df_export = pd.DataFrame(historial).drop(columns=["Sets"], errors="ignore")
-        col1, col2 = st.columns(2)
-        with col1:
-            st.download_button("⬇️ Descargar CSV", data=df_export.to_csv(index=False), file_name=f"historial_{jugador}.csv", mime="text/csv")
-        with col2:
-            st.download_button("⬇️ Descargar Excel", data=df_to_excel(df_export), file_name=f"historial_{jugador}.xlsx", mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+        df_historial = pd.DataFrame(historial)
+        df_historial.index += 1
+        st.write("📊 verde = ganado, rojo = perdido")
+        st.write(df_historial.to_html(escape=False, index=True), unsafe_allow_html=True)
 
-    st.subheader("📅 Histórico de años anteriores")
-    df_historical = get_historical_matches_by_player(jugador, historical_matches)
-    if not df_historical.empty:
-        st.dataframe(df_historical, use_container_width=True, hide_index=True)
-    else:
-        st.info("No hay datos históricos disponibles para este jugador")
+        if historial:
+            st.subheader("📥 Exportar historial")
+            df_export = pd.DataFrame(historial).drop(columns=["Sets"], errors="ignore")
+            col1, col2 = st.columns(2)
+            with col1:
+                st.download_button("⬇️ Descargar CSV", data=df_export.to_csv(index=False), file_name=f"historial_{jugador}.csv", mime="text/csv")
+            with col2:
+                st.download_button("⬇️ Descargar Excel", data=df_to_excel(df_export), file_name=f"historial_{jugador}.xlsx", mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+
+        st.subheader("📅 Histórico de años anteriores")
+        df_historical = get_historical_matches_by_player(jugador)
+        if not df_historical.empty:
+            st.dataframe(df_historical, use_container_width=True, hide_index=True)
+        else:
+            st.info("No hay datos históricos disponibles para este jugador")
+
+    vista_resumen_jugador()
 elif vista == "Ranking y H2H":
+    elo_df = load_elo_data(ELO_FILE)
+
     st.header("🏆 Ranking Global del Grupo")
     
     leaderboard = get_global_leaderboard()
@@ -1425,43 +1664,8 @@ elif vista == "Ranking y H2H":
     
     st.subheader("📊 Tabla de Posiciones")
     
-    st.write("*Haz clic en un jugador para ver su perfil detallado*")
-    
-    col1, col2, col3, col4, col5, col6, col7 = st.columns([1, 3, 2, 1, 1, 1, 2])
-    with col1:
-        st.write("**#**")
-    with col2:
-        st.write("**Jugador**")
-    with col3:
-        st.write("**Equipo**")
-    with col4:
-        st.write("**Elo**")
-    with col5:
-        st.write("**V**")
-    with col6:
-        st.write("**D**")
-    with col7:
-        st.write("**% Victoria**")
-    
-    st.divider()
-    
-    for idx, row in leaderboard.iterrows():
-        col1, col2, col3, col4, col5, col6, col7 = st.columns([1, 3, 2, 1, 1, 1, 2])
-        with col1:
-            st.write(f"**{row['Ranking']}**")
-        with col2:
-            if st.button(f"{row['Jugador']}", key=f"rank_player_{idx}"):
-                navigate_to_player(row['Jugador'])
-        with col3:
-            st.write(row['Equipo'])
-        with col4:
-            st.write(f"{row['Elo']}")
-        with col5:
-            st.write(f"{row['V']}")
-        with col6:
-            st.write(f"{row['D']}")
-        with col7:
-            st.write(row['% Victoria'])
+    st.write("*Selecciona una fila para ver el perfil del jugador*")
+    player_selection_table(leaderboard, "Jugador", LEADERBOARD_COLUMNS, key="ranking_tabla")
     
     st.subheader("🎯 Filtros")
     equipo_filter = st.selectbox("Filtrar por equipo", ["Todos"] + sorted(elo_df["club"].unique()), key="ranking_equipo")
@@ -1469,50 +1673,13 @@ elif vista == "Ranking y H2H":
     if equipo_filter != "Todos":
         filtered_lb = leaderboard[leaderboard["Equipo"] == equipo_filter]
         st.write(f"**Jugadores de {equipo_filter}:**")
-        
-        col1, col2, col3, col4, col5, col6, col7 = st.columns([1, 3, 2, 1, 1, 1, 2])
-        with col1:
-            st.write("**#**")
-        with col2:
-            st.write("**Jugador**")
-        with col3:
-            st.write("**Equipo**")
-        with col4:
-            st.write("**Elo**")
-        with col5:
-            st.write("**V**")
-        with col6:
-            st.write("**D**")
-        with col7:
-            st.write("**% Victoria**")
-        
-        st.divider()
-        
-        for idx, row in filtered_lb.iterrows():
-            col1, col2, col3, col4, col5, col6, col7 = st.columns([1, 3, 2, 1, 1, 1, 2])
-            with col1:
-                st.write(f"**{row['Ranking']}**")
-            with col2:
-                if st.button(f"{row['Jugador']}", key=f"filter_player_{idx}"):
-                    navigate_to_player(row['Jugador'])
-            with col3:
-                st.write(row['Equipo'])
-            with col4:
-                st.write(f"{row['Elo']}")
-            with col5:
-                st.write(f"{row['V']}")
-            with col6:
-                st.write(f"{row['D']}")
-            with col7:
-                st.write(row['% Victoria'])
+        player_selection_table(filtered_lb, "Jugador", LEADERBOARD_COLUMNS, key="ranking_filtro_tabla")
 
     st.divider()
     st.header("⚔️ Matriz Head-to-Head")
     
     st.info("Muestra el record de cada jugador vs otros jugadores. Formato: Victorias-Derrotas")
     
-    h2h_df = build_h2h_matrix(df_all)
-    
     st.subheader("📥 Exportar Ranking")
     col1, col2 = st.columns(2)
     with col1:
@@ -1540,7 +1707,10 @@ elif vista == "Ranking y H2H":
     st.divider()
 
     st.subheader("Matriz Completa")
-    st.dataframe(h2h_df, use_container_width=True)
+    # The matrix is only built when asked for: an expander would still run its body
+    if st.toggle("Mostrar matriz completa", key="h2h_matriz"):
+        h2h_df = load_h2h_matrix()
+        st.dataframe(h2h_df, use_container_width=True)
     
     st.subheader("🔍 Análisis Individual")
     default_h2h_idx = 0
@@ -1552,516 +1722,503 @@ elif vista == "Ranking y H2H":
     
     if jugador:
         duels = get_duels(jugador)
-        rivals_data = []
         
-        for d in duels:
-            rival = d["rival"]
-            opponent_info = elo_df[elo_df["player"] == rival]
-            opponent_elo = opponent_info["elo"].iloc[0] if not opponent_info.empty else 0
-            
-            rivals_data.append({
-                "Rival": rival,
-                "Elo": opponent_elo,
-                "Marcador": d["marcador"],
-                "Resultado": d["resultado"]
-            })
-        
-        if rivals_data:
-            rivals_df = pd.DataFrame(rivals_data).sort_values("Elo", ascending=False)
-            st.write("*Haz clic en un rival para ver su perfil*")
-            for idx, row in rivals_df.iterrows():
-                col1, col2, col3, col4, col5 = st.columns([2, 1, 1, 1, 1])
-                with col1:
-                    if st.button(f"{row['Rival']}", key=f"rival_player_{idx}"):
-                        navigate_to_player(row['Rival'])
-                with col2:
-                    st.write(f"{row['Elo']}")
-                with col3:
-                    st.write(f"{row['Marcador']}")
-                with col4:
-                    st.write(row['Resultado'])
-                with col5:
-                    pass
+        if duels:
+            rivals_df = pd.DataFrame(duels).rename(columns={"rival": "Rival", "marcador": "Marcador", "resultado": "Resultado"})
+            rivals_df["Elo"] = map_player_elo(rivals_df["Rival"], 0)
+            rivals_df = rivals_df.sort_values("Elo", ascending=False)
+            st.write("*Selecciona un rival para ver su perfil*")
+            player_selection_table(rivals_df, "Rival", ["Rival", "Elo", "Marcador", "Resultado"], key="h2h_rivales_tabla")
 
 # 📅 Calendario de partidos
 elif vista == "Calendario de partidos":
+    df_grupo = load_matches_by_group(grupo)
+    matches = load_matches(MATCHES_FILE)
+
     st.header("📅 Calendario de partidos")
 
     if df_grupo.empty:
         st.warning("No hay datos disponibles.")
         st.stop()
 
-    equipo_filtro = st.selectbox(
-        "Filtrar calendario por equipo",
-        ["Todos"] + sorted(set(m["home_team"] for m in matches) | set(m["away_team"] for m in matches)),
-        key="filtro_equipo"
-    )
+    @st.fragment
+    def vista_calendario():
+        equipo_filtro = st.selectbox(
+            "Filtrar calendario por equipo",
+            ["Todos"] + sorted(set(m["home_team"] for m in matches) | set(m["away_team"] for m in matches)),
+            key="filtro_equipo"
+        )
 
-    partidos = df_grupo.copy()
+        partidos = df_grupo.copy()
 
-# --- Filtre par equipo ---
-    if equipo_filtro != "Todos":
-        partidos = partidos[
-            (partidos["home_team"] == equipo_filtro) |
-            (partidos["away_team"] == equipo_filtro)
-        ]
+        # --- Filtre par equipo ---
+        if equipo_filtro != "Todos":
+            partidos = partidos[
+                (partidos["home_team"] == equipo_filtro) |
+                (partidos["away_team"] == equipo_filtro)
+            ]
 
-    partidos = partidos[["match_id", "date", "home_team", "away_team"]].copy()
+        partidos = partidos[["match_id", "date", "home_team", "away_team"]].copy()
 
-    # Label lisible
-    partidos["label"] = partidos.apply(
-        lambda r: f"{r['date']} – {r['home_team']} vs {r['away_team']}",
-        axis=1
-    )
+        # Label lisible
+        partidos["label"] = partidos.apply(
+            lambda r: f"{r['date']} – {r['home_team']} vs {r['away_team']}",
+            axis=1
+        )
 
-    selected_label = st.selectbox("Selecciona un partido", partidos["label"].tolist())
-    selected_match_id = partidos[partidos["label"] == selected_label].iloc[0]["match_id"]
+        selected_label = st.selectbox("Selecciona un partido", partidos["label"].tolist())
+        selected_match_id = partidos[partidos["label"] == selected_label].iloc[0]["match_id"]
 
-    selected_match = df_grupo[df_grupo["match_id"] == selected_match_id].iloc[0]
+        selected_match = df_grupo[df_grupo["match_id"] == selected_match_id].iloc[0]
 
-    st.subheader("📌 Detalles del partido")
+        st.subheader("📌 Detalles del partido")
 
-    st.write(f"**Fecha:** {selected_match['date']}")
-    st.write(f"**Equipos:** {selected_match['home_team']} vs {selected_match['away_team']}")
+        st.write(f"**Fecha:** {selected_match['date']}")
+        st.write(f"**Equipos:** {selected_match['home_team']} vs {selected_match['away_team']}")
 
-    # MATCH FINALISÉ
-    games = selected_match.get("games", None)
+        # MATCH FINALISÉ
+        games = selected_match.get("games", None)
 
-    if isinstance(games, list) and len(games) > 0:
-        st.success(f"Acta disponible")
+        if isinstance(games, list) and len(games) > 0:
+            st.success(f"Acta disponible")
 
-        display_match_duels_acta(games, selected_match["home_team"], selected_match["away_team"])
-        
-        has_doble_home = any(g["home_code"] == "ABC" for g in games)
-        has_doble_away = any(g["away_code"] == "XYZ" for g in games)
-        
-        if has_doble_home or has_doble_away:
-            st.subheader("⚠️ Dobles en este partido")
-            if has_doble_home:
-                st.warning(f"{selected_match['home_team']} jugó doble (ABC).")
-            if has_doble_away:
-                st.warning(f"{selected_match['away_team']} jugó doble (XYZ).")
+            display_match_duels_acta(games, selected_match["home_team"], selected_match["away_team"])
 
-    else:
-        st.header("🔮 Análisis de Partido Futuro")
+            has_doble_home = any(g["home_code"] == "ABC" for g in games)
+            has_doble_away = any(g["away_code"] == "XYZ" for g in games)
 
-        home = selected_match["home_team"]
-        away = selected_match["away_team"]
+            if has_doble_home or has_doble_away:
+                st.subheader("⚠️ Dobles en este partido")
+                if has_doble_home:
+                    st.warning(f"{selected_match['home_team']} jugó doble (ABC).")
+                if has_doble_away:
+                    st.warning(f"{selected_match['away_team']} jugó doble (XYZ).")
 
-        st.subheader("🔍 Análisis completo del partido")
+        else:
+            elo_df = load_elo_data(ELO_FILE)
 
-        doble_home = any(
-            g.get("home_code") in {"ABC"} for g in selected_match.get("games", [])
-        )
-        doble_away = any(
-            g.get("away_code") in {"XYZ"} for g in selected_match.get("games", [])
-        )
+            st.header("🔮 Análisis de Partido Futuro")
 
-        if doble_home or doble_away:
-            st.subheader("⚠️ Presencia de dobles")
-            if doble_home:
-                st.warning(f"{home} ha alineado doble en partidos anteriores.")
-            if doble_away:
-                st.warning(f"{away} ha alineado doble en partidos anteriores.")
+            home = selected_match["home_team"]
+            away = selected_match["away_team"]
 
-        st.subheader("👥 Jugadores habituales")
+            st.subheader("🔍 Análisis completo del partido")
 
-        reg_home = get_team_regular_players(home).index.tolist()
-        reg_away = get_team_regular_players(away).index.tolist()
+            doble_home = any(
+                g.get("home_code") in {"ABC"} for g in selected_match.get("games", [])
+            )
+            doble_away = any(
+                g.get("away_code") in {"XYZ"} for g in selected_match.get("games", [])
+            )
 
-        df_home_players = elo_df[elo_df["player"].isin(reg_home)]
-        df_away_players = elo_df[elo_df["player"].isin(reg_away)]
+            if doble_home or doble_away:
+                st.subheader("⚠️ Presencia de dobles")
+                if doble_home:
+                    st.warning(f"{home} ha alineado doble en partidos anteriores.")
+                if doble_away:
+                    st.warning(f"{away} ha alineado doble en partidos anteriores.")
 
-        tabla_home = build_team_comparison_table(df_home_players)
-        tabla_away = build_team_comparison_table(df_away_players)
+            st.subheader("👥 Jugadores habituales")
 
-        col1, col2 = st.columns(2)
+            reg_home = get_team_regular_players(home).index.tolist()
+            reg_away = get_team_regular_players(away).index.tolist()
 
-        with col1:
-            st.markdown(f"### {home}")
-            st.dataframe(tabla_home, use_container_width=True)
+            df_home_players = elo_df[elo_df["player"].isin(reg_home)]
+            df_away_players = elo_df[elo_df["player"].isin(reg_away)]
 
-        with col2:
-            st.markdown(f"### {away}")
-            st.dataframe(tabla_away, use_container_width=True)
+            tabla_home = build_team_comparison_table(df_home_players)
+            tabla_away = build_team_comparison_table(df_away_players)
 
+            col1, col2 = st.columns(2)
 
+            with col1:
+                st.markdown(f"### {home}")
+                st.dataframe(tabla_home, use_container_width=True)
 
-        diff_home = get_team_sets_average_diff(df_grupo, home)
-        diff_away = get_team_sets_average_diff(df_grupo, away)
+            with col2:
+                st.markdown(f"### {away}")
+                st.dataframe(tabla_away, use_container_width=True)
 
-        st.subheader("📊 Estadísticas de Sets")
-        col1, col2 = st.columns(2)
 
-        home_sets_stats = get_team_sets_stats(df_grupo, home)
-        away_sets_stats = get_team_sets_stats(df_grupo, away)
 
-        with col1:
-            st.markdown(f"### {home}")
-            st.metric("Matchs jugados", home_sets_stats['matches'])
-            st.metric("Sets ganados (promedio)", f"{home_sets_stats['avg_sets_won']:.2f}", 
-                      delta=f"{home_sets_stats['total_sets_won']} sobre {home_sets_stats['total_sets_won'] + home_sets_stats['total_sets_lost']}")
-            st.metric("Sets perdidos (promedio)", f"{home_sets_stats['avg_sets_lost']:.2f}",
-                      delta=f"{home_sets_stats['total_sets_lost']} sobre {home_sets_stats['total_sets_won'] + home_sets_stats['total_sets_lost']}")
+            diff_home = get_team_sets_average_diff(home)
+            diff_away = get_team_sets_average_diff(away)
 
-        with col2:
-            st.markdown(f"### {away}")
-            st.metric("Matchs jugados", away_sets_stats['matches'])
-            st.metric("Sets ganados (promedio)", f"{away_sets_stats['avg_sets_won']:.2f}",
-                      delta=f"{away_sets_stats['total_sets_won']} sobre {away_sets_stats['total_sets_won'] + away_sets_stats['total_sets_lost']}")
-            st.metric("Sets perdidos (promedio)", f"{away_sets_stats['avg_sets_lost']:.2f}",
-                      delta=f"{away_sets_stats['total_sets_lost']} sobre {away_sets_stats['total_sets_won'] + away_sets_stats['total_sets_lost']}")
+            st.subheader("📊 Estadísticas de Sets")
+            col1, col2 = st.columns(2)
 
+            home_sets_stats = get_team_sets_stats(home)
+            away_sets_stats = get_team_sets_stats(away)
 
-        st.subheader("📈 Forma reciente (últimos 5)")
-        col1, col2 = st.columns(2)
-        
-        home_recent_df = get_team_recent_matches(df_grupo, home, 5)
-        away_recent_df = get_team_recent_matches(df_grupo, away, 5)
-        
-        with col1:
-            st.markdown(f"**{home}**")
-            if not home_recent_df.empty:
-                st.dataframe(style_match_results(home_recent_df), use_container_width=True, hide_index=True)
-            else:
-                st.info("Sin partidos finalizados")
-        
-        with col2:
-            st.markdown(f"**{away}**")
-            if not away_recent_df.empty:
-                st.dataframe(style_match_results(away_recent_df), use_container_width=True, hide_index=True)
-            else:
-                st.info("Sin partidos finalizados")
+            with col1:
+                st.markdown(f"### {home}")
+                st.metric("Matchs jugados", home_sets_stats['matches'])
+                st.metric("Sets ganados (promedio)", f"{home_sets_stats['avg_sets_won']:.2f}", 
+                          delta=f"{home_sets_stats['total_sets_won']} sobre {home_sets_stats['total_sets_won'] + home_sets_stats['total_sets_lost']}")
+                st.metric("Sets perdidos (promedio)", f"{home_sets_stats['avg_sets_lost']:.2f}",
+                          delta=f"{home_sets_stats['total_sets_lost']} sobre {home_sets_stats['total_sets_won'] + home_sets_stats['total_sets_lost']}")
+
+            with col2:
+                st.markdown(f"### {away}")
+                st.metric("Matchs jugados", away_sets_stats['matches'])
+                st.metric("Sets ganados (promedio)", f"{away_sets_stats['avg_sets_won']:.2f}",
+                          delta=f"{away_sets_stats['total_sets_won']} sobre {away_sets_stats['total_sets_won'] + away_sets_stats['total_sets_lost']}")
+                st.metric("Sets perdidos (promedio)", f"{away_sets_stats['avg_sets_lost']:.2f}",
+                          delta=f"{away_sets_stats['total_sets_lost']} sobre {away_sets_stats['total_sets_won'] + away_sets_stats['total_sets_lost']}")
 
-        st.subheader("📋 Tabla Comparativa")
-        home_elo_avg = get_team_elo_average(df_grupo, home)
-        away_elo_avg = get_team_elo_average(df_grupo, away)
-        
-        home_trend = get_team_recent_form_trend(df_grupo, home, 10)
-        away_trend = get_team_recent_form_trend(df_grupo, away, 10)
-        
-        home_win_rate = round(sum(home_trend) / len(home_trend) * 100, 1) if home_trend else 0.0
-        away_win_rate = round(sum(away_trend) / len(away_trend) * 100, 1) if away_trend else 0.0
-
-        comparison_data = {
-            "Métrica": ["Elo promedio", "Sets ganados (prom)", "Sets perdidos (prom)", "Win Rate (últimos 10)", "Matchs jugados"],
-            home: [
-                f"{home_elo_avg:.0f}",
-                f"{home_sets_stats['avg_sets_won']:.2f}",
-                f"{home_sets_stats['avg_sets_lost']:.2f}",
-                f"{home_win_rate}%",
-                home_sets_stats['matches']
-            ],
-            away: [
-                f"{away_elo_avg:.0f}",
-                f"{away_sets_stats['avg_sets_won']:.2f}",
-                f"{away_sets_stats['avg_sets_lost']:.2f}",
-                f"{away_win_rate}%",
-                away_sets_stats['matches']
-            ]
-        }
 
-        comparison_df = pd.DataFrame(comparison_data)
-        st.dataframe(comparison_df, use_container_width=True, hide_index=True)
+            st.subheader("📈 Forma reciente (últimos 5)")
+            col1, col2 = st.columns(2)
 
-        st.subheader("💡 Análisis de Fuerzas y Debilidades")
-        analysis = get_team_strengths_weaknesses(df_grupo, home, away)
+            home_recent_df = get_team_recent_matches(df_grupo, home, 5)
+            away_recent_df = get_team_recent_matches(df_grupo, away, 5)
 
-        col1, col2 = st.columns(2)
+            with col1:
+                st.markdown(f"**{home}**")
+                if not home_recent_df.empty:
+                    st.dataframe(style_match_results(home_recent_df), use_container_width=True, hide_index=True)
+                else:
+                    st.info("Sin partidos finalizados")
 
-        with col1:
-            st.markdown(f"### 💪 {home}")
-            st.markdown("**Fortalezas:**")
-            for strength in analysis[f"{home}_strengths"]:
-                st.markdown(f"- {strength}")
-            st.markdown("**Debilidades:**")
-            for weakness in analysis[f"{home}_weaknesses"]:
-                st.markdown(f"- {weakness}")
+            with col2:
+                st.markdown(f"**{away}**")
+                if not away_recent_df.empty:
+                    st.dataframe(style_match_results(away_recent_df), use_container_width=True, hide_index=True)
+                else:
+                    st.info("Sin partidos finalizados")
+
+            st.subheader("📋 Tabla Comparativa")
+            home_elo_avg = get_team_elo_average(home)
+            away_elo_avg = get_team_elo_average(away)
+
+            home_trend = get_team_recent_form_trend(home, 10)
+            away_trend = get_team_recent_form_trend(away, 10)
+
+            home_win_rate = round(sum(home_trend) / len(home_trend) * 100, 1) if home_trend else 0.0
+            away_win_rate = round(sum(away_trend) / len(away_trend) * 100, 1) if away_trend else 0.0
+
+            comparison_data = {
+                "Métrica": ["Elo promedio", "Sets ganados (prom)", "Sets perdidos (prom)", "Win Rate (últimos 10)", "Matchs jugados"],
+                home: [
+                    f"{home_elo_avg:.0f}",
+                    f"{home_sets_stats['avg_sets_won']:.2f}",
+                    f"{home_sets_stats['avg_sets_lost']:.2f}",
+                    f"{home_win_rate}%",
+                    home_sets_stats['matches']
+                ],
+                away: [
+                    f"{away_elo_avg:.0f}",
+                    f"{away_sets_stats['avg_sets_won']:.2f}",
+                    f"{away_sets_stats['avg_sets_lost']:.2f}",
+                    f"{away_win_rate}%",
+                    away_sets_stats['matches']
+                ]
+            }
+
+            comparison_df = pd.DataFrame(comparison_data)
+            st.dataframe(comparison_df, use_container_width=True, hide_index=True)
+
+            st.subheader("💡 Análisis de Fuerzas y Debilidades")
+            analysis = get_team_strengths_weaknesses(home, away)
 
-        with col2:
-            st.markdown(f"### 💪 {away}")
-            st.markdown("**Fortalezas:**")
-            for strength in analysis[f"{away}_strengths"]:
-                st.markdown(f"- {strength}")
-            st.markdown("**Debilidades:**")
-            for weakness in analysis[f"{away}_weaknesses"]:
-                st.markdown(f"- {weakness}")
+            col1, col2 = st.columns(2)
 
-        comunes = get_team_opponents(df_grupo, home).intersection(get_team_opponents(df_grupo, away))
+            with col1:
+                st.markdown(f"### 💪 {home}")
+                st.markdown("**Fortalezas:**")
+                for strength in analysis[f"{home}_strengths"]:
+                    st.markdown(f"- {strength}")
+                st.markdown("**Debilidades:**")
+                for weakness in analysis[f"{home}_weaknesses"]:
+                    st.markdown(f"- {weakness}")
 
-        st.subheader("🤝 Rivales comunes")
-        if comunes:
-            st.write(comunes)
-        else:
-            st.write("Ninguno")
+            with col2:
+                st.markdown(f"### 💪 {away}")
+                st.markdown("**Fortalezas:**")
+                for strength in analysis[f"{away}_strengths"]:
+                    st.markdown(f"- {strength}")
+                st.markdown("**Debilidades:**")
+                for weakness in analysis[f"{away}_weaknesses"]:
+                    st.markdown(f"- {weakness}")
+
+            comunes = get_team_opponents(df_grupo, home).intersection(get_team_opponents(df_grupo, away))
+
+            st.subheader("🤝 Rivales comunes")
+            if comunes:
+                st.write(comunes)
+            else:
+                st.write("Ninguno")
+
+            st.subheader("📂 Partidos finalizados contra rivales comunes")
 
-        st.subheader("📂 Partidos finalizados contra rivales comunes")
+            df_home_f = df_grupo[
+                ((df_grupo["home_team"] == home) | (df_grupo["away_team"] == home)) &
+                (df_grupo["status"] == "Finalizado")
+            ]
 
-        df_home_f = df_grupo[
-            ((df_grupo["home_team"] == home) | (df_grupo["away_team"] == home)) &
-            (df_grupo["status"] == "Finalizado")
-        ]
+            df_away_f = df_grupo[
+                ((df_grupo["home_team"] == away) | (df_grupo["away_team"] == away)) &
+                (df_grupo["status"] == "Finalizado")
+            ]
 
-        df_away_f = df_grupo[
-            ((df_grupo["home_team"] == away) | (df_grupo["away_team"] == away)) &
-            (df_grupo["status"] == "Finalizado")
-        ]
+            def adversarios(df: pd.DataFrame, equipo: str) -> Set[str]:
+                r = []
+                for _, p in df.iterrows():
+                    if p["home_team"] == equipo:
+                        r.append(p["away_team"])
+                    else:
+                        r.append(p["home_team"])
+                return set(r)
 
-        def adversarios(df: pd.DataFrame, equipo: str) -> Set[str]:
-            r = []
-            for _, p in df.iterrows():
-                if p["home_team"] == equipo:
-                    r.append(p["away_team"])
-                else:
-                    r.append(p["home_team"])
-            return set(r)
+            adv_home = adversarios(df_home_f, home)
+            adv_away = adversarios(df_away_f, away)
 
-        adv_home = adversarios(df_home_f, home)
-        adv_away = adversarios(df_away_f, away)
+            comunes = adv_home.intersection(adv_away)
 
-        comunes = adv_home.intersection(adv_away)
+            if not comunes:
+                st.write("No hay rivales comunes.")
+            else:
+                for rival in sorted(comunes):
+                    st.markdown(f"### 🤝 Rival común: **{rival}**")
 
-        if not comunes:
-            st.write("No hay rivales comunes.")
-        else:
-            for rival in sorted(comunes):
-                st.markdown(f"### 🤝 Rival común: **{rival}**")
+                    col1, col2 = st.columns(2)
 
-                col1, col2 = st.columns(2)
-                
-                home_matches_df = get_team_matches_vs_opponent(df_grupo, home, rival)
-                away_matches_df = get_team_matches_vs_opponent(df_grupo, away, rival)
+                    home_matches_df = get_team_matches_vs_opponent(df_grupo, home, rival)
+                    away_matches_df = get_team_matches_vs_opponent(df_grupo, away, rival)
 
-                with col1:
-                    st.markdown(f"**{home}** vs {rival}")
-                    if not home_matches_df.empty:
-                        st.dataframe(style_match_results(home_matches_df), use_container_width=True, hide_index=True)
-                    else:
-                        st.info("Sin partidos")
+                    with col1:
+                        st.markdown(f"**{home}** vs {rival}")
+                        if not home_matches_df.empty:
+                            st.dataframe(style_match_results(home_matches_df), use_container_width=True, hide_index=True)
+                        else:
+                            st.info("Sin partidos")
 
-                with col2:
-                    st.markdown(f"**{away}** vs {rival}")
-                    if not away_matches_df.empty:
-                        st.dataframe(style_match_results(away_matches_df), use_container_width=True, hide_index=True)
-                    else:
-                        st.info("Sin partidos")
+                    with col2:
+                        st.markdown(f"**{away}** vs {rival}")
+                        if not away_matches_df.empty:
+                            st.dataframe(style_match_results(away_matches_df), use_container_width=True, hide_index=True)
+                        else:
+                            st.info("Sin partidos")
 
-                st.markdown("---")
+                    st.markdown("---")
 
-        st.subheader("⚔️ Enfrentamientos directos entre jugadores")
+            st.subheader("⚔️ Enfrentamientos directos entre jugadores")
 
-        jugadores_H = get_team_regular_players(home).head(3).index.tolist()
-        jugadores_A = get_team_regular_players(away).head(3).index.tolist()
+            jugadores_H = get_team_regular_players(home).head(3).index.tolist()
+            jugadores_A = get_team_regular_players(away).head(3).index.tolist()
 
-        for j1 in jugadores_H:
-            for j2 in jugadores_A:
-                duelos = get_h2h_matches(df_grupo, j1, j2)
-                if duelos:
-                    st.markdown(f"**{j1} vs {j2}**")
-                    for d in duelos:
-                        st.write("• " + d)
+            for j1 in jugadores_H:
+                for j2 in jugadores_A:
+                    duelos = get_h2h_matches(df_grupo, j1, j2)
+                    if duelos:
+                        st.markdown(f"**{j1} vs {j2}**")
+                        for d in duelos:
+                            st.write("• " + d)
 
 
-        st.subheader("🔮 Predicción (basada en Elo promedio)")
+            st.subheader("🔮 Predicción (basada en Elo promedio)")
+
+            elo_home = get_team_elo_average(home)
+            elo_away = get_team_elo_average(away)
+            if elo_home == 0 or elo_away == 0:
+                st.info("No hay datos suficientes de Elo para calcular una predicción.")
+            else:
+                prob_home = elo_win_probability(elo_home, elo_away)
+                prob_away = 100 - prob_home
+                col1, col2 = st.columns(2)
+                with col1:
+                    color = "normal" if prob_home >= prob_away else "inverse"
+                    st.metric(f"🏠 {home}", f"{prob_home}%", delta=f"Elo {elo_home:.0f}")
+                    st.progress(int(prob_home))
+                with col2:
+                    st.metric(f"✈️ {away}", f"{prob_away}%", delta=f"Elo {elo_away:.0f}")
+                    st.progress(int(prob_away))
+                if prob_home > prob_away:
+                    st.success(f"📌 **Favorito**: {home} ({prob_home}% de probabilidad de victoria)")
+                elif prob_away > prob_home:
+                    st.success(f"📌 **Favorito**: {away} ({prob_away}% de probabilidad de victoria)")
+                else:
+                    st.warning("📌 Predicción: Partido perfectamente equilibrado (50/50)")
+
+            st.subheader("⚔️ Probabilidades por enfrentamiento individual")
+            reg_home_prob = get_team_regular_players(home).head(3).index.tolist()
+            reg_away_prob = get_team_regular_players(away).head(3).index.tolist()
+            if reg_home_prob and reg_away_prob:
+                prob_rows = []
+                for jh in reg_home_prob:
+                    elo_jh = player_elo(jh, INITIAL_ELO)
+                    for ja in reg_away_prob:
+                        elo_ja = player_elo(ja, INITIAL_ELO)
+                        p = elo_win_probability(elo_jh, elo_ja)
+                        prob_rows.append({
+                            f"{home}": jh,
+                            f"Elo {home}": int(elo_jh),
+                            f"{away}": ja,
+                            f"Elo {away}": int(elo_ja),
+                            f"% Victoria {home}": f"{p}%",
+                            f"% Victoria {away}": f"{100-p}%"
+                        })
+                if prob_rows:
+                    st.dataframe(pd.DataFrame(prob_rows), use_container_width=True, hide_index=True)
+
+            st.subheader("🌟 Jugadores destacados")
+
+            reg_home = get_team_regular_players(home)
+            reg_away = get_team_regular_players(away)
+
+            if not reg_home.empty:
+                home_players_elo = elo_df[elo_df["player"].isin(reg_home.index)]
+                if not home_players_elo.empty:
+                    best_home = home_players_elo.sort_values("elo", ascending=False).iloc[0]
+                    st.write(f"⭐ Mejor jugador de **{home}**: {best_home['player']} (Elo {best_home['elo']})")
+
+            if not reg_away.empty:
+                away_players_elo = elo_df[elo_df["player"].isin(reg_away.index)]
+                if not away_players_elo.empty:
+                    best_away = away_players_elo.sort_values("elo", ascending=False).iloc[0]
+                    st.write(f"⭐ Mejor jugador de **{away}**: {best_away['player']} (Elo {best_away['elo']})")
+
+            st.divider()
 
-        elo_home = get_team_elo_average(df_grupo, home)
-        elo_away = get_team_elo_average(df_grupo, away)
-        if elo_home == 0 or elo_away == 0:
-            st.info("No hay datos suficientes de Elo para calcular una predicción.")
-        else:
-            prob_home = elo_win_probability(elo_home, elo_away)
-            prob_away = 100 - prob_home
             col1, col2 = st.columns(2)
             with col1:
-                color = "normal" if prob_home >= prob_away else "inverse"
-                st.metric(f"🏠 {home}", f"{prob_home}%", delta=f"Elo {elo_home:.0f}")
-                st.progress(int(prob_home))
+                if st.button("📊 Comparación Completa de Equipos", use_container_width=True):
+                    st.session_state.nav_vista = "Comparar equipos"
+                    st.session_state.nav_equipo1 = home
+                    st.session_state.nav_equipo2 = away
+                    st.rerun()
             with col2:
-                st.metric(f"✈️ {away}", f"{prob_away}%", delta=f"Elo {elo_away:.0f}")
-                st.progress(int(prob_away))
-            if prob_home > prob_away:
-                st.success(f"📌 **Favorito**: {home} ({prob_home}% de probabilidad de victoria)")
-            elif prob_away > prob_home:
-                st.success(f"📌 **Favorito**: {away} ({prob_away}% de probabilidad de victoria)")
-            else:
-                st.warning("📌 Predicción: Partido perfectamente equilibrado (50/50)")
-
-        st.subheader("⚔️ Probabilidades por enfrentamiento individual")
-        reg_home_prob = get_team_regular_players(home).head(3).index.tolist()
-        reg_away_prob = get_team_regular_players(away).head(3).index.tolist()
-        if reg_home_prob and reg_away_prob:
-            prob_rows = []
-            for jh in reg_home_prob:
-                elo_jh_info = elo_df[elo_df["player"] == jh]
-                elo_jh = elo_jh_info["elo"].iloc[0] if not elo_jh_info.empty else INITIAL_ELO
-                for ja in reg_away_prob:
-                    elo_ja_info = elo_df[elo_df["player"] == ja]
-                    elo_ja = elo_ja_info["elo"].iloc[0] if not elo_ja_info.empty else INITIAL_ELO
-                    p = elo_win_probability(elo_jh, elo_ja)
-                    prob_rows.append({
-                        f"{home}": jh,
-                        f"Elo {home}": int(elo_jh),
-                        f"{away}": ja,
-                        f"Elo {away}": int(elo_ja),
-                        f"% Victoria {home}": f"{p}%",
-                        f"% Victoria {away}": f"{100-p}%"
-                    })
-            if prob_rows:
-                st.dataframe(pd.DataFrame(prob_rows), use_container_width=True, hide_index=True)
-
-        st.subheader("🌟 Jugadores destacados")
-
-        reg_home = get_team_regular_players(home)
-        reg_away = get_team_regular_players(away)
-
-        if not reg_home.empty:
-            home_players_elo = elo_df[elo_df["player"].isin(reg_home.index)]
-            if not home_players_elo.empty:
-                best_home = home_players_elo.sort_values("elo", ascending=False).iloc[0]
-                st.write(f"⭐ Mejor jugador de **{home}**: {best_home['player']} (Elo {best_home['elo']})")
-
-        if not reg_away.empty:
-            away_players_elo = elo_df[elo_df["player"].isin(reg_away.index)]
-            if not away_players_elo.empty:
-                best_away = away_players_elo.sort_values("elo", ascending=False).iloc[0]
-                st.write(f"⭐ Mejor jugador de **{away}**: {best_away['player']} (Elo {best_away['elo']})")
-        
-        st.divider()
-        
-        col1, col2 = st.columns(2)
+                st.write("Haz clic para ver un análisis completo con estadísticas detalladas")
+
+    vista_calendario()
+
+elif vista == "Dashboard Equipo":
+    elo_df = load_elo_data(ELO_FILE)
+    matches = load_matches(MATCHES_FILE)
+    df_grupo = load_matches_by_group(grupo)
+
+    @st.fragment
+    def vista_dashboard_equipo():
+        st.header("📈 Dashboard del Equipo")
+
+        equipos_list = sorted(set(m["home_team"] for m in matches) | set(m["away_team"] for m in matches))
+        default_equipo_idx = 0
+
+        if st.session_state.nav_equipo and st.session_state.nav_equipo in equipos_list:
+            default_equipo_idx = equipos_list.index(st.session_state.nav_equipo)
+            st.session_state.nav_equipo = None
+
+        equipo = st.selectbox("Selecciona un equipo", equipos_list, index=default_equipo_idx)
+
+        team_players = elo_df[elo_df["club"] == equipo]
+        momentum = get_team_momentum(equipo, 5)
+        sets_stats = get_team_sets_stats(equipo)
+
+        col1, col2, col3, col4 = st.columns(4)
         with col1:
-            if st.button("📊 Comparación Completa de Equipos", use_container_width=True):
-                st.session_state.nav_vista = "Comparar equipos"
-                st.session_state.nav_equipo1 = home
-                st.session_state.nav_equipo2 = away
-                st.rerun()
+            st.metric("Jugadores", len(team_players))
         with col2:
-            st.write("Haz clic para ver un análisis completo con estadísticas detalladas")
+            st.metric("Elo Promedio", round(team_players["elo"].mean(), 1))
+        with col3:
+            st.metric("Momentum", f"{momentum['momentum']}%")
+        with col4:
+            st.metric("Ø Sets", f"{sets_stats['avg_sets_won']}/{sets_stats['avg_sets_lost']}")
+
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("Elo Máximo", int(team_players["elo"].max()))
+        with col2:
+            pass
+        with col3:
+            pass
+
+        recent_df = get_team_recent_matches(df_grupo, equipo, 5)
+        if not recent_df.empty:
+            st.subheader("📅 Últimos 5 partidos")
+            st.dataframe(style_match_results(recent_df), use_container_width=True, hide_index=True)
+
+        st.subheader("👥 Jugadores del Equipo")
+        st.write("*Haz clic en un jugador para ver su perfil detallado*")
+        team_table = build_team_comparison_table(team_players)
 
-elif vista == "Dashboard Equipo":
-    st.header("📈 Dashboard del Equipo")
-    
-    equipos_list = sorted(set(m["home_team"] for m in matches) | set(m["away_team"] for m in matches))
-    default_equipo_idx = 0
-    
-    if st.session_state.nav_equipo and st.session_state.nav_equipo in equipos_list:
-        default_equipo_idx = equipos_list.index(st.session_state.nav_equipo)
-        st.session_state.nav_equipo = None
-    
-    equipo = st.selectbox("Selecciona un equipo", equipos_list, index=default_equipo_idx)
-    
-    team_players = elo_df[elo_df["club"] == equipo]
-    momentum = get_team_momentum(df_grupo, equipo, 5)
-    sets_stats = get_team_sets_stats(df_grupo, equipo)
-    
-    col1, col2, col3, col4 = st.columns(4)
-    with col1:
-        st.metric("Jugadores", len(team_players))
-    with col2:
-        st.metric("Elo Promedio", round(team_players["elo"].mean(), 1))
-    with col3:
-        st.metric("Momentum", f"{momentum['momentum']}%")
-    with col4:
-        st.metric("Ø Sets", f"{sets_stats['avg_sets_won']}/{sets_stats['avg_sets_lost']}")
-    
-    col1, col2, col3 = st.columns(3)
-    with col1:
-        st.metric("Elo Máximo", int(team_players["elo"].max()))
-    with col2:
-        pass
-    with col3:
-        pass
-    
-    recent_df = get_team_recent_matches(df_grupo, equipo, 5)
-    if not recent_df.empty:
-        st.subheader("📅 Últimos 5 partidos")
-        st.dataframe(style_match_results(recent_df), use_container_width=True, hide_index=True)
-    
-    st.subheader("👥 Jugadores del Equipo")
-    st.write("*Haz clic en un jugador para ver su perfil detallado*")
-    team_table = build_team_comparison_table(team_players)
-    
-    col1, col2, col3, col4, col5, col6, col7 = st.columns([1, 3, 1, 1, 1, 1, 2])
-    with col1:
-        st.write("**#**")
-    with col2:
-        st.write("**Jugador**")
-    with col3:
-        st.write("**Elo**")
-    with col4:
-        st.write("**V**")
-    with col5:
-        st.write("**D**")
-    with col6:
-        st.write("**Total**")
-    with col7:
-        st.write("**Tasa**")
-    
-    st.divider()
-    
-    for idx, row in team_table.iterrows():
         col1, col2, col3, col4, col5, col6, col7 = st.columns([1, 3, 1, 1, 1, 1, 2])
         with col1:
-            st.write(f"**{idx + 1}**")
+            st.write("**#**")
         with col2:
-            if st.button(f"{row['Jugador']}", key=f"team_player_{idx}"):
-                navigate_to_player(row['Jugador'])
+            st.write("**Jugador**")
         with col3:
-            st.write(f"{row['Elo']}")
+            st.write("**Elo**")
         with col4:
-            st.write(f"{row['V']}")
+            st.write("**V**")
         with col5:
-            st.write(f"{row['D']}")
+            st.write("**D**")
         with col6:
-            st.write(f"{row['Total']}")
+            st.write("**Total**")
         with col7:
-            st.write(row['Tasa'])
-    
-    st.subheader("📥 Descargar Reporte")
-    csv = team_table.to_csv(index=False)
-    st.download_button(
-        label="Descargar CSV",
-        data=csv,
-        file_name=f"reporte_{equipo}.csv",
-        mime="text/csv"
-    )
-    
-    st.subheader("📉 Evolución Elo (Top 3)")
-    top_3 = team_table.head(3)["Jugador"].tolist()
-
-    fig, ax = plt.subplots(figsize=(10, 5))
-    for player in top_3:
-        ax.plot(plot_elo(player), label=player, marker='o')
-    ax.set_ylabel("Elo")
-    ax.set_xlabel("Partidos")
-    ax.legend()
-    ax.grid(True, alpha=0.3)
-    st.pyplot(fig)
-
-    st.subheader("🤝 Análisis de Dobles")
-    doubles_df = get_doubles_pairs_stats(equipo)
-    if doubles_df.empty:
-        st.info("No hay datos de dobles para este equipo.")
-    else:
-        st.dataframe(doubles_df[["Pareja", "V", "D", "Total", "% Victoria"]], use_container_width=True, hide_index=True)
-        total_doubles = doubles_df["Total"].sum()
-        total_wins = doubles_df["V"].sum()
-        if total_doubles > 0:
-            col1, col2, col3 = st.columns(3)
+            st.write("**Tasa**")
+
+        st.divider()
+
+        for idx, row in team_table.iterrows():
+            col1, col2, col3, col4, col5, col6, col7 = st.columns([1, 3, 1, 1, 1, 1, 2])
             with col1:
-                st.metric("Partidos dobles jugados", int(total_doubles))
+                st.write(f"**{idx + 1}**")
             with col2:
-                st.metric("Victorias en dobles", int(total_wins))
+                if st.button(f"{row['Jugador']}", key=f"team_player_{idx}"):
+                    navigate_to_player(row['Jugador'])
             with col3:
-                st.metric("% Victoria dobles", f"{round(total_wins / total_doubles * 100, 1)}%")
+                st.write(f"{row['Elo']}")
+            with col4:
+                st.write(f"{row['V']}")
+            with col5:
+                st.write(f"{row['D']}")
+            with col6:
+                st.write(f"{row['Total']}")
+            with col7:
+                st.write(row['Tasa'])
+
+        st.subheader("📥 Descargar Reporte")
+        csv = team_table.to_csv(index=False)
+        st.download_button(
+            label="Descargar CSV",
+            data=csv,
+            file_name=f"reporte_{equipo}.csv",
+            mime="text/csv"
+        )
+
+        st.subheader("📉 Evolución Elo (Top 3)")
+        top_3 = team_table.head(3)["Jugador"].tolist()
+        show_elo_chart(top_3, "equipo")
+
+        st.subheader("🤝 Análisis de Dobles")
+        doubles_df = get_doubles_pairs_stats(equipo)
+        if doubles_df.empty:
+            st.info("No hay datos de dobles para este equipo.")
+        else:
+            st.dataframe(doubles_df[["Pareja", "V", "D", "Total", "% Victoria"]], use_container_width=True, hide_index=True)
+            total_doubles = doubles_df["Total"].sum()
+            total_wins = doubles_df["V"].sum()
+            if total_doubles > 0:
+                col1, col2, col3 = st.columns(3)
+                with col1:
+                    st.metric("Partidos dobles jugados", int(total_doubles))
+                with col2:
+                    st.metric("Victorias en dobles", int(total_wins))
+                with col3:
+                    st.metric("% Victoria dobles", f"{round(total_wins / total_doubles * 100, 1)}%")
+
+    vista_dashboard_equipo()
 
 elif vista == "Análisis Jugador Avanzado":
+    elo_df = load_elo_data(ELO_FILE)
+    player_info = load_player_info(ELO_FILE)
+
     st.header("🔬 Análisis Avanzado del Jugador")
     
     jugador = st.selectbox("Selecciona un jugador", sorted(elo_df["player"].unique()), key="advanced_jugador")
     
     if jugador:
-        info = elo_df[elo_df["player"] == jugador].iloc[0]
+        info = player_info[jugador]
         wins, losses = get_stats(jugador)
         total = wins + losses
         win_rate = round(wins / total * 100, 1) if total > 0 else 0
@@ -2071,9 +2228,9 @@ elif vista == "Análisis Jugador Avanzado":
         st.subheader(f"📋 {jugador}")
         col1, col2, col3, col4, col5 = st.columns(5)
         with col1:
-            st.metric("Equipo", info["club"])
+            st.metric("Equipo", info.club)
         with col2:
-            st.metric("Elo", info["elo"])
+            st.metric("Elo", info.elo)
         with col3:
             st.metric("Victorias", wins)
         with col4:
@@ -2097,14 +2254,7 @@ elif vista == "Análisis Jugador Avanzado":
             st.dataframe(style_match_results(recent_df), use_container_width=True, hide_index=True)
         
         st.subheader("📈 Evolución Elo")
-        fig, ax = plt.subplots(figsize=(12, 5))
-        elo_history = plot_elo(jugador)
-        ax.plot(elo_history, marker='o', linewidth=2, color='steelblue')
-        ax.fill_between(range(len(elo_history)), elo_history, alpha=0.3)
-        ax.set_ylabel("Elo Rating")
-        ax.set_xlabel("Partidos")
-        ax.grid(True, alpha=0.3)
-        st.pyplot(fig)
+        show_elo_chart([jugador], "avanzado")
         
         st.subheader("🆚 Performance vs Niveles")
         duels = get_duels(jugador)
@@ -2115,9 +2265,8 @@ elif vista == "Análisis Jugador Avanzado":
         
         for d in duels:
             rival = d["rival"]
-            opponent_info = elo_df[elo_df["player"] == rival]
-            if not opponent_info.empty:
-                opponent_elo = opponent_info["elo"].iloc[0]
+            opponent_elo = player_elo(rival)
+            if opponent_elo is not None:
                 is_win = d["resultado"] == RESULT_WIN
                 
                 if opponent_elo >= 1600:
@@ -2186,11 +2335,5 @@ elif vista == "Clasificación":
             st.write(f"**{idx}. {row['team']}** - {row['points']} puntos ({row['wins']}V-{row['losses']}P)")
         
         st.subheader("📊 Diferencia de Puntos por Equipo")
-        fig, ax = plt.subplots(figsize=(12, 6))
-        teams = standings_df["team"].tolist()
-        diffs = standings_df["points"].tolist()
-        colors = ["green" if d >= 0 else "red" for d in diffs]
-        ax.barh(teams, diffs, color=colors)
-        ax.set_xlabel("Puntos")
-        ax.set_title(f"Puntos por Equipo - {grupo}")
-        st.pyplot(fig)
+        st.image(cached_points_chart(tuple(standings_df["team"]), tuple(standings_df["points"]), f"Puntos por Equipo - {grupo}"),
+                 use_container_width=True)
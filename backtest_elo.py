@@ -0,0 +1,173 @@
+import argparse
+import csv
+import glob
+import itertools
+import json
+import logging
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from duel_log import chronological
+import json_codec
+from elo_engine import DEFAULT_PARAMS, DuelArrays, EloEngine, EloParams, rated_matches
+
+logging.basicConfig(level=logging.INFO, format='%(message)s')
+logger = logging.getLogger(__name__)
+
+DATA_DIR: str = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+SEASON_PATTERN: str = "matches_*_enriched.json"
+PROBABILITY_EPSILON: float = 1e-15
+
+SEARCH_SPACE: Dict[str, Tuple[float, float]] = {
+    "k_factor": (40, 160),
+    "sets_weight": (0.4, 1.0),
+    "margin_sweep": (1.0, 1.5),
+    "margin_clear": (0.8, 1.2),
+    "margin_tight": (0.6, 1.0),
+    "experience_low": (2, 10),
+    "experience_high": (10, 30),
+    "gap_low": (50, 150),
+    "gap_high": (150, 300)
+}
+
+_seasons: List[Tuple[str, List[str], DuelArrays]] = []
+
+def load_seasons(paths: List[str]) -> List[Tuple[str, List[str], DuelArrays]]:
+    seasons = []
+    for path in paths:
+        try:
+            matches = json_codec.load(path)
+        except (FileNotFoundError, json.JSONDecodeError) as e:
+            logger.warning(f"Skipping {path}: {e}")
+            continue
+        engine = EloEngine()
+        duels = engine.prepare(rated_matches(chronological(matches)))
+        seasons.append((os.path.basename(path), list(engine.players), duels))
+    return seasons
+
+def _init_worker(paths: List[str]) -> None:
+    global _seasons
+    _seasons = load_seasons(paths)
+
+def evaluate(params: EloParams, seasons: List[Tuple[str, List[str], DuelArrays]], burn_in: int = 0) -> Dict[str, Any]:
+    """Replay every season with params and score the pre-match prediction of each decided duel"""
+    probabilities = []
+    outcomes = []
+    for _, players, duels in seasons:
+        engine = EloEngine(params)
+        engine.register_players(players)
+        elo_before, _ = engine.replay(duels)
+
+        home_elo = elo_before[0::2]
+        away_elo = elo_before[1::2]
+        expected = 1 / (1 + 10 ** ((away_elo - home_elo) / 400))
+        decided = duels.home_score != duels.away_score
+        decided[:burn_in] = False
+
+        probabilities.append(expected[decided])
+        outcomes.append((duels.home_score > duels.away_score)[decided])
+
+    p = np.clip(np.concatenate(probabilities) if probabilities else np.zeros(0), PROBABILITY_EPSILON, 1 - PROBABILITY_EPSILON)
+    y = np.concatenate(outcomes).astype(np.float64) if outcomes else np.zeros(0)
+    if len(p) == 0:
+        return {"duels": 0, "log_loss": float("nan"), "brier": float("nan"), "accuracy": float("nan")}
+
+    return {
+        "duels": int(len(p)),
+        "log_loss": float(-np.mean(y * np.log(p) + (1 - y) * np.log(1 - p))),
+        "brier": float(np.mean((p - y) ** 2)),
+        "accuracy": float(np.mean((p > 0.5) == (y == 1)))
+    }
+
+def _evaluate_in_worker(task: Tuple[EloParams, int]) -> Dict[str, Any]:
+    params, burn_in = task
+    return {**overrides_of(params), **evaluate(params, _seasons, burn_in)}
+
+def make_params(overrides: Dict[str, Any]) -> EloParams:
+    values = {}
+    for name, value in overrides.items():
+        default = EloParams._field_defaults[name]
+        values[name] = int(round(float(value))) if isinstance(default, int) else float(value)
+    if "sets_weight" in values and "points_weight" not in values:
+        values["points_weight"] = 1.0 - values["sets_weight"]
+    return DEFAULT_PARAMS._replace(**values)
+
+def overrides_of(params: EloParams) -> Dict[str, Any]:
+    return {name: getattr(params, name) for name in SEARCH_SPACE}
+
+def parse_grid(specs: List[str]) -> List[EloParams]:
+    axes: List[Tuple[str, List[str]]] = []
+    for spec in specs:
+        name, _, values = spec.partition("=")
+        if name not in EloParams._fields or not values:
+            raise ValueError(f"Invalid grid axis '{spec}', expected name=v1,v2,... with a field of EloParams")
+        axes.append((name, values.split(",")))
+    return [make_params(dict(zip([name for name, _ in axes], combo))) for combo in itertools.product(*[values for _, values in axes])]
+
+def sample_random(samples: int, seed: Optional[int]) -> List[EloParams]:
+    rng = random.Random(seed)
+    candidates = []
+    for _ in range(samples):
+        overrides = {}
+        for name, (low, high) in SEARCH_SPACE.items():
+            if isinstance(EloParams._field_defaults[name], int):
+                overrides[name] = rng.randint(int(low), int(high))
+            else:
+                overrides[name] = rng.uniform(low, high)
+        candidates.append(make_params(overrides))
+    return candidates
+
+def run_search(candidates: List[EloParams], paths: List[str], workers: Optional[int], burn_in: int) -> List[Dict[str, Any]]:
+    tasks = [(params, burn_in) for params in [DEFAULT_PARAMS] + candidates]
+    chunksize = max(1, len(tasks) // ((workers or os.cpu_count() or 1) * 4))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(paths,)) as executor:
+        results = list(executor.map(_evaluate_in_worker, tasks, chunksize=chunksize))
+    results[0]["baseline"] = True
+    return sorted(results, key=lambda r: r["log_loss"])
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Backtest the Elo parameters on past seasons and search for better ones")
+    parser.add_argument("--seasons", nargs="*", help=f"enriched match files to replay (default: data/{SEASON_PATTERN})")
+    search = parser.add_mutually_exclusive_group()
+    search.add_argument("--grid", nargs="+", metavar="NAME=V1,V2", help="grid search over the given EloParams fields")
+    search.add_argument("--random", type=int, metavar="N", help="random search with N samples from SEARCH_SPACE")
+    parser.add_argument("--seed", type=int, default=None, help="random search seed")
+    parser.add_argument("--burn-in", type=int, default=0, help="duels per season replayed but not scored")
+    parser.add_argument("--workers", type=int, default=None, help="process pool size (default: CPU count)")
+    parser.add_argument("--top", type=int, default=10, help="number of results to print")
+    parser.add_argument("--out", help="write every result to this CSV file")
+    args = parser.parse_args()
+
+    paths = args.seasons or sorted({json_codec.strip_suffix(path) for path in glob.glob(os.path.join(DATA_DIR, SEASON_PATTERN + "*"))
+                                    if path.endswith((".json", ".gz", ".zst"))})
+    if args.grid:
+        candidates = parse_grid(args.grid)
+    elif args.random:
+        candidates = sample_random(args.random, args.seed)
+    else:
+        candidates = []
+
+    logger.info(f"🧪 Backtesting {len(candidates) + 1} parameter sets on {len(paths)} seasons")
+    results = run_search(candidates, paths, args.workers, args.burn_in)
+
+    baseline = next(r for r in results if r.get("baseline"))
+    logger.info(f"Baseline: log-loss {baseline['log_loss']:.4f} | Brier {baseline['brier']:.4f} | accuracy {baseline['accuracy']:.1%} | {baseline['duels']} duels")
+    for i, r in enumerate(results[:args.top], 1):
+        params = "  ".join(f"{name}={r[name]:.3g}" for name in SEARCH_SPACE)
+        logger.info(f"{i:2d}. log-loss {r['log_loss']:.4f} | Brier {r['brier']:.4f} | accuracy {r['accuracy']:.1%} | {params}")
+
+    if args.out:
+        fields = list(SEARCH_SPACE) + ["duels", "log_loss", "brier", "accuracy", "baseline"]
+        with open(args.out, "w", encoding="utf-8", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=fields)
+            writer.writeheader()
+            for r in results:
+                writer.writerow({field: r.get(field, False) for field in fields})
+        logger.info(f"✅ Results saved: {args.out}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+import io
+from typing import Any, Optional, Sequence, Tuple
+
+# Same output as st.pyplot: cropped, and sharp on high-DPI screens
+SAVEFIG_OPTIONS = {"format": "png", "bbox_inches": "tight", "dpi": 200}
+
+def new_figure(figsize: Optional[Tuple[float, float]] = None) -> Any:
+    """A standalone Figure, imported on first use.
+
+    It is not registered with pyplot, so nothing keeps it alive once rendered and
+    concurrent sessions do not share pyplot's global state.
+    """
+    from matplotlib.figure import Figure
+    return Figure(figsize=figsize)
+
+def figure_png(fig: Any) -> bytes:
+    buffer = io.BytesIO()
+    fig.savefig(buffer, **SAVEFIG_OPTIONS)
+    return buffer.getvalue()
+
+def elo_lines_png(series: Sequence[Tuple[Optional[str], Sequence[int]]], figsize: Optional[Tuple[float, float]] = None,
+                  ylabel: str = "Elo", legend: bool = True, fill: bool = False, grid: bool = False, **line: Any) -> bytes:
+    """Elo evolution of one or more players, one (label, elo values) pair per line"""
+    fig = new_figure(figsize)
+    ax = fig.subplots()
+    for label, values in series:
+        ax.plot(values, label=label, **line)
+        if fill:
+            ax.fill_between(range(len(values)), values, alpha=0.3)
+    ax.set_ylabel(ylabel)
+    ax.set_xlabel("Partidos")
+    if legend:
+        ax.legend()
+    if grid:
+        ax.grid(True, alpha=0.3)
+    return figure_png(fig)
+
+def points_barh_png(teams: Sequence[str], points: Sequence[float], title: str) -> bytes:
+    fig = new_figure((12, 6))
+    ax = fig.subplots()
+    ax.barh(list(teams), list(points), color=["green" if p >= 0 else "red" for p in points])
+    ax.set_xlabel("Puntos")
+    ax.set_title(title)
+    return figure_png(fig)
@@ -0,0 +1,133 @@
+import re
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+MONTHS: Dict[str, int] = {
+    "ene": 1, "jan": 1, "feb": 2, "mar": 3, "abr": 4, "apr": 4, "may": 5, "jun": 6,
+    "jul": 7, "ago": 8, "aug": 8, "sep": 9, "oct": 10, "nov": 11, "dic": 12, "dec": 12
+}
+
+def parse_match_datetime(date: Any, time: Optional[str] = None) -> Optional[datetime]:
+    """Parse "27 Abr 2025", "27 Abr 25 11:00", "27/04/2025" or "2025-04-27", with an optional separate HH:MM time"""
+    parts = re.findall(r'[A-Za-zÀ-ÿ]+|\d+', f"{date or ''} {time or ''}")
+    if len(parts) < 3:
+        return None
+    try:
+        if len(parts[0]) == 4:
+            year, month, day = int(parts[0]), int(parts[1]), int(parts[2])
+        else:
+            day = int(parts[0])
+            month = int(parts[1]) if parts[1].isdigit() else MONTHS.get(parts[1][:3].lower())
+            year = int(parts[2])
+        if not month:
+            return None
+        if year < 100:
+            year += 2000
+        hour, minute = (int(parts[3]), int(parts[4])) if len(parts) >= 5 and parts[3].isdigit() and parts[4].isdigit() else (0, 0)
+        return datetime(year, month, day, hour, minute)
+    except ValueError:
+        return None
+
+def match_timestamp(match: Dict[str, Any]) -> Optional[datetime]:
+    return parse_match_datetime(match.get("date"), match.get("time"))
+
+def sort_key(timestamp: Optional[datetime]) -> datetime:
+    return timestamp or datetime.max
+
+def chronological(matches: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Sort matches by date and time, stable on file order, with undated matches last"""
+    return sorted(matches, key=lambda m: sort_key(match_timestamp(m)))
+
+class DuelEvent(NamedTuple):
+    seq: int
+    timestamp: Optional[datetime]
+    match_id: Any
+    game_index: int
+    date: Optional[str]
+    home_player: str
+    away_player: str
+    home_score: int
+    away_score: int
+    home_sets: List[int]
+    away_sets: List[int]
+    home_team: Optional[str]
+    away_team: Optional[str]
+
+class PlayerDuel(NamedTuple):
+    """A duel seen from one player's side"""
+    event: DuelEvent
+    is_home: bool
+    opponent: str
+    score: int
+    opp_score: int
+    sets: List[int]
+    opp_sets: List[int]
+    team: Optional[str]
+    opponent_team: Optional[str]
+
+def player_side(event: DuelEvent, player: str) -> PlayerDuel:
+    if event.home_player == player:
+        return PlayerDuel(event, True, event.away_player, event.home_score, event.away_score,
+                          event.home_sets, event.away_sets, event.home_team, event.away_team)
+    return PlayerDuel(event, False, event.home_player, event.away_score, event.home_score,
+                      event.away_sets, event.home_sets, event.away_team, event.home_team)
+
+class DuelLog:
+    """Every game of a set of matches as one event, sorted once by time and searchable by date and player"""
+
+    def __init__(self, events: List[DuelEvent]):
+        self.events = events
+        self._keys = [sort_key(e.timestamp) for e in events]
+        self._by_player: Dict[str, List[int]] = {}
+        for i, e in enumerate(events):
+            self._by_player.setdefault(e.home_player, []).append(i)
+            if e.away_player != e.home_player:
+                self._by_player.setdefault(e.away_player, []).append(i)
+
+    def __len__(self) -> int:
+        return len(self.events)
+
+    def position(self, when: datetime) -> int:
+        """Number of events played at or before when"""
+        return bisect_right(self._keys, when)
+
+    def until(self, when: datetime) -> List[DuelEvent]:
+        return self.events[:self.position(when)]
+
+    def between(self, start: datetime, end: datetime) -> List[DuelEvent]:
+        return self.events[bisect_left(self._keys, start):bisect_right(self._keys, end)]
+
+    def for_player(self, player: str, when: Optional[datetime] = None) -> List[DuelEvent]:
+        positions = self._by_player.get(player, [])
+        if when is not None:
+            positions = positions[:bisect_left(positions, self.position(when))]
+        return [self.events[i] for i in positions]
+
+    def player_duels(self, player: str, when: Optional[datetime] = None) -> List[PlayerDuel]:
+        return [player_side(e, player) for e in self.for_player(player, when)]
+
+def build_duel_log(matches: Iterable[Dict[str, Any]],
+                   teams: Optional[Callable[[Dict[str, Any], Dict[str, Any]], Tuple[Optional[str], Optional[str]]]] = None) -> DuelLog:
+    """teams(game, match) gives the (home, away) team of a game; by default the teams stored on the game are used"""
+    events: List[DuelEvent] = []
+    for match in chronological(matches):
+        timestamp = match_timestamp(match)
+        for game_index, game in enumerate(match.get("games") or []):
+            home_team, away_team = teams(game, match) if teams else (game.get("home_team"), game.get("away_team"))
+            events.append(DuelEvent(
+                seq=len(events),
+                timestamp=timestamp,
+                match_id=match.get("match_id"),
+                game_index=game_index,
+                date=match.get("date"),
+                home_player=game.get("home_player", "").strip(),
+                away_player=game.get("away_player", "").strip(),
+                home_score=game.get("home_score", 0),
+                away_score=game.get("away_score", 0),
+                home_sets=game.get("home_sets", []),
+                away_sets=game.get("away_sets", []),
+                home_team=home_team,
+                away_team=away_team
+            ))
+    return DuelLog(events)
@@ -0,0 +1,94 @@
+import os
+from typing import Any, Dict, Iterable, List, Optional
+
+from duel_log import chronological, match_timestamp
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+MAX_SETS: int = 5
+
+STRING_COLUMNS: List[str] = [
+    "match_id", "date", "match_home_team", "match_away_team",
+    "home_team", "away_team", "home_code", "away_code", "home_player", "away_player"
+]
+SET_COLUMNS: List[str] = [f"{side}_set{i}" for side in ("home", "away") for i in range(1, MAX_SETS + 1)]
+INT_COLUMNS: Dict[str, str] = {
+    "seq": "int32",
+    "game_index": "int8",
+    "home_score": "int8",
+    "away_score": "int8",
+    **{column: "int16" for column in SET_COLUMNS}
+}
+
+def duel_columns(matches: Iterable[Dict[str, Any]]) -> Dict[str, List[Any]]:
+    """One row per game in chronological order, with the sets padded to MAX_SETS.
+
+    Only the sets present on both sides are kept, like zip() over the two lists,
+    so a zero pair always means the set was not played.
+    """
+    columns: Dict[str, List[Any]] = {column: [] for column in ["ts"] + STRING_COLUMNS + list(INT_COLUMNS)}
+    for match in chronological(matches):
+        ts = match_timestamp(match)
+        for game_index, g in enumerate(match.get("games") or []):
+            h_sets = g.get("home_sets") or []
+            a_sets = g.get("away_sets") or []
+            paired = min(len(h_sets), len(a_sets), MAX_SETS)
+
+            columns["ts"].append(ts)
+            columns["seq"].append(len(columns["seq"]))
+            columns["game_index"].append(game_index)
+            columns["match_id"].append(None if match.get("match_id") is None else str(match.get("match_id")))
+            columns["date"].append(match.get("date"))
+            columns["match_home_team"].append(match.get("home_team"))
+            columns["match_away_team"].append(match.get("away_team"))
+            columns["home_team"].append(g.get("home_team"))
+            columns["away_team"].append(g.get("away_team"))
+            columns["home_code"].append(g.get("home_code"))
+            columns["away_code"].append(g.get("away_code"))
+            columns["home_player"].append(g.get("home_player"))
+            columns["away_player"].append(g.get("away_player"))
+            columns["home_score"].append(g.get("home_score", 0))
+            columns["away_score"].append(g.get("away_score", 0))
+            for i in range(MAX_SETS):
+                columns[f"home_set{i + 1}"].append(h_sets[i] if i < paired else 0)
+                columns[f"away_set{i + 1}"].append(a_sets[i] if i < paired else 0)
+    return columns
+
+def arrow_schema() -> "pa.Schema":
+    return pa.schema(
+        [("ts", pa.timestamp("s"))]
+        + [(column, pa.string()) for column in STRING_COLUMNS]
+        + [(column, getattr(pa, dtype)()) for column, dtype in INT_COLUMNS.items()]
+    )
+
+def write_duels_table(columns: Dict[str, List[Any]], parquet_path: str, arrow_path: str) -> bool:
+    """Write the table as Parquet and as an uncompressed Arrow IPC file; False when pyarrow is missing"""
+    if pa is None:
+        return False
+
+    table = pa.table(columns, schema=arrow_schema())
+    for path, write in ((parquet_path, lambda p: pq.write_table(table, p)),
+                        (arrow_path, lambda p: _write_ipc(table, p))):
+        tmp_path = path + ".tmp"
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    return True
+
+def _write_ipc(table: "pa.Table", path: str) -> None:
+    with pa.OSFile(path, "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+
+def read_duels_table(arrow_path: str) -> Optional["pa.Table"]:
+    """Memory-map the Arrow IPC file, or return None when it is missing or pyarrow is not installed"""
+    if pa is None or not os.path.exists(arrow_path):
+        return None
+    try:
+        return pa.ipc.open_file(pa.memory_map(arrow_path, "r")).read_all()
+    except (OSError, pa.ArrowInvalid):
+        return None
@@ -0,0 +1,614 @@
+import hashlib
+import json
+from collections import defaultdict
+from itertools import chain
+from typing import Any, DefaultDict, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from duel_log import chronological
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+INITIAL_ELO: int = 1400
+K_FACTOR: int = 100
+MIN_ELO: int = 800
+
+ABC_CODES: set = {"A", "B", "C", "ABC"}
+XYZ_CODES: set = {"X", "Y", "Z", "XYZ"}
+
+STATE_VERSION: int = 1
+
+class EloParams(NamedTuple):
+    """Tunable constants of the rating, defaulting to the values of the scalar functions below"""
+    initial_elo: int = INITIAL_ELO
+    k_factor: int = K_FACTOR
+    min_elo: int = MIN_ELO
+    sets_weight: float = 0.7
+    points_weight: float = 0.3
+    tightness_scale: float = 20.0
+    margin_sweep: float = 1.2
+    margin_clear: float = 1.0
+    margin_tight: float = 0.85
+    experience_low: int = 5
+    experience_high: int = 15
+    experience_factors: Tuple[float, float, float] = (1.5, 1.2, 1.0)
+    gap_low: int = 100
+    gap_high: int = 200
+    gap_factors: Tuple[float, float, float] = (1.0, 1.15, 1.3)
+
+DEFAULT_PARAMS = EloParams()
+
+def is_valid_player(name: str) -> bool:
+    if not name or name.strip() == "":
+        return False
+    name = name.strip().upper()
+    if name in {"A", "B", "C", "X", "Y", "Z", "ABC", "XYZ"}:
+        return False
+    if "DOBLE" in name:
+        return False
+    return True
+
+def compute_result(home_score: int, away_score: int, home_sets: List[int] = None, away_sets: List[int] = None) -> float:
+    if home_score == away_score == 0:
+        return 0.5
+
+    total_sets = home_score + away_score
+    if total_sets > 0:
+        sets_result = home_score / total_sets
+    else:
+        sets_result = 0.5
+
+    if home_sets and away_sets:
+        home_points = sum(s for s in home_sets if s > 0)
+        away_points = sum(s for s in away_sets if s > 0)
+        total_points = home_points + away_points
+        if total_points > 0:
+            points_result = home_points / total_points
+        else:
+            points_result = 0.5
+
+        average_point_diff = 0.0
+        valid_sets = 0
+        for h, a in zip(home_sets, away_sets):
+            if h > 0 or a > 0:
+                average_point_diff += abs(h - a)
+                valid_sets += 1
+
+        if valid_sets > 0:
+            average_point_diff /= valid_sets
+            tightness_factor = 1.0 - (average_point_diff / 20.0)
+            tightness_factor = max(0.0, min(1.0, tightness_factor))
+            points_result = 0.5 + (points_result - 0.5) * tightness_factor
+
+        result = 0.7 * sets_result + 0.3 * points_result
+    else:
+        result = sets_result
+
+    return max(0.0, min(1.0, result))
+
+def get_margin_coefficient(home_score: int, away_score: int) -> float:
+    margin = abs(home_score - away_score)
+    if margin == 3:
+        return 1.2
+    elif margin == 2:
+        return 1.0
+    else:
+        return 0.85
+
+def get_dynamic_k_factor(player: str, opponent: str, scores: Dict[str, int], player_matches: Dict[str, int], elo_diff: float) -> float:
+    base_k = K_FACTOR
+
+    player_match_count = player_matches.get(player, 0)
+    if player_match_count < 5:
+        exp_factor = 1.5
+    elif player_match_count < 15:
+        exp_factor = 1.2
+    else:
+        exp_factor = 1.0
+
+    if abs(elo_diff) > 200:
+        gap_factor = 1.3
+    elif abs(elo_diff) > 100:
+        gap_factor = 1.15
+    else:
+        gap_factor = 1.0
+
+    dynamic_k = base_k * exp_factor * gap_factor
+    return round(dynamic_k)
+
+def update_elo(scores: Dict[str, int], player: str, opponent: str, result: float,
+               home_score: int, away_score: int, player_matches: Dict[str, int],
+               k: int = None) -> None:
+    p_elo = scores[player]
+    o_elo = scores[opponent]
+    elo_diff = o_elo - p_elo
+
+    if k is None:
+        k = get_dynamic_k_factor(player, opponent, scores, player_matches, elo_diff)
+
+    expected = 1 / (1 + 10 ** (elo_diff / 400))
+
+    margin_coeff = get_margin_coefficient(home_score, away_score)
+
+    delta = k * margin_coeff * (result - expected)
+
+    new_elo = p_elo + delta
+    new_elo = max(800, new_elo)
+
+    scores[player] = round(new_elo)
+
+def count_side_codes(match: Dict[str, Any]) -> Tuple[str, str]:
+    """Return (home_side_code, away_side_code), "ABC" or "XYZ", by matching the wins of each code to the score"""
+    abc_wins: int = 0
+    xyz_wins: int = 0
+
+    for g in match.get("games", []):
+        hc = g.get("home_code", "").strip()
+        hs = g.get("home_score", 0)
+        ac = g.get("away_code", "").strip()
+        as_ = g.get("away_score", 0)
+
+        if hc in ABC_CODES and hs > as_:
+            abc_wins += 1
+        elif ac in ABC_CODES and as_ > hs:
+            abc_wins += 1
+        elif hc in XYZ_CODES and hs > as_:
+            xyz_wins += 1
+        elif ac in XYZ_CODES and as_ > hs:
+            xyz_wins += 1
+
+    if abc_wins == match.get("score_home", 0):
+        return "ABC", "XYZ"
+    return "XYZ", "ABC"
+
+def resolve_sides(match: Dict[str, Any]) -> Tuple[Optional[str], Optional[str]]:
+    """Return (abc_team, xyz_team), from the stored side codes when the match has them"""
+    home_side_code = match.get("home_side_code") or count_side_codes(match)[0]
+    if home_side_code == "ABC":
+        return match.get("home_team"), match.get("away_team")
+    return match.get("away_team"), match.get("home_team")
+
+def annotate_sides(match: Dict[str, Any]) -> None:
+    """Store the side codes on the match and the resolved team on each of its games"""
+    home_side_code, away_side_code = count_side_codes(match)
+    match["home_side_code"] = home_side_code
+    match["away_side_code"] = away_side_code
+    sides = resolve_sides(match)
+    for game in match.get("games", []):
+        game["home_team"] = team_for_code(game.get("home_code", "").strip(), sides)
+        game["away_team"] = team_for_code(game.get("away_code", "").strip(), sides)
+
+def team_for_code(code: str, sides: Tuple[Optional[str], Optional[str]]) -> str:
+    abc_team, xyz_team = sides
+    if code in ABC_CODES:
+        return abc_team or "Unknown"
+    elif code in XYZ_CODES:
+        return xyz_team or "Unknown"
+    return "Unknown"
+
+def get_club_from_code_elo(code: str, match: Dict[str, Any]) -> str:
+    return team_for_code(code, resolve_sides(match))
+
+def build_k_table(params: EloParams = DEFAULT_PARAMS) -> np.ndarray:
+    """K factors of get_dynamic_k_factor, indexed by experience bucket * 3 + gap bucket"""
+    return np.array(
+        [round(params.k_factor * exp_factor * gap_factor) for exp_factor in params.experience_factors for gap_factor in params.gap_factors],
+        dtype=np.int64
+    )
+
+def compute_results(score: np.ndarray, opp_score: np.ndarray, points: np.ndarray, opp_points: np.ndarray,
+                    sets: np.ndarray, opp_sets: np.ndarray, has_sets: np.ndarray, params: EloParams = DEFAULT_PARAMS) -> np.ndarray:
+    """Vectorized compute_result over every duel, operation for operation"""
+    total_sets = score + opp_score
+    sets_result = np.where(total_sets > 0, score / np.maximum(total_sets, 1), 0.5)
+
+    total_points = points + opp_points
+    points_result = np.where(total_points > 0, points / np.maximum(total_points, 1), 0.5)
+
+    valid = (sets > 0) | (opp_sets > 0)
+    valid_sets = valid.sum(axis=1)
+    point_diff = np.where(valid, np.abs(sets - opp_sets), 0).sum(axis=1).astype(np.float64)
+    average_point_diff = point_diff / np.maximum(valid_sets, 1)
+    tightness_factor = np.clip(1.0 - (average_point_diff / params.tightness_scale), 0.0, 1.0)
+    points_result = np.where(valid_sets > 0, 0.5 + (points_result - 0.5) * tightness_factor, points_result)
+
+    result = np.where(has_sets, params.sets_weight * sets_result + params.points_weight * points_result, sets_result)
+    result = np.clip(result, 0.0, 1.0)
+    return np.where((score == 0) & (opp_score == 0), 0.5, result)
+
+def compute_margin_coefficients(score: np.ndarray, opp_score: np.ndarray, params: EloParams = DEFAULT_PARAMS) -> np.ndarray:
+    margin = np.abs(score - opp_score)
+    return np.select([margin == 3, margin == 2], [params.margin_sweep, params.margin_clear], params.margin_tight)
+
+def _rate_duels(home_idx, away_idx, result_home, result_away, margin, ratings, match_counts, k_table,
+                elo_before, elo_after, exp_low, exp_high, gap_low, gap_high, min_elo):
+    for i in range(len(home_idx)):
+        h = home_idx[i]
+        a = away_idx[i]
+        match_counts[h] += 1
+        match_counts[a] += 1
+
+        for side in range(2):
+            if side == 0:
+                player, opponent, result = h, a, result_home[i]
+            else:
+                player, opponent, result = a, h, result_away[i]
+
+            p_elo = ratings[player]
+            elo_diff = ratings[opponent] - p_elo
+
+            count = match_counts[player]
+            exp_bucket = 0 if count < exp_low else (1 if count < exp_high else 2)
+            gap = abs(elo_diff)
+            gap_bucket = 2 if gap > gap_high else (1 if gap > gap_low else 0)
+            k = k_table[exp_bucket * 3 + gap_bucket]
+
+            expected = 1 / (1 + 10 ** (elo_diff / 400))
+            new_elo = p_elo + k * margin[i] * (result - expected)
+            if new_elo < min_elo:
+                new_elo = min_elo
+            ratings[player] = round(new_elo)
+            elo_before[2 * i + side] = p_elo
+            elo_after[2 * i + side] = ratings[player]
+
+def _pad_sets(sets: List[List[int]], width: int) -> np.ndarray:
+    flat = chain.from_iterable(s + [0] * (width - len(s)) for s in sets)
+    return np.fromiter(flat, dtype=np.int64, count=len(sets) * width).reshape(-1, width)
+
+_rate_duels_compiled = njit(cache=True)(_rate_duels) if njit is not None else None
+
+def engine_params(params: EloParams = DEFAULT_PARAMS) -> Dict[str, Any]:
+    return {key: list(value) if isinstance(value, tuple) else value for key, value in params._asdict().items()}
+
+def match_digest(match: Dict[str, Any]) -> str:
+    payload = {key: match.get(key) for key in ("match_id", "home_team", "away_team", "score_home", "games")}
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+def chain_digest(previous: str, match: Dict[str, Any]) -> str:
+    return hashlib.sha256((previous + match_digest(match)).encode("utf-8")).hexdigest()
+
+def merge_streams(streams: Dict[str, List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """Interleave the rated matches of several competitions into one chronological stream.
+
+    The sort is stable, so matches played at the same time keep the order of
+    streams and their order within each file. Undated matches go last.
+    """
+    return chronological(chain.from_iterable(rated_matches(matches) for matches in streams.values()))
+
+def historical_duel_matches(records: Iterable[Dict[str, Any]], exclude_ids: Iterable[str] = ()) -> List[Dict[str, Any]]:
+    """Group historique_* duel records into matches shaped like the enriched ones.
+
+    Each duel is listed once per player profile that was scraped, so records are
+    deduplicated on their players. The team is only known for the side whose
+    profile produced the record; it is stored per game and left None otherwise.
+    Matches whose id is in exclude_ids are already rated from the competitions.
+    """
+    excluded = {str(match_id) for match_id in exclude_ids}
+    matches: Dict[str, Dict[str, Any]] = {}
+    games: Dict[Tuple[str, str, str], Dict[str, Any]] = {}
+
+    for record in records:
+        match_id = str(record.get("match_id", ""))
+        home = (record.get("home_player") or "").strip()
+        away = (record.get("away_player") or "").strip()
+        if not match_id or match_id in excluded:
+            continue
+
+        match = matches.get(match_id)
+        if match is None:
+            match = matches[match_id] = {
+                "match_id": match_id,
+                "date": record.get("date"),
+                "league": record.get("league"),
+                "games": []
+            }
+
+        game = games.get((match_id, home, away))
+        if game is None:
+            game = games[(match_id, home, away)] = {
+                "home_player": home,
+                "away_player": away,
+                "home_score": record.get("home_score", 0),
+                "away_score": record.get("away_score", 0),
+                "home_team": None,
+                "away_team": None
+            }
+            match["games"].append(game)
+
+        player = (record.get("player_name") or "").strip()
+        if player == home:
+            game["home_team"] = record.get("team_name")
+        elif player == away:
+            game["away_team"] = record.get("team_name")
+
+    return list(matches.values())
+
+def rated_matches(matches: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return [m for m in matches if m.get("games")]
+
+HISTORY_COLUMNS: Tuple[str, ...] = ("player", "match_id", "date", "elo_before", "elo_after")
+
+def empty_history() -> Dict[str, List[Any]]:
+    return {column: [] for column in HISTORY_COLUMNS}
+
+class DuelArrays:
+    """Flat per-duel arrays for a list of matches, built once before rating"""
+
+    def __init__(self, home_idx: np.ndarray, away_idx: np.ndarray, home_score: np.ndarray, away_score: np.ndarray,
+                 home_points: np.ndarray, away_points: np.ndarray, home_sets: np.ndarray, away_sets: np.ndarray,
+                 has_sets: np.ndarray, home_team: List[Optional[str]], away_team: List[Optional[str]],
+                 match_ids: List[Optional[str]], dates: List[Optional[str]]):
+        self.home_idx = home_idx
+        self.away_idx = away_idx
+        self.home_score = home_score
+        self.away_score = away_score
+        self.home_points = home_points
+        self.away_points = away_points
+        self.home_sets = home_sets
+        self.away_sets = away_sets
+        self.has_sets = has_sets
+        self.home_team = home_team
+        self.away_team = away_team
+        self.match_ids = match_ids
+        self.dates = dates
+
+    def __len__(self) -> int:
+        return len(self.home_idx)
+
+    def results(self, params: EloParams = DEFAULT_PARAMS) -> Tuple[np.ndarray, np.ndarray]:
+        result_home = compute_results(self.home_score, self.away_score, self.home_points, self.away_points,
+                                      self.home_sets, self.away_sets, self.has_sets, params)
+        result_away = compute_results(self.away_score, self.home_score, self.away_points, self.home_points,
+                                      self.away_sets, self.home_sets, self.has_sets, params)
+        return result_home, result_away
+
+class EloEngine:
+    """Rates duels on integer player indices, with the semantics of update_elo and get_dynamic_k_factor"""
+
+    def __init__(self, params: EloParams = DEFAULT_PARAMS):
+        self.params = params
+        self.players: List[str] = []
+        self.index: Dict[str, int] = {}
+        self.ratings = np.zeros(0, dtype=np.int64)
+        self.match_counts = np.zeros(0, dtype=np.int64)
+        self.wins = np.zeros(0, dtype=np.int64)
+        self.club_counts: DefaultDict[str, DefaultDict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self.k_table = build_k_table(params)
+        self.processed: int = 0
+        self.watermark: str = ""
+        self.last_match_id: Optional[str] = None
+
+    def player_index(self, name: str) -> int:
+        idx = self.index.get(name)
+        if idx is None:
+            idx = len(self.players)
+            self.index[name] = idx
+            self.players.append(name)
+        return idx
+
+    def register_players(self, players: List[str]) -> None:
+        for name in players:
+            self.player_index(name)
+        self._grow()
+
+    def _grow(self) -> None:
+        missing = len(self.players) - len(self.ratings)
+        if missing > 0:
+            self.ratings = np.concatenate([self.ratings, np.full(missing, self.params.initial_elo, dtype=np.int64)])
+            self.match_counts = np.concatenate([self.match_counts, np.zeros(missing, dtype=np.int64)])
+            self.wins = np.concatenate([self.wins, np.zeros(missing, dtype=np.int64)])
+
+    def prepare(self, matches: List[Dict[str, Any]]) -> DuelArrays:
+        home_idx: List[int] = []
+        away_idx: List[int] = []
+        home_score: List[int] = []
+        away_score: List[int] = []
+        home_points: List[int] = []
+        away_points: List[int] = []
+        home_sets: List[List[int]] = []
+        away_sets: List[List[int]] = []
+        has_sets: List[bool] = []
+        home_team: List[Optional[str]] = []
+        away_team: List[Optional[str]] = []
+        match_ids: List[Optional[str]] = []
+        dates: List[Optional[str]] = []
+
+        for match in matches:
+            sides: Optional[Tuple[Optional[str], Optional[str]]] = None
+            for duel in match.get("games", []):
+                h = duel.get("home_player", "").strip()
+                a = duel.get("away_player", "").strip()
+                if not is_valid_player(h) or not is_valid_player(a):
+                    continue
+
+                h_sets = duel.get("home_sets", [])
+                a_sets = duel.get("away_sets", [])
+                paired = min(len(h_sets), len(a_sets))
+
+                home_idx.append(self.player_index(h))
+                away_idx.append(self.player_index(a))
+                home_score.append(duel.get("home_score", 0))
+                away_score.append(duel.get("away_score", 0))
+                home_points.append(sum(s for s in h_sets if s > 0))
+                away_points.append(sum(s for s in a_sets if s > 0))
+                home_sets.append(h_sets[:paired])
+                away_sets.append(a_sets[:paired])
+                has_sets.append(bool(h_sets) and bool(a_sets))
+                if "home_team" in duel:
+                    home_team.append(duel["home_team"])
+                    away_team.append(duel["away_team"])
+                else:
+                    if sides is None:
+                        sides = resolve_sides(match)
+                    home_team.append(team_for_code(duel.get("home_code", "").strip(), sides))
+                    away_team.append(team_for_code(duel.get("away_code", "").strip(), sides))
+                match_ids.append(match.get("match_id"))
+                dates.append(match.get("date"))
+
+        self._grow()
+
+        width = max([len(s) for s in home_sets] + [1])
+        sets_h = _pad_sets(home_sets, width)
+        sets_a = _pad_sets(away_sets, width)
+
+        return DuelArrays(
+            home_idx=np.array(home_idx, dtype=np.int64),
+            away_idx=np.array(away_idx, dtype=np.int64),
+            home_score=np.array(home_score, dtype=np.int64),
+            away_score=np.array(away_score, dtype=np.int64),
+            home_points=np.array(home_points, dtype=np.int64),
+            away_points=np.array(away_points, dtype=np.int64),
+            home_sets=sets_h,
+            away_sets=sets_a,
+            has_sets=np.array(has_sets, dtype=bool),
+            home_team=home_team,
+            away_team=away_team,
+            match_ids=match_ids,
+            dates=dates
+        )
+
+    def rate(self, duels: DuelArrays) -> Dict[str, List[Any]]:
+        """Rate duels in order and return one history row per rating update, two per duel"""
+        if len(duels) == 0:
+            return empty_history()
+
+        self.tally(duels)
+        elo_before, elo_after = self.replay(duels)
+
+        return {
+            "player": np.column_stack([duels.home_idx, duels.away_idx]).ravel().tolist(),
+            "match_id": [m for m in duels.match_ids for _ in range(2)],
+            "date": [d for d in duels.dates for _ in range(2)],
+            "elo_before": elo_before.tolist(),
+            "elo_after": elo_after.tolist()
+        }
+
+    def tally(self, duels: DuelArrays) -> None:
+        """Count clubs and wins of the duels, skipping teams that are not known"""
+        players = self.players
+        for h, a, h_team, a_team in zip(duels.home_idx.tolist(), duels.away_idx.tolist(), duels.home_team, duels.away_team):
+            if h_team is not None:
+                self.club_counts[players[h]][h_team] += 1
+            if a_team is not None:
+                self.club_counts[players[a]][a_team] += 1
+
+        np.add.at(self.wins, duels.home_idx[duels.home_score > duels.away_score], 1)
+        np.add.at(self.wins, duels.away_idx[duels.away_score > duels.home_score], 1)
+
+    def replay(self, duels: DuelArrays) -> Tuple[np.ndarray, np.ndarray]:
+        """Sequential update over the duel arrays, returning ratings before and after each update"""
+        params = self.params
+        result_home, result_away = duels.results(params)
+        margin = compute_margin_coefficients(duels.home_score, duels.away_score, params)
+        elo_before = np.zeros(2 * len(duels), dtype=np.int64)
+        elo_after = np.zeros(2 * len(duels), dtype=np.int64)
+        args = (params.experience_low, params.experience_high, params.gap_low, params.gap_high, params.min_elo)
+        if _rate_duels_compiled is not None:
+            _rate_duels_compiled(duels.home_idx, duels.away_idx, result_home, result_away, margin,
+                                 self.ratings, self.match_counts, self.k_table, elo_before, elo_after, *args)
+        else:
+            ratings = self.ratings.tolist()
+            match_counts = self.match_counts.tolist()
+            before = [0] * len(elo_before)
+            after = [0] * len(elo_after)
+            _rate_duels(duels.home_idx.tolist(), duels.away_idx.tolist(), result_home.tolist(),
+                        result_away.tolist(), margin.tolist(), ratings, match_counts,
+                        self.k_table.tolist(), before, after, *args)
+            self.ratings = np.array(ratings, dtype=np.int64)
+            self.match_counts = np.array(match_counts, dtype=np.int64)
+            elo_before = np.array(before, dtype=np.int64)
+            elo_after = np.array(after, dtype=np.int64)
+        return elo_before, elo_after
+
+    def apply_matches(self, matches: List[Dict[str, Any]]) -> Dict[str, List[Any]]:
+        """Rate the duels of matches in order and advance the watermark past them"""
+        matches = rated_matches(matches)
+        history = self.rate(self.prepare(matches))
+        for match in matches:
+            self.watermark = chain_digest(self.watermark, match)
+            self.last_match_id = match.get("match_id")
+        self.processed += len(matches)
+        return history
+
+    def view(self, matches: List[Dict[str, Any]]) -> "EloEngine":
+        """Restrict the ratings to the players of matches, with matches, wins and clubs counted on those matches only"""
+        view = EloEngine(self.params)
+        duels = view.prepare(rated_matches(matches))
+        view.tally(duels)
+        size = len(view.players)
+        view.match_counts = np.bincount(duels.home_idx, minlength=size) + np.bincount(duels.away_idx, minlength=size)
+        view.ratings = self.ratings[np.array([self.index[player] for player in view.players], dtype=np.int64)]
+        view.processed = self.processed
+        view.watermark = self.watermark
+        view.last_match_id = self.last_match_id
+        return view
+
+    def state(self) -> Dict[str, Any]:
+        return {
+            "version": STATE_VERSION,
+            "params": engine_params(self.params),
+            "processed": self.processed,
+            "watermark": self.watermark,
+            "last_match_id": self.last_match_id,
+            "players": self.players,
+            "ratings": self.ratings.tolist(),
+            "match_counts": self.match_counts.tolist(),
+            "wins": self.wins.tolist(),
+            "club_counts": {player: dict(clubs) for player, clubs in self.club_counts.items()}
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> "EloEngine":
+        engine = cls(EloParams(**{key: tuple(value) if isinstance(value, list) else value for key, value in state["params"].items()}))
+        engine.players = list(state["players"])
+        engine.index = {player: idx for idx, player in enumerate(engine.players)}
+        engine.ratings = np.array(state["ratings"], dtype=np.int64)
+        engine.match_counts = np.array(state["match_counts"], dtype=np.int64)
+        engine.wins = np.array(state["wins"], dtype=np.int64)
+        for player, clubs in state["club_counts"].items():
+            engine.club_counts[player].update(clubs)
+        engine.processed = state["processed"]
+        engine.watermark = state["watermark"]
+        engine.last_match_id = state.get("last_match_id")
+        return engine
+
+    def ranking(self) -> List[Dict[str, Any]]:
+        order = np.argsort(-self.ratings, kind="stable")
+        ranking_data: List[Dict[str, Any]] = []
+        for idx in order.tolist():
+            player = self.players[idx]
+            clubs = self.club_counts.get(player)
+            matches = int(self.match_counts[idx])
+            wins = int(self.wins[idx])
+            ranking_data.append({
+                "player": player,
+                "elo": int(self.ratings[idx]),
+                "club": max(clubs.items(), key=lambda x: x[1])[0] if clubs else "Unknown",
+                "matches": matches,
+                "wins": wins,
+                "win_rate": round(wins / matches * 100, 1) if matches > 0 else 0.0
+            })
+        return ranking_data
+
+def resume_engine(matches: List[Dict[str, Any]], state: Optional[Dict[str, Any]],
+                  params: EloParams = DEFAULT_PARAMS) -> Tuple[EloEngine, List[Dict[str, Any]]]:
+    """Restore a checkpoint and return it with the matches still to rate.
+
+    The checkpoint is only reused when it was produced with the current parameters
+    and the matches it covered are still, unchanged, the first finished matches of
+    the season. Otherwise a fresh engine is returned with every match to replay.
+    """
+    rated = rated_matches(matches)
+    if state and state.get("version") == STATE_VERSION and state.get("params") == engine_params(params):
+        processed = state.get("processed", 0)
+        if processed <= len(rated):
+            digest = ""
+            for match in rated[:processed]:
+                digest = chain_digest(digest, match)
+            if digest == state.get("watermark"):
+                return EloEngine.from_state(state), rated[processed:]
+    return EloEngine(params), rated
@@ -0,0 +1,53 @@
+import os
+import re
+import time
+from typing import Awaitable, Callable, Dict, Optional
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "html_cache")
+
+DAY = 24 * 60 * 60
+TTL_SECONDS: Dict[str, int] = {
+    "teams": 30 * DAY,
+    "roster": 30 * DAY,
+    "profile": 7 * DAY
+}
+
+def cache_path(kind: str, key: str) -> str:
+    safe_key = re.sub(r'[^A-Za-z0-9_-]', '_', str(key))
+    return os.path.join(CACHE_DIR, kind, f"{safe_key}.html")
+
+def read_cached(kind: str, key: str, max_age: Optional[float] = None) -> Optional[str]:
+    """Return the cached page, or None if it is missing or older than max_age seconds"""
+    path = cache_path(kind, key)
+    if not os.path.exists(path):
+        return None
+    if max_age is not None and time.time() - os.path.getmtime(path) > max_age:
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+def write_cached(kind: str, key: str, content: str) -> None:
+    path = cache_path(kind, key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+async def get_page(kind: str, key: str, fetch: Callable[[], Awaitable[Optional[str]]], from_cache: bool = False) -> Optional[str]:
+    """Serve a page from the cache while it is fresh, otherwise fetch and store it.
+
+    With from_cache=True the network is never touched: any cached copy is returned
+    regardless of its age, and None when the page was never downloaded.
+    """
+    if from_cache:
+        return read_cached(kind, key)
+
+    cached = read_cached(kind, key, TTL_SECONDS.get(kind))
+    if cached is not None:
+        return cached
+
+    content = await fetch()
+    if content:
+        write_cached(kind, key, content)
+    return content
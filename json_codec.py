@@ -0,0 +1,119 @@
+import gzip
+import json
+import os
+from typing import IO, Any, Iterator, Optional
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Compression of new files: "" (plain), "gz" or "zst"; JSON_PRETTY=1 indents for debugging
+COMPRESSION: str = os.environ.get("JSON_COMPRESSION", "")
+PRETTY: bool = os.environ.get("JSON_PRETTY", "0") == "1"
+
+SUFFIXES = ("", ".zst", ".gz")
+
+def dumps(obj: Any, pretty: Optional[bool] = None) -> bytes:
+    pretty = PRETTY if pretty is None else pretty
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        if pretty:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, option=option)
+    if pretty:
+        return json.dumps(obj, ensure_ascii=False, indent=2).encode("utf-8")
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+def loads(data: Any) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def resolve(path: str) -> Optional[str]:
+    """The existing file for path: the plain file, else its .zst or .gz variant"""
+    base = strip_suffix(path)
+    for suffix in SUFFIXES:
+        if os.path.exists(base + suffix):
+            return base + suffix
+    return None
+
+def strip_suffix(path: str) -> str:
+    for suffix in (".zst", ".gz"):
+        if path.endswith(suffix):
+            return path[:-len(suffix)]
+    return path
+
+def open_binary(path: str, mode: str) -> IO[bytes]:
+    """Open path for "rb", "wb" or "ab", compressing according to its extension"""
+    if path.endswith(".gz"):
+        return gzip.open(path, mode)
+    if path.endswith(".zst"):
+        if zstandard is None:
+            raise ImportError(f"zstandard is required to open {path}")
+        return zstandard.open(path, mode)
+    return open(path, mode)
+
+def read_bytes(path: str) -> bytes:
+    with open_binary(path, "rb") as f:
+        return f.read()
+
+def load(path: str) -> Any:
+    """Load path or its compressed variant; raises FileNotFoundError when neither exists"""
+    resolved = resolve(path)
+    if resolved is None:
+        raise FileNotFoundError(path)
+    return loads(read_bytes(resolved))
+
+def output_path(path: str, compression: Optional[str] = None) -> str:
+    compression = COMPRESSION if compression is None else compression
+    if compression == "zst" and zstandard is None:
+        compression = "gz"
+    base = strip_suffix(path)
+    return f"{base}.{compression}" if compression else base
+
+def dump(obj: Any, path: str, pretty: Optional[bool] = None, compression: Optional[str] = None) -> str:
+    """Write obj atomically and remove stale variants of the same file; returns the path written.
+
+    Compressed output is byte-for-byte reproducible (no gzip timestamp), so an
+    unchanged payload keeps the same hash in the snapshot manifest.
+    """
+    target = output_path(path, compression)
+    tmp_path = target + ".tmp"
+    with open(tmp_path, "wb") as raw:
+        data = dumps(obj, pretty)
+        if target.endswith(".gz"):
+            with gzip.GzipFile(fileobj=raw, mode="wb", mtime=0) as f:
+                f.write(data)
+        elif target.endswith(".zst"):
+            raw.write(zstandard.ZstdCompressor(level=10).compress(data))
+        else:
+            raw.write(data)
+    os.replace(tmp_path, target)
+
+    base = strip_suffix(path)
+    for suffix in SUFFIXES:
+        if base + suffix != target and os.path.exists(base + suffix):
+            os.remove(base + suffix)
+    return target
+
+def iter_lines(path: str) -> Iterator[Any]:
+    """Yield the records of a JSONL file or its compressed variant, skipping blank lines"""
+    resolved = resolve(path)
+    if resolved is None:
+        return
+    with open_binary(resolved, "rb") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield loads(line)
+
+def append_lines(records: Any, path: str) -> None:
+    with open_binary(path, "ab") as f:
+        for record in records:
+            f.write(dumps(record, pretty=False) + b"\n")
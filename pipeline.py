@@ -0,0 +1,206 @@
+import hashlib
+import inspect
+import json
+import logging
+import os
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, NamedTuple, Optional, Sequence, Set
+
+import json_codec
+from snapshot import file_digest
+
+logger = logging.getLogger(__name__)
+
+# Hidden, so the snapshot manifest does not pick it up
+STATE_FILENAME = ".pipeline_state.json"
+
+class Stage(NamedTuple):
+    name: str
+    run: Callable[[], Any]
+    inputs: Sequence[str] = ()
+    outputs: Sequence[str] = ()
+    deps: Sequence[str] = ()
+    # Functions or modules whose source is part of the fingerprint
+    code: Sequence[Any] = ()
+    # Configuration that changes the outputs (env settings, group lists...)
+    params: Any = None
+
+def path_digest(path: str) -> Optional[str]:
+    """Content hash of a file (or its compressed variant) or of a directory tree; None when missing"""
+    if os.path.isdir(path):
+        digest = hashlib.sha256()
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for name in sorted(files):
+                if name.endswith(".tmp"):
+                    continue
+                full = os.path.join(root, name)
+                digest.update(f"{os.path.relpath(full, path)}:{file_digest(full)}\n".encode("utf-8"))
+        return digest.hexdigest()
+    resolved = json_codec.resolve(path)
+    if resolved is None:
+        return None
+    return file_digest(resolved)
+
+def code_digest(objects: Iterable[Any]) -> str:
+    digest = hashlib.sha256()
+    for obj in objects:
+        try:
+            source = inspect.getsource(obj)
+        except (OSError, TypeError):
+            source = repr(obj)
+        digest.update(source.encode("utf-8"))
+    return digest.hexdigest()
+
+class Pipeline:
+    """Make-style runner: a stage runs only when its fingerprint (code, params and
+    input hashes) changed or one of its outputs is missing or was modified.
+
+    Stages whose dependencies are done run concurrently in a thread pool. A stage
+    without inputs (the network scrape) is a source: there is nothing to compare,
+    so it always runs when it is a target (every stage is by default). When it is
+    only pulled in as a dependency of other targets, it is reused as long as its
+    outputs exist, so rebuilding a later stage stays offline.
+
+    A stage that raises is reported as failed and records no state, so it runs
+    again next time.
+    """
+
+    def __init__(self, stages: Sequence[Stage], state_path: str, root: Optional[str] = None):
+        self.stages: Dict[str, Stage] = {}
+        for stage in stages:
+            if stage.name in self.stages:
+                raise ValueError(f"Duplicate stage {stage.name}")
+            self.stages[stage.name] = stage
+        for stage in stages:
+            for dep in stage.deps:
+                if dep not in self.stages:
+                    raise ValueError(f"Stage {stage.name} depends on unknown stage {dep}")
+        self._check_acyclic()
+
+        self.state_path = state_path
+        # Paths are recorded relative to root (the state file's directory by default),
+        # so the state does not depend on where the repository is checked out
+        self.root = root if root is not None else os.path.dirname(os.path.abspath(state_path))
+        self.state: Dict[str, Any] = self._load_state()
+        self._lock = threading.Lock()
+
+    def _check_acyclic(self) -> None:
+        visiting: Set[str] = set()
+        visited: Set[str] = set()
+
+        def visit(name: str) -> None:
+            if name in visited:
+                return
+            if name in visiting:
+                raise ValueError(f"Dependency cycle through stage {name}")
+            visiting.add(name)
+            for dep in self.stages[name].deps:
+                visit(dep)
+            visiting.discard(name)
+            visited.add(name)
+
+        for name in self.stages:
+            visit(name)
+
+    def _load_state(self) -> Dict[str, Any]:
+        try:
+            state = json_codec.load(self.state_path)
+        except (FileNotFoundError, json.JSONDecodeError, ValueError):
+            return {}
+        return state if isinstance(state, dict) else {}
+
+    def _save_state(self) -> None:
+        json_codec.dump(self.state, self.state_path, pretty=True, compression="")
+
+    def state_key(self, path: str) -> str:
+        return os.path.relpath(os.path.abspath(path), self.root).replace(os.sep, "/")
+
+    def upstream(self, targets: Iterable[str]) -> Set[str]:
+        """The targets and every stage they depend on"""
+        selected: Set[str] = set()
+        stack = list(targets)
+        while stack:
+            name = stack.pop()
+            if name not in self.stages:
+                raise ValueError(f"Unknown stage {name}")
+            if name not in selected:
+                selected.add(name)
+                stack.extend(self.stages[name].deps)
+        return selected
+
+    def fingerprint(self, stage: Stage) -> str:
+        payload = {
+            "code": code_digest(stage.code),
+            "params": stage.params,
+            "inputs": {self.state_key(path): path_digest(path) for path in stage.inputs}
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+    def is_fresh(self, stage: Stage, fingerprint: str) -> bool:
+        if not stage.inputs:
+            # Only reached for sources that are dependencies, see run()
+            return all(path_digest(path) is not None for path in stage.outputs)
+        entry = self.state.get(stage.name)
+        if not entry or entry.get("fingerprint") != fingerprint:
+            return False
+        recorded = entry.get("outputs", {})
+        return all(path_digest(path) is not None and path_digest(path) == recorded.get(self.state_key(path)) for path in stage.outputs)
+
+    def _execute(self, stage: Stage, forced: bool, source: bool = False) -> str:
+        fingerprint = self.fingerprint(stage)
+        if not forced and not source and self.is_fresh(stage, fingerprint):
+            logger.info(f"⏩ Stage {stage.name} is up to date, skipping")
+            return "skipped"
+
+        logger.info(f"▶️ Running stage {stage.name}{' (forced)' if forced else ''}")
+        stage.run()
+        outputs = {self.state_key(path): path_digest(path) for path in stage.outputs}
+        with self._lock:
+            self.state[stage.name] = {"fingerprint": fingerprint, "outputs": outputs}
+            self._save_state()
+        return "ran"
+
+    def run(self, targets: Optional[Iterable[str]] = None, force: Iterable[str] = (), workers: int = 4) -> Dict[str, str]:
+        """Run the targets (all stages by default) and their dependencies.
+
+        Returns the status of every selected stage: "ran", "skipped", "failed",
+        or "blocked" when a dependency failed.
+        """
+        requested = list(targets) if targets else list(self.stages)
+        selected = self.upstream(requested)
+        forced = set(self.stages) if "all" in force else set(force)
+        unknown = forced - set(self.stages)
+        if unknown:
+            raise ValueError(f"Unknown stage {', '.join(sorted(unknown))}")
+        sources = {name for name in requested if not self.stages[name].inputs}
+
+        status: Dict[str, str] = {}
+        pending = [name for name in self.stages if name in selected]
+        running: Dict[Future, str] = {}
+
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            while pending or running:
+                for name in list(pending):
+                    deps = [dep for dep in self.stages[name].deps if dep in selected]
+                    if any(status.get(dep) in ("failed", "blocked") for dep in deps):
+                        status[name] = "blocked"
+                        pending.remove(name)
+                        logger.error(f"❌ Stage {name} not run, a dependency failed")
+                    elif all(status.get(dep) in ("ran", "skipped") for dep in deps):
+                        pending.remove(name)
+                        running[pool.submit(self._execute, self.stages[name], name in forced, name in sources)] = name
+
+                if not running:
+                    continue
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        status[name] = future.result()
+                    except Exception as e:
+                        status[name] = "failed"
+                        logger.error(f"❌ Stage {name} failed: {e}")
+        return status
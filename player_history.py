@@ -0,0 +1,80 @@
+import os
+from typing import Any, Dict, Iterable, Iterator, List, Set, Tuple
+
+import json_codec
+
+def iter_history(path: str) -> Iterator[Dict[str, Any]]:
+    """Yield the records of a JSONL history file one at a time"""
+    if not os.path.exists(path):
+        return
+    yield from json_codec.iter_lines(path)
+
+def load_history_keys(path: str) -> Set[Tuple[Any, Any]]:
+    """Collect (player_id, match_id) pairs already written, so reruns only append new records"""
+    return {(r.get("player_id"), r.get("match_id")) for r in iter_history(path)}
+
+def load_history_by_player(path: str) -> Dict[Any, List[Dict[str, Any]]]:
+    """Records of a JSONL history file grouped by player_id, in file order"""
+    by_player: Dict[Any, List[Dict[str, Any]]] = {}
+    for record in iter_history(path):
+        by_player.setdefault(record.get("player_id"), []).append(record)
+    return by_player
+
+def rebuild_path(path: str) -> str:
+    """Temporary file a history is rebuilt into, with the same compression suffix"""
+    directory, name = os.path.split(path)
+    return os.path.join(directory, f".rebuild.{name}")
+
+class HistoryWriter:
+    """Writes the records of a scraper run to the history of the group's players.
+
+    A normal run appends the records not written yet. A rebuild (reparse from the
+    cache) writes every record into a temporary file that replaces the history on
+    commit(), so parser fixes also correct the records already written; players
+    whose profile is not available keep their previous records.
+    """
+
+    def __init__(self, path: str, rebuild: bool = False):
+        self.path = path
+        self.rebuild = rebuild
+        if rebuild:
+            self.previous = load_history_by_player(path)
+            self.known_keys: Set[Tuple[Any, Any]] = set()
+            self.output_path = rebuild_path(path)
+            if os.path.exists(self.output_path):
+                os.remove(self.output_path)
+        else:
+            self.previous = {}
+            self.known_keys = load_history_keys(path)
+            self.output_path = path
+
+    def keep_previous(self, player_id: Any) -> int:
+        """Carry over the records of a player whose profile is not available; returns how many"""
+        kept = self.previous.pop(player_id, [])
+        if kept:
+            json_codec.append_lines(kept, self.output_path)
+        return len(kept)
+
+    def add(self, player_id: Any, records: Iterable[Dict[str, Any]]) -> int:
+        """Write the player's records that are not in the history yet; returns how many"""
+        self.previous.pop(player_id, None)
+        new_records = []
+        for record in records:
+            key = (record.get("player_id"), record.get("match_id"))
+            if key in self.known_keys:
+                continue
+            self.known_keys.add(key)
+            new_records.append(record)
+        if new_records:
+            json_codec.append_lines(new_records, self.output_path)
+        return len(new_records)
+
+    def commit(self) -> None:
+        """Finish a rebuild: keep the players no longer on a roster and swap the new history in"""
+        if not self.rebuild:
+            return
+        for records in self.previous.values():
+            json_codec.append_lines(records, self.output_path)
+        self.previous = {}
+        if os.path.exists(self.output_path):
+            os.replace(self.output_path, self.path)
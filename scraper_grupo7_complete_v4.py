@@ -1,13 +1,19 @@
+import argparse
 import asyncio
-import json
 import re
 from datetime import datetime
 from bs4 import BeautifulSoup
 from playwright.async_api import async_playwright
+from html_cache import get_page
+from player_history import HistoryWriter
+import json_codec
 
 MIN_DATE = datetime(2024, 9, 1)
 MAX_DATE = datetime(2025, 7, 31)
 BASE_URL = "https://competicion.fatm.eu"
+TEAMS_PAGE_ID = "61366"
+HISTORY_FILE = "historique_grupo7_complete.jsonl"
+PLAYERS_FILE = "grupo7_players_by_team.json"
 
 month_map = {
     'Jan': 1, 'Feb': 2, 'Mar': 3, 'Apr': 4, 'May': 5, 'Jun': 6,
@@ -122,90 +128,85 @@ def extract_matches_from_html(html_content: str):
     
     return matches
 
-async def extract_teams():
-    """STEP 1: Extract all team URLs from team/view/61461"""
+async def fetch_page_content(url: str, wait_ms: int) -> str:
     async with async_playwright() as p:
         browser = await p.chromium.launch(headless=True)
         page = await browser.new_page()
         
-        await page.goto("https://competicion.fatm.eu/es/team/view/61366", wait_until="domcontentloaded", timeout=30000)
-        await page.wait_for_timeout(2000)
+        await page.goto(url, wait_until="domcontentloaded", timeout=30000)
+        await page.wait_for_timeout(wait_ms)
         
         content = await page.content()
         await browser.close()
-        
-        soup = BeautifulSoup(content, "html.parser")
-        text_clamps = soup.find_all("div", class_="text-clamp")
-        
-        teams = []
-        for elem in text_clamps:
-            link = elem.find("a")
-            if link:
-                href = link.get('href', '')
-                if href and '/team/view/' in href:
-                    match = re.search(r'/team/view/(\d+)-', href)
-                    if match:
-                        team_id = match.group(1)
-                        team_name = link.get_text(strip=True)
-                        teams.append({
-                            'id': team_id,
-                            'name': team_name,
-                            'url': f"https://competicion.fatm.eu/es/team/view/{team_id}"
-                        })
-        
-        print(f"Found {len(teams)} teams")
-        return teams
+        return content
 
-async def extract_players_from_team(team_url):
-    """Extract all players from a team page"""
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=True)
-        page = await browser.new_page()
-        
-        await page.goto(team_url, wait_until="domcontentloaded", timeout=30000)
-        await page.wait_for_timeout(2000)
-        
-        content = await page.content()
-        await browser.close()
-        
-        soup = BeautifulSoup(content, "html.parser")
-        member_items = soup.find_all("div", class_="member-item")
-        
-        players = []
-        for item in member_items:
-            onclick = item.get('onclick', '')
-            if onclick and 'profile/view' in onclick:
-                match = re.search(r'/profile/view/(\d+)-', onclick)
+def parse_teams(content: str):
+    soup = BeautifulSoup(content, "html.parser")
+    text_clamps = soup.find_all("div", class_="text-clamp")
+    
+    teams = []
+    for elem in text_clamps:
+        link = elem.find("a")
+        if link:
+            href = link.get('href', '')
+            if href and '/team/view/' in href:
+                match = re.search(r'/team/view/(\d+)-', href)
                 if match:
-                    player_id = match.group(1)
-                    player_name = item.get_text(strip=True)
-                    players.append({
-                        'id': player_id,
-                        'name': player_name
+                    team_id = match.group(1)
+                    team_name = link.get_text(strip=True)
+                    teams.append({
+                        'id': team_id,
+                        'name': team_name,
+                        'url': f"https://competicion.fatm.eu/es/team/view/{team_id}"
                     })
-        
-        return players
+    return teams
 
-async def fetch_player_matches(player_id: str):
-    """STEP 3: Fetch and extract matches for a player"""
+def parse_team_players(content: str):
+    soup = BeautifulSoup(content, "html.parser")
+    member_items = soup.find_all("div", class_="member-item")
+    
+    players = []
+    for item in member_items:
+        onclick = item.get('onclick', '')
+        if onclick and 'profile/view' in onclick:
+            match = re.search(r'/profile/view/(\d+)-', onclick)
+            if match:
+                player_id = match.group(1)
+                player_name = item.get_text(strip=True)
+                players.append({
+                    'id': player_id,
+                    'name': player_name
+                })
+    return players
+
+async def extract_teams(from_cache: bool = False):
+    """STEP 1: Extract all team URLs from team/view/61366"""
+    url = f"{BASE_URL}/es/team/view/{TEAMS_PAGE_ID}"
+    content = await get_page("teams", TEAMS_PAGE_ID, lambda: fetch_page_content(url, 2000), from_cache)
+    teams = parse_teams(content) if content else []
+    
+    print(f"Found {len(teams)} teams")
+    return teams
+
+async def extract_players_from_team(team_url, from_cache: bool = False):
+    """Extract all players from a team page"""
+    team_id = team_url.rstrip("/").rsplit("/", 1)[-1]
+    content = await get_page("roster", team_id, lambda: fetch_page_content(team_url, 2000), from_cache)
+    return parse_team_players(content) if content else []
+
+async def fetch_player_matches(player_id: str, from_cache: bool = False):
+    """STEP 3: Fetch and extract matches for a player; None when the profile page is not available"""
     try:
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(headless=True)
-            page = await browser.new_page()
-            
-            profile_url = f"{BASE_URL}/es/profile/view/{player_id}"
-            
-            await page.goto(profile_url, wait_until="domcontentloaded", timeout=30000)
-            await page.wait_for_timeout(1000)
-            
-            content = await page.content()
-            await browser.close()
-            
-            matches = extract_matches_from_html(content)
-            return matches
+        profile_url = f"{BASE_URL}/es/profile/view/{player_id}"
+        content = await get_page("profile", player_id, lambda: fetch_page_content(profile_url, 1000), from_cache)
+        if not content:
+            return None
+        
+        matches = extract_matches_from_html(content)
+        return matches
     except Exception as e:
         print(f"[ERROR] Failed to fetch player {player_id}: {e}")
-        return []
+        return None
 
 def determine_result(home_player: str, away_player: str, home_score: int, away_score: int, player_name: str) -> str:
     """Determine if player won, lost, or drew"""
@@ -234,12 +235,16 @@ def determine_result(home_player: str, away_player: str, home_score: int, away_s
         else:
             return "draw"
 
-async def main():
+async def main(history_path: str, from_cache: bool = False):
     print("=" * 60)
     print("STEP 1: Extracting teams from team/view/61461...")
     print("=" * 60)
     
-    teams = await extract_teams()
+    teams = await extract_teams(from_cache)
+    if not teams:
+        # An empty or missing cache (or a failed fetch) must not wipe the players file and history
+        print("[ERROR] No teams found, nothing written")
+        raise SystemExit(1)
     
     print("\nTeams found:")
     for team in teams:
@@ -254,7 +259,7 @@ async def main():
     
     for team in teams:
         print(f"\nFetching players from {team['name']}...")
-        players = await extract_players_from_team(team['url'])
+        players = await extract_players_from_team(team['url'], from_cache)
         all_players[team['id']] = {
             'team_name': team['name'],
             'players': players,
@@ -273,12 +278,19 @@ async def main():
     print("STEP 3: Fetching historical matches for all players...")
     print("=" * 60)
     
-    all_matches = []
+    # A reparse from the cache rebuilds the history instead of appending to it
+    history = HistoryWriter(history_path, rebuild=from_cache)
+    total_matches = 0
+    new_matches = 0
     total_players = len(players_list)
     
     for idx, player in enumerate(players_list, 1):
         print(f"[{idx}/{total_players}] Fetching matches for {player['player_name']} ({player['player_id']})...")
-        matches = await fetch_player_matches(player['player_id'])
+        matches = await fetch_player_matches(player['player_id'], from_cache)
+        if matches is None:
+            kept = history.keep_previous(player['player_id'])
+            print(f"  Profile not available, kept {kept} previous records")
+            continue
         
         for match in matches:
             clean_name = clean_player_name(player['player_name'])
@@ -289,15 +301,16 @@ async def main():
             match['team_id'] = player['team_id']
             match['team_name'] = player['team_name']
             match['result'] = result
-            all_matches.append(match)
         
-        print(f"  Found {len(matches)} matches")
+        written = history.add(player['player_id'], matches)
+        
+        total_matches += len(matches)
+        new_matches += written
+        print(f"  Found {len(matches)} matches ({written} new)")
     
-    with open("historique_grupo7_complete.json", "w", encoding="utf-8") as f:
-        json.dump(all_matches, f, ensure_ascii=False, indent=2)
+    history.commit()
     
-    with open("grupo7_players_by_team.json", "w", encoding="utf-8") as f:
-        json.dump(all_players, f, ensure_ascii=False, indent=2)
+    players_path = json_codec.dump(all_players, PLAYERS_FILE)
     
     print("\n" + "=" * 60)
     print("SUMMARY")
@@ -307,10 +320,14 @@ async def main():
     
     total_players_count = sum(data['count'] for data in all_players.values())
     print(f"\nTotal players: {total_players_count}")
-    print(f"Total matches found: {len(all_matches)}")
+    print(f"Total matches found: {total_matches} ({new_matches} new)")
     print(f"\nResults saved to:")
-    print(f"  - historique_grupo7_complete.json (all matches)")
-    print(f"  - grupo7_players_by_team.json (players by team)")
+    print(f"  - {history_path} (all matches, one JSON record per line)")
+    print(f"  - {players_path} (players by team)")
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    parser = argparse.ArgumentParser(description="Scrape the historical matches of every player in the group")
+    parser.add_argument("--gzip", action="store_true", help=f"append to {HISTORY_FILE}.gz instead of the plain JSONL file")
+    parser.add_argument("--from-cache", action="store_true", help="reparse cached team and profile pages only, without any network access, and rebuild the history from them")
+    args = parser.parse_args()
+    asyncio.run(main(HISTORY_FILE + ".gz" if args.gzip else HISTORY_FILE, args.from_cache))
@@ -1,15 +1,31 @@
 import os
 import re
+import sys
 import json
 import asyncio
+import argparse
 import logging
-from typing import Dict, List, Tuple, Optional, Any, DefaultDict
-from collections import defaultdict
+from typing import Dict, List, Tuple, Optional, Any
 from bs4 import BeautifulSoup
 import requests
 from tqdm.asyncio import tqdm_asyncio
 from asyncio import Semaphore
 from playwright.async_api import async_playwright
+from elo_engine import (HISTORY_COLUMNS, EloEngine, annotate_sides, empty_history, historical_duel_matches,
+                        merge_streams, resolve_sides, resume_engine, team_for_code)
+from duel_log import chronological
+from analytics_db import DB_FILENAME, build_database
+from duels_table import duel_columns, write_duels_table
+from snapshot import MANIFEST_FILENAME, publish_manifest
+from pipeline import STATE_FILENAME, Pipeline, Stage
+import analytics_db
+import duel_log
+import duels_table
+import elo_engine
+import json_codec
+import snapshot
+import validation
+from validation import validate_matches
 
 logging.basicConfig(level=logging.INFO, format='%(message)s')
 logger = logging.getLogger(__name__)
@@ -43,8 +59,15 @@ os.makedirs(OUT_DIR, exist_ok=True)
 os.makedirs(HTML_DIR, exist_ok=True)
 os.makedirs(STANDINGS_DIR, exist_ok=True)
 
-INITIAL_ELO: int = 1400
-K_FACTOR: int = 100
+ELO_FILES: Dict[str, str] = {
+    "Grupo6": "matches_Grupo6_enriched.json",
+    "Grupo7": "matches_Grupo7_enriched.json"
+}
+HISTORICAL_FILES: List[str] = ["historique_grupo6_complete.jsonl", "historique_grupo7_complete.jsonl"]
+
+# "group" rates each group on its own, "unified" rates every group in one chronological pass
+ELO_MODE: str = os.environ.get("ELO_MODE", "group")
+ELO_INCLUDE_HISTORICAL: bool = os.environ.get("ELO_INCLUDE_HISTORICAL", "0") == "1"
 
 sem: Semaphore = Semaphore(SEMAPHORE_LIMIT)
 
@@ -75,8 +98,8 @@ def get_matches_json(competition_id: int) -> Dict[str, Any]:
         r.raise_for_status()
         return r.json()
     except requests.RequestException as e:
-        logger.warning(f"Network error for competition {competition_id}: {e}")
-        return {"aaData": []}
+        # Failing the stage keeps the previous matches file instead of overwriting it with nothing
+        raise RuntimeError(f"Network error for competition {competition_id}: {e}") from e
 
 def get_all_group_matches(json_data: Dict[str, Any], competition_id: int, target_group: str) -> List[Dict[str, Any]]:
     out: List[Dict[str, Any]] = []
@@ -179,36 +202,7 @@ def get_standings(html_content: Optional[str], competition_id: int) -> Dict[str,
         return {}
 
 def get_club_from_code_scraper(code: str, match: Dict[str, Any]) -> str:
-    abc_wins: int = 0
-    xyz_wins: int = 0
-
-    for g in match.get("games", []):
-        hc = g.get("home_code", "").strip()
-        hs = g.get("home_score", 0)
-        ac = g.get("away_code", "").strip()
-        as_ = g.get("away_score", 0)
-
-        if hc in ABC_CODES and hs > as_:
-            abc_wins += 1
-        elif ac in ABC_CODES and as_ > hs:
-            abc_wins += 1
-        elif hc in XYZ_CODES and hs > as_:
-            xyz_wins += 1
-        elif ac in XYZ_CODES and as_ > hs:
-            xyz_wins += 1
-
-    if abc_wins == match.get("score_home", 0):
-        abc_team = match.get("home_team")
-        xyz_team = match.get("away_team")
-    else:
-        abc_team = match.get("away_team")
-        xyz_team = match.get("home_team")
-
-    if code in ABC_CODES:
-        return abc_team or "Unknown"
-    elif code in XYZ_CODES:
-        return xyz_team or "Unknown"
-    return "Unknown"
+    return team_for_code(code.strip(), resolve_sides(match))
 
 async def limited_fetch(playwright: Any, match_id: str, competition_id: int) -> None:
     async with sem:
@@ -332,22 +326,38 @@ def parse_acta_file(filepath: str, match: Dict[str, Any]) -> List[Dict[str, Any]
         return games[:MIN_GAMES_FOR_VALID_MATCH]
 
     if len(games) >= TOTAL_GAMES_WITH_DOUBLE:
-        home_team = get_club_from_code_scraper(games[DOUBLE_GAME_INDEX].get("home_code"), match)
-        away_team = get_club_from_code_scraper(games[DOUBLE_GAME_INDEX].get("away_code"), match)
+        parsed = {**match, "games": games}
+        home_team = get_club_from_code_scraper(games[DOUBLE_GAME_INDEX].get("home_code", ""), parsed)
+        away_team = get_club_from_code_scraper(games[DOUBLE_GAME_INDEX].get("away_code", ""), parsed)
         games[DOUBLE_GAME_INDEX]["home_player"] = f"Doble {home_team}"
         games[DOUBLE_GAME_INDEX]["away_player"] = f"Doble {away_team}"
 
     return games
 
-async def process_competition(comp_id: int, group_name: str) -> None:
-    safe_name = re.sub(r'[^A-Za-z0-9]', '', group_name)
+def quarantine_invalid(group: str, matches: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    clean, report = validate_matches(matches)
+    report_path = json_codec.dump(report, os.path.join(OUT_DIR, f"quarantine_{group}.json"))
+    bad_matches = len(report["quarantined_matches"])
+    bad_games = len(report["quarantined_games"])
+    if bad_matches or bad_games:
+        logger.warning(f"⚠️ {bad_matches} matches and {bad_games} games quarantined in {group}, see {report_path}")
+        for entry in report["quarantined_matches"]:
+            logger.warning(f"   Match {entry['match_id']}: {'; '.join(entry['errors'])}")
+    else:
+        logger.info(f"✅ {report['checked_games']} games validated in {group}")
+    return clean
+
+def group_slug(group_name: str) -> str:
+    return re.sub(r'[^A-Za-z0-9]', '', group_name)
+
+async def fetch_competition(comp_id: int, group_name: str) -> None:
+    safe_name = group_slug(group_name)
     json_data = get_matches_json(comp_id)
     matches = get_all_group_matches(json_data, comp_id, group_name)
     logger.info(f"\n📦 {len(matches)} matches retrieved in {group_name}")
 
     raw_path = os.path.join(OUT_DIR, f"matches_{safe_name}.json")
-    with open(raw_path, "w", encoding="utf-8") as f:
-        json.dump(matches, f, ensure_ascii=False, indent=2)
+    json_codec.dump(matches, raw_path)
 
     finalizados = [m for m in matches if m.get("status") == "Finalizado"]
 
@@ -356,270 +366,269 @@ async def process_competition(comp_id: int, group_name: str) -> None:
         if tasks:
             await tqdm_asyncio.gather(*tasks, desc=f"Downloading Actas {group_name}")
 
-    for m in finalizados:
+    async with async_playwright() as p:
+        await fetch_standings_html(p, comp_id)
+
+def parse_competition(comp_id: int, group_name: str) -> None:
+    safe_name = group_slug(group_name)
+    matches = load_json_file(os.path.join(OUT_DIR, f"matches_{safe_name}.json"))
+    if matches is None:
+        raise FileNotFoundError(f"Error loading matches_{safe_name}.json, run the scrape stage first")
+
+    for m in matches:
+        if m.get("status") != "Finalizado":
+            continue
         html_file = os.path.join(HTML_DIR, f"debug_li_summary_{m['match_id']}.html")
         if os.path.exists(html_file):
             games = parse_acta_file(html_file, m)
             m["games"] = games
+            annotate_sides(m)
+
+    matches = quarantine_invalid(safe_name, matches)
 
     enriched_path = os.path.join(OUT_DIR, f"matches_{safe_name}_enriched.json")
-    with open(enriched_path, "w", encoding="utf-8") as f:
-        json.dump(matches, f, ensure_ascii=False, indent=2)
+    enriched_path = json_codec.dump(matches, enriched_path)
     logger.info(f"✅ Enriched file saved: {enriched_path}")
 
-    async with async_playwright() as p:
-        standings_html = await fetch_standings_html(p, comp_id)
-    
+    standings_html: Optional[str] = None
+    html_path = os.path.join(STANDINGS_DIR, f"standings_{comp_id}.html")
+    if os.path.exists(html_path):
+        with open(html_path, "r", encoding="utf-8") as f:
+            standings_html = f.read()
+
     standings = get_standings(standings_html, comp_id)
     if standings:
         standings_path = os.path.join(OUT_DIR, f"standings_{safe_name}.json")
-        with open(standings_path, "w", encoding="utf-8") as f:
-            json.dump(standings, f, ensure_ascii=False, indent=2)
+        standings_path = json_codec.dump(standings, standings_path)
         logger.info(f"✅ Standings file saved: {standings_path}")
     else:
         logger.warning(f"⚠️ No standings data retrieved for {group_name}")
 
-async def scrape_data() -> None:
+async def fetch_all() -> None:
+    for comp_id, group_name in COMPETITIONS.items():
+        await fetch_competition(comp_id, group_name)
+
+def scrape_data() -> None:
     logger.info("\n" + "="*60)
     logger.info("🔄 STEP 1: SCRAPING DATA FROM FATM")
     logger.info("="*60)
+    asyncio.run(fetch_all())
+
+def parse_data() -> None:
+    logger.info("\n" + "="*60)
+    logger.info("🧩 STEP 2: PARSING ACTAS AND STANDINGS")
+    logger.info("="*60)
     for comp_id, group_name in COMPETITIONS.items():
-        await process_competition(comp_id, group_name)
-
-def is_valid_player(name: str) -> bool:
-    if not name or name.strip() == "":
-        return False
-    name = name.strip().upper()
-    if name in {"A", "B", "C", "X", "Y", "Z", "ABC", "XYZ"}:
-        return False
-    if "DOBLE" in name:
-        return False
-    return True
-
-def compute_result(home_score: int, away_score: int, home_sets: List[int] = None, away_sets: List[int] = None) -> float:
-    if home_score == away_score == 0:
-        return 0.5
-    
-    total_sets = home_score + away_score
-    if total_sets > 0:
-        sets_result = home_score / total_sets
-    else:
-        sets_result = 0.5
-    
-    if home_sets and away_sets:
-        home_points = sum(s for s in home_sets if s > 0)
-        away_points = sum(s for s in away_sets if s > 0)
-        total_points = home_points + away_points
-        if total_points > 0:
-            points_result = home_points / total_points
-        else:
-            points_result = 0.5
-        
-        average_point_diff = 0.0
-        valid_sets = 0
-        for h, a in zip(home_sets, away_sets):
-            if h > 0 or a > 0:
-                average_point_diff += abs(h - a)
-                valid_sets += 1
-        
-        if valid_sets > 0:
-            average_point_diff /= valid_sets
-            tightness_factor = 1.0 - (average_point_diff / 20.0)
-            tightness_factor = max(0.0, min(1.0, tightness_factor))
-            points_result = 0.5 + (points_result - 0.5) * tightness_factor
-        
-        result = 0.7 * sets_result + 0.3 * points_result
-    else:
-        result = sets_result
-    
-    return max(0.0, min(1.0, result))
-
-def get_margin_coefficient(home_score: int, away_score: int) -> float:
-    margin = abs(home_score - away_score)
-    if margin == 3:
-        return 1.2
-    elif margin == 2:
-        return 1.0
-    else:
-        return 0.85
+        parse_competition(comp_id, group_name)
 
-def get_dynamic_k_factor(player: str, opponent: str, scores: Dict[str, int], player_matches: Dict[str, int], elo_diff: float) -> float:
-    base_k = K_FACTOR
-    
-    player_match_count = player_matches.get(player, 0)
-    if player_match_count < 5:
-        exp_factor = 1.5
-    elif player_match_count < 15:
-        exp_factor = 1.2
-    else:
-        exp_factor = 1.0
-    
-    if abs(elo_diff) > 200:
-        gap_factor = 1.3
-    elif abs(elo_diff) > 100:
-        gap_factor = 1.15
-    else:
-        gap_factor = 1.0
-    
-    dynamic_k = base_k * exp_factor * gap_factor
-    return round(dynamic_k)
-
-def update_elo(scores: Dict[str, int], player: str, opponent: str, result: float, 
-               home_score: int, away_score: int, player_matches: Dict[str, int], 
-               k: int = None) -> None:
-    p_elo = scores[player]
-    o_elo = scores[opponent]
-    elo_diff = o_elo - p_elo
-    
-    if k is None:
-        k = get_dynamic_k_factor(player, opponent, scores, player_matches, elo_diff)
-    
-    expected = 1 / (1 + 10 ** (elo_diff / 400))
-    
-    margin_coeff = get_margin_coefficient(home_score, away_score)
-    
-    delta = k * margin_coeff * (result - expected)
-    
-    new_elo = p_elo + delta
-    new_elo = max(800, new_elo)
-    
-    scores[player] = round(new_elo)
-
-def get_club_from_code_elo(code: str, match: Dict[str, Any]) -> str:
-    abc_wins: int = 0
-    xyz_wins: int = 0
-
-    for g in match.get("games", []):
-        hc = g.get("home_code", "").strip()
-        hs = g.get("home_score", 0)
-        ac = g.get("away_code", "").strip()
-        as_ = g.get("away_score", 0)
-
-        if hc in ABC_CODES and hs > as_:
-            abc_wins += 1
-        elif ac in ABC_CODES and as_ > hs:
-            abc_wins += 1
-        elif hc in XYZ_CODES and hs > as_:
-            xyz_wins += 1
-        elif ac in XYZ_CODES and as_ > hs:
-            xyz_wins += 1
-
-    if abc_wins == match.get("score_home", 0):
-        abc_team = match.get("home_team")
-        xyz_team = match.get("away_team")
-    else:
-        abc_team = match.get("away_team")
-        xyz_team = match.get("home_team")
+def load_json_file(path: str) -> Optional[Any]:
+    try:
+        return json_codec.load(path)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
 
-    if code in ABC_CODES:
-        return abc_team or "Unknown"
-    elif code in XYZ_CODES:
-        return xyz_team or "Unknown"
-    return "Unknown"
+def load_historical_records() -> List[Dict[str, Any]]:
+    records: List[Dict[str, Any]] = []
+    for filename in HISTORICAL_FILES:
+        path = os.path.join(os.path.dirname(__file__), filename)
+        try:
+            records.extend(json_codec.iter_lines(path))
+        except (FileNotFoundError, json.JSONDecodeError) as e:
+            logger.warning(f"⚠️ Skipping historical file {filename}: {e}")
+    return records
+
+def rate_matches(name: str, matches: List[Dict[str, Any]]) -> Tuple[EloEngine, Dict[str, List[Any]]]:
+    state_path = os.path.join(OUT_DIR, f"elo_state_{name}.json")
+    history_path = os.path.join(OUT_DIR, f"elo_history_{name}.json")
+    state = load_json_file(state_path)
+    history = load_json_file(history_path)
+    if not history or not state or history.get("watermark") != state.get("watermark"):
+        state = None
+
+    engine, pending = resume_engine(matches, state)
+    if engine.processed:
+        logger.info(f"♻️ Resuming {name} from checkpoint after match {engine.last_match_id} ({engine.processed} matches already rated)")
+        history_columns = history["columns"]
+    else:
+        logger.info(f"🔁 Full Elo replay for {name}")
+        history_columns = empty_history()
+
+    new_rows = engine.apply_matches(pending)
+    for column in HISTORY_COLUMNS:
+        history_columns[column].extend(new_rows[column])
+    logger.info(f"📈 {len(pending)} new matches, {len(new_rows['player']) // 2} duels rated")
+
+    json_codec.dump(engine.state(), state_path)
+    save_history(name, engine, history_columns)
+
+    return engine, history_columns
+
+def save_history(name: str, engine: EloEngine, history_columns: Dict[str, List[Any]]) -> None:
+    history_path = os.path.join(OUT_DIR, f"elo_history_{name}.json")
+    json_codec.dump({
+        "processed": engine.processed,
+        "watermark": engine.watermark,
+        "players": engine.players,
+        "columns": history_columns
+    }, history_path)
+
+def save_ranking(name: str, ranking_data: List[Dict[str, Any]]) -> None:
+    out_path = json_codec.dump(ranking_data, os.path.join(OUT_DIR, f"elo_{name}.json"))
+    logger.info(f"\n🏓 Elo Ranking for {name}:")
+    for i, entry in enumerate(ranking_data, 1):
+        logger.info(f"{i:2d}. {entry['player']:<35} Elo: {entry['elo']:>4d}  |  {entry['matches']:>2d} matches  |  {entry['win_rate']:>5.1f}%  |  Club: {entry['club']}")
+    logger.info(f"✅ File saved: {out_path}")
+
+def load_group_matches(filename: str) -> List[Dict[str, Any]]:
+    """The enriched matches of a group; a missing or corrupt file fails the stage"""
+    return json_codec.load(os.path.join(OUT_DIR, filename))
 
 def process_group(group: str, filename: str) -> None:
-    path = os.path.join(OUT_DIR, filename)
-    
-    try:
-        with open(path, "r", encoding="utf-8") as f:
-            matches = json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError) as e:
-        logger.error(f"Error loading {filename}: {e}")
-        return
+    matches = load_group_matches(filename)
+    engine, _ = rate_matches(group, chronological(matches))
+    save_ranking(group, engine.ranking())
+
+def process_unified(files: Dict[str, str], include_historical: bool = False) -> None:
+    streams: Dict[str, List[Dict[str, Any]]] = {}
+    for group, filename in files.items():
+        streams[group] = load_group_matches(filename)
+
+    competitions = dict(streams)
+    if include_historical:
+        known_ids = [m.get("match_id") for matches in competitions.values() for m in matches]
+        streams["historique"] = historical_duel_matches(load_historical_records(), known_ids)
+        logger.info(f"📚 {len(streams['historique'])} historical matches added to the unified stream")
+
+    engine, history_columns = rate_matches("unified", merge_streams(streams))
+    save_ranking("unified", engine.ranking())
+
+    # Per-group files are views of the unified ratings; their watermark differs
+    # from elo_state_{group}, so switching back to group mode replays in full
+    for group, matches in competitions.items():
+        view = engine.view(matches)
+        match_ids = {m.get("match_id") for m in matches}
+        rows = [i for i, match_id in enumerate(history_columns["match_id"]) if match_id in match_ids]
+        save_history(group, engine, {column: [history_columns[column][i] for i in rows] for column in HISTORY_COLUMNS})
+        save_ranking(group, view.ranking())
 
-    scores: Dict[str, int] = defaultdict(lambda: INITIAL_ELO)
-    club_counts: DefaultDict[str, DefaultDict[str, int]] = defaultdict(lambda: defaultdict(int))
-    player_stats: DefaultDict[str, Dict[str, int]] = defaultdict(lambda: {"matches": 0, "wins": 0})
-    player_match_count: Dict[str, int] = defaultdict(int)
-
-    for match in matches:
-        for duel in match.get("games", []):
-            h = duel.get("home_player", "").strip()
-            a = duel.get("away_player", "").strip()
-            hs = duel.get("home_score", 0)
-            as_ = duel.get("away_score", 0)
-            hc = duel.get("home_code", "").strip()
-            ac = duel.get("away_code", "").strip()
-            h_sets = duel.get("home_sets", [])
-            a_sets = duel.get("away_sets", [])
-
-            if not is_valid_player(h) or not is_valid_player(a):
-                continue
+def calculate_elo() -> None:
+    logger.info("\n" + "="*60)
+    logger.info("📊 STEP 3: CALCULATING ELO RANKINGS")
+    logger.info("="*60)
 
-            h_team = get_club_from_code_elo(hc, match)
-            a_team = get_club_from_code_elo(ac, match)
-
-            club_counts[h][h_team] += 1
-            club_counts[a][a_team] += 1
-
-            player_stats[h]["matches"] += 1
-            player_stats[a]["matches"] += 1
-            player_match_count[h] += 1
-            player_match_count[a] += 1
-
-            if hs > as_:
-                player_stats[h]["wins"] += 1
-            elif as_ > hs:
-                player_stats[a]["wins"] += 1
-
-            result_home = compute_result(hs, as_, h_sets, a_sets)
-            result_away = compute_result(as_, hs, a_sets, h_sets)
-
-            update_elo(scores, h, a, result_home, hs, as_, player_match_count)
-            update_elo(scores, a, h, result_away, as_, hs, player_match_count)
-
-    player_clubs: Dict[str, str] = {
-        player: max(clubs.items(), key=lambda x: x[1])[0]
-        for player, clubs in club_counts.items()
-    }
-
-    ranking = sorted(scores.items(), key=lambda x: x[1], reverse=True)
-    ranking_data: List[Dict[str, Any]] = [
-        {
-            "player": player,
-            "elo": score,
-            "club": player_clubs.get(player, "Unknown"),
-            "matches": player_stats[player]["matches"],
-            "wins": player_stats[player]["wins"],
-            "win_rate": round(player_stats[player]["wins"] / player_stats[player]["matches"] * 100, 1) if player_stats[player]["matches"] > 0 else 0.0
-        }
-        for player, score in ranking
-    ]
+    if ELO_MODE == "unified":
+        process_unified(ELO_FILES, ELO_INCLUDE_HISTORICAL)
+        return
 
-    out_path = os.path.join(OUT_DIR, f"elo_{group}.json")
-    try:
-        with open(out_path, "w", encoding="utf-8") as f:
-            json.dump(ranking_data, f, ensure_ascii=False, indent=2)
-        logger.info(f"\n🏓 Elo Ranking for {group}:")
-        for i, entry in enumerate(ranking_data, 1):
-            logger.info(f"{i:2d}. {entry['player']:<35} Elo: {entry['elo']:>4d}  |  {entry['matches']:>2d} matches  |  {entry['win_rate']:>5.1f}%  |  Club: {entry['club']}")
-        logger.info(f"✅ File saved: {out_path}")
-    except IOError as e:
-        logger.error(f"Error saving {out_path}: {e}")
+    for group, filename in ELO_FILES.items():
+        process_group(group, filename)
 
-def calculate_elo() -> None:
+def publish_database() -> None:
     logger.info("\n" + "="*60)
-    logger.info("📊 STEP 2: CALCULATING ELO RANKINGS")
+    logger.info("🗄️ STEP 4: PUBLISHING ANALYTICS DATABASE")
     logger.info("="*60)
-    
-    FILES: Dict[str, str] = {
-        "Grupo6": "matches_Grupo6_enriched.json",
-        "Grupo7": "matches_Grupo7_enriched.json"
-    }
-    
-    for group, filename in FILES.items():
-        process_group(group, filename)
 
-async def main() -> None:
-    try:
-        await scrape_data()
-        calculate_elo()
-        logger.info("\n" + "="*60)
-        logger.info("✅ ALL COMPLETE: Data scraped and ELO calculated!")
-        logger.info("="*60)
-    except Exception as e:
-        logger.error(f"Fatal error: {e}")
-        raise
+    groups: Dict[str, Dict[str, Any]] = {}
+    for group, filename in ELO_FILES.items():
+        standings = load_json_file(os.path.join(OUT_DIR, f"standings_{group}.json")) or {}
+        groups[group] = {
+            "matches": load_json_file(os.path.join(OUT_DIR, filename)) or [],
+            "ranking": load_json_file(os.path.join(OUT_DIR, f"elo_{group}.json")) or [],
+            "history": load_json_file(os.path.join(OUT_DIR, f"elo_history_{group}.json")) or {},
+            "standings": [team for teams in standings.values() for team in teams]
+        }
+
+    db_path = os.path.join(OUT_DIR, DB_FILENAME)
+    counts = build_database(db_path, groups)
+    logger.info(f"✅ Database saved: {db_path} ({', '.join(f'{n} {table}' for table, n in counts.items())})")
+
+def publish_duels_tables() -> None:
+    for group, filename in ELO_FILES.items():
+        matches = load_json_file(os.path.join(OUT_DIR, filename)) or []
+        parquet_path = os.path.join(OUT_DIR, f"duels_{group}.parquet")
+        arrow_path = os.path.join(OUT_DIR, f"duels_{group}.arrow")
+        columns = duel_columns(matches)
+        if not write_duels_table(columns, parquet_path, arrow_path):
+            logger.warning("⚠️ pyarrow is not installed, skipping the duels tables")
+            return
+        logger.info(f"✅ Duels table saved: {parquet_path} ({len(columns['seq'])} duels)")
+
+def publish_snapshot() -> None:
+    manifest = publish_manifest(OUT_DIR)
+    logger.info(f"📌 Snapshot {manifest['snapshot_id']} published ({len(manifest['files'])} files, {manifest['created_at']})")
+
+def data_path(filename: str) -> str:
+    return os.path.join(OUT_DIR, filename)
+
+def build_pipeline() -> Pipeline:
+    groups = [group_slug(name) for name in COMPETITIONS.values()]
+    raw = [data_path(f"matches_{g}.json") for g in groups]
+    enriched = [data_path(ELO_FILES.get(g, f"matches_{g}_enriched.json")) for g in groups]
+    standings = [data_path(f"standings_{g}.json") for g in groups]
+    elo_names = groups + (["unified"] if ELO_MODE == "unified" else [])
+    rankings = [data_path(f"elo_{name}.json") for name in elo_names]
+    histories = [data_path(f"elo_history_{name}.json") for name in elo_names]
+    # Checkpoints written by rate_matches: one per group, or the single unified one
+    checkpoints = [data_path(f"elo_state_{name}.json") for name in (["unified"] if ELO_MODE == "unified" else list(ELO_FILES))]
+    historical = [os.path.join(os.path.dirname(__file__), f) for f in HISTORICAL_FILES]
+    database = data_path(DB_FILENAME)
+    duels = [data_path(f"duels_{g}.{ext}") for g in ELO_FILES for ext in ("parquet", "arrow")]
+
+    return Pipeline([
+        Stage("scrape", scrape_data,
+              outputs=raw + [HTML_DIR, STANDINGS_DIR]),
+        Stage("parse", parse_data,
+              inputs=raw + [HTML_DIR, STANDINGS_DIR],
+              outputs=enriched,
+              deps=["scrape"],
+              code=[parse_data, parse_competition, parse_acta_file, get_standings, quarantine_invalid,
+                    get_club_from_code_scraper, annotate_sides, validation],
+              params={"competitions": COMPETITIONS, "target_groups": TARGET_GROUPS}),
+        Stage("elo", calculate_elo,
+              inputs=enriched + (historical if ELO_MODE == "unified" and ELO_INCLUDE_HISTORICAL else []),
+              outputs=rankings + histories + checkpoints,
+              deps=["parse"],
+              code=[calculate_elo, process_group, process_unified, rate_matches, save_history, save_ranking,
+                    load_group_matches, load_historical_records, elo_engine, duel_log],
+              params={"files": ELO_FILES, "mode": ELO_MODE, "historical": ELO_INCLUDE_HISTORICAL}),
+        Stage("database", publish_database,
+              inputs=enriched + standings + rankings + histories,
+              outputs=[database],
+              deps=["elo"],
+              code=[publish_database, analytics_db]),
+        Stage("duels", publish_duels_tables,
+              inputs=enriched,
+              outputs=duels,
+              deps=["parse"],
+              code=[publish_duels_tables, duels_table, duel_log]),
+        Stage("manifest", publish_snapshot,
+              inputs=raw + enriched + standings + rankings + histories + [database] + duels,
+              outputs=[data_path(MANIFEST_FILENAME)],
+              deps=["database", "duels"],
+              code=[publish_snapshot, snapshot])
+    ], data_path(STATE_FILENAME))
+
+def main() -> None:
+    pipeline = build_pipeline()
+    parser = argparse.ArgumentParser(description="Scrape FATM data and rebuild the derived files, skipping stages whose inputs are unchanged")
+    parser.add_argument("stages", nargs="*", metavar="STAGE",
+                        help=f"stages to run with their dependencies ({', '.join(pipeline.stages)}); all by default")
+    parser.add_argument("--force", action="append", default=[], choices=["all"] + list(pipeline.stages),
+                        help="run this stage even when it is up to date (repeatable, 'all' forces every stage)")
+    parser.add_argument("--workers", type=int, default=4, help="stages run in parallel when the graph allows")
+    args = parser.parse_args()
+    unknown = [name for name in args.stages if name not in pipeline.stages]
+    if unknown:
+        parser.error(f"unknown stage {', '.join(unknown)}")
+
+    status = pipeline.run(args.stages, force=args.force, workers=args.workers)
+    logger.info("\n" + "="*60)
+    logger.info("  ".join(f"{name}: {result}" for name, result in status.items()))
+    if any(result in ("failed", "blocked") for result in status.values()):
+        logger.error("❌ Pipeline finished with errors")
+        sys.exit(1)
+    logger.info("✅ ALL COMPLETE: Data scraped and ELO calculated!")
+    logger.info("="*60)
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    main()
@@ -0,0 +1,106 @@
+import hashlib
+import json
+import os
+import sqlite3
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+import json_codec
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+MANIFEST_FILENAME = "manifest.json"
+MANIFEST_VERSION = 1
+SNAPSHOT_EXTENSIONS = (".json", ".jsonl", ".gz", ".zst", ".db", ".parquet", ".arrow")
+# Pipeline artifacts the app never reads: Elo checkpoints and parse quarantine reports
+INTERNAL_PREFIXES = ("elo_state_", "quarantine_")
+
+def file_digest(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def row_count(path: str) -> Optional[int]:
+    """Number of records in a data file, or None when the format has no natural row count"""
+    try:
+        base = json_codec.strip_suffix(path)
+        if base.endswith(".json"):
+            data = json_codec.load(path)
+            if isinstance(data, list):
+                return len(data)
+            if isinstance(data, dict) and isinstance(data.get("columns"), dict):
+                return len(next(iter(data["columns"].values()), []))
+            if isinstance(data, dict) and data and all(isinstance(v, list) for v in data.values()):
+                return sum(len(v) for v in data.values())
+            return None
+        if base.endswith(".jsonl"):
+            return sum(1 for _ in json_codec.iter_lines(path))
+        if path.endswith(".db"):
+            conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+            try:
+                return conn.execute("SELECT COUNT(*) FROM games").fetchone()[0]
+            finally:
+                conn.close()
+        if path.endswith(".parquet") and pq is not None:
+            return pq.ParquetFile(path).metadata.num_rows
+        if path.endswith(".arrow") and pa is not None:
+            with pa.memory_map(path, "r") as source:
+                reader = pa.ipc.open_file(source)
+                return sum(reader.get_batch(i).num_rows for i in range(reader.num_record_batches))
+    except (OSError, ValueError, sqlite3.Error):
+        return None
+    return None
+
+def snapshot_files(data_dir: str) -> List[str]:
+    """The published data files of data_dir, without the manifest, hidden files and internal artifacts"""
+    return sorted(
+        name for name in os.listdir(data_dir)
+        if name.endswith(SNAPSHOT_EXTENSIONS) and name != MANIFEST_FILENAME and not name.startswith(".")
+        and not name.startswith(INTERNAL_PREFIXES) and os.path.isfile(os.path.join(data_dir, name))
+    )
+
+def load_manifest(data_dir: str) -> Optional[Dict[str, Any]]:
+    try:
+        return json_codec.load(os.path.join(data_dir, MANIFEST_FILENAME))
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+def publish_manifest(data_dir: str) -> Dict[str, Any]:
+    """Describe the published data files of data_dir in manifest.json, written last and atomically.
+
+    Only the manifest itself is replaced atomically: the data files are rewritten
+    in place by the earlier stages, so the manifest marks a consistent snapshot
+    once it is written but readers may see a mix of old and new files while a
+    run is in progress. The snapshot id is derived from the file hashes only, so
+    a run that changes nothing keeps the previous id and timestamp and the
+    manifest is unchanged.
+    """
+    files: Dict[str, Dict[str, Any]] = {}
+    for name in snapshot_files(data_dir):
+        path = os.path.join(data_dir, name)
+        files[name] = {"sha256": file_digest(path), "bytes": os.path.getsize(path), "rows": row_count(path)}
+
+    snapshot_id = hashlib.sha256(
+        "".join(f"{name}:{entry['sha256']}\n" for name, entry in files.items()).encode("utf-8")
+    ).hexdigest()[:16]
+
+    previous = load_manifest(data_dir) or {}
+    if previous.get("snapshot_id") == snapshot_id:
+        return previous
+
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "snapshot_id": snapshot_id,
+        "previous_snapshot_id": previous.get("snapshot_id"),
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "files": files
+    }
+    json_codec.dump(manifest, os.path.join(data_dir, MANIFEST_FILENAME), pretty=True, compression="")
+    return manifest
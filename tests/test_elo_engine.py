@@ -0,0 +1,137 @@
+import random
+from collections import defaultdict
+from typing import Any, DefaultDict, Dict, List, Tuple
+
+import pytest
+
+import elo_engine
+from elo_engine import (INITIAL_ELO, EloEngine, annotate_sides, compute_result, get_club_from_code_elo, is_valid_player,
+                        update_elo)
+
+PLAYERS = [f"PLAYER {i:02d}" for i in range(24)] + ["DOBLE A-B", "ABC"]
+CLUBS = [f"CLUB {i}" for i in range(6)]
+
+def fixed_matches(count: int = 80, seed: int = 7, annotated: bool = True) -> List[Dict[str, Any]]:
+    """A reproducible season of best-of-5 duels, some without set scores or with a doubles pair.
+
+    Games only carry their side codes, and the ABC side is the home or the away
+    team depending on the match score. annotated=True stores the resolved sides
+    and per-game teams as the parse stage does; without it the engine has to
+    resolve the teams from the codes, as for older enriched files.
+    """
+    rng = random.Random(seed)
+    matches = []
+    for match_id in range(count):
+        home_team, away_team = rng.sample(CLUBS, 2)
+        games = []
+        abc_wins = xyz_wins = 0
+        for _ in range(rng.randint(3, 7)):
+            home, away = rng.sample(PLAYERS, 2)
+            home_score, away_score = rng.choice([(3, 0), (3, 1), (3, 2), (0, 3), (1, 3), (2, 3), (0, 0)])
+            abc_wins += home_score > away_score
+            xyz_wins += away_score > home_score
+            home_sets, away_sets = [], []
+            if rng.random() < 0.8:
+                home_won = [True] * home_score + [False] * away_score
+                rng.shuffle(home_won)
+                for won in home_won + [None] * (5 - len(home_won)):
+                    loser = rng.randint(0, 12)
+                    winner = max(11, loser + 2)
+                    home_sets.append(0 if won is None else winner if won else loser)
+                    away_sets.append(0 if won is None else loser if won else winner)
+            games.append({
+                "home_code": rng.choice(["A", "B", "C"]),
+                "away_code": rng.choice(["X", "Y", "Z"]),
+                "home_player": home,
+                "away_player": away,
+                "home_score": home_score,
+                "away_score": away_score,
+                "home_sets": home_sets,
+                "away_sets": away_sets
+            })
+        score_home, score_away = (abc_wins, xyz_wins) if rng.random() < 0.5 else (xyz_wins, abc_wins)
+        match = {"match_id": str(match_id), "date": None, "home_team": home_team, "away_team": away_team,
+                 "score_home": score_home, "score_away": score_away, "games": games}
+        if annotated:
+            annotate_sides(match)
+        matches.append(match)
+    return matches
+
+def scalar_ratings(matches: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[Tuple[str, int, int]]]:
+    """The per-duel loop of process_group that the engine replaced: its ranking, and each Elo update"""
+    scores: Dict[str, int] = defaultdict(lambda: INITIAL_ELO)
+    club_counts: DefaultDict[str, DefaultDict[str, int]] = defaultdict(lambda: defaultdict(int))
+    player_stats: DefaultDict[str, Dict[str, int]] = defaultdict(lambda: {"matches": 0, "wins": 0})
+    match_count: Dict[str, int] = defaultdict(int)
+    history: List[Tuple[str, int, int]] = []
+    for match in matches:
+        for duel in match["games"]:
+            h = duel["home_player"].strip()
+            a = duel["away_player"].strip()
+            if not is_valid_player(h) or not is_valid_player(a):
+                continue
+            hs, as_ = duel["home_score"], duel["away_score"]
+            club_counts[h][get_club_from_code_elo(duel["home_code"].strip(), match)] += 1
+            club_counts[a][get_club_from_code_elo(duel["away_code"].strip(), match)] += 1
+            player_stats[h]["matches"] += 1
+            player_stats[a]["matches"] += 1
+            match_count[h] += 1
+            match_count[a] += 1
+            if hs > as_:
+                player_stats[h]["wins"] += 1
+            elif as_ > hs:
+                player_stats[a]["wins"] += 1
+            result_home = compute_result(hs, as_, duel["home_sets"], duel["away_sets"])
+            result_away = compute_result(as_, hs, duel["away_sets"], duel["home_sets"])
+            for player, opponent, result, score, opp_score in ((h, a, result_home, hs, as_), (a, h, result_away, as_, hs)):
+                before = scores[player]
+                update_elo(scores, player, opponent, result, score, opp_score, match_count)
+                history.append((player, before, scores[player]))
+
+    ranking = [
+        {
+            "player": player,
+            "elo": score,
+            "club": max(club_counts[player].items(), key=lambda x: x[1])[0],
+            "matches": player_stats[player]["matches"],
+            "wins": player_stats[player]["wins"],
+            "win_rate": round(player_stats[player]["wins"] / player_stats[player]["matches"] * 100, 1)
+        }
+        for player, score in sorted(scores.items(), key=lambda x: x[1], reverse=True)
+    ]
+    return ranking, history
+
+@pytest.fixture(params=["python", "numba"])
+def rate_path(request, monkeypatch):
+    if request.param == "python":
+        monkeypatch.setattr(elo_engine, "_rate_duels_compiled", None)
+    else:
+        pytest.importorskip("numba")
+        assert elo_engine._rate_duels_compiled is not None
+    return request.param
+
+@pytest.fixture(params=[True, False], ids=["annotated", "codes_only"])
+def matches(request):
+    return fixed_matches(annotated=request.param)
+
+def test_codes_only_fixture_has_no_game_teams():
+    assert not any("home_team" in game for match in fixed_matches(annotated=False) for game in match["games"])
+
+def test_engine_matches_scalar_loop(rate_path, matches):
+    ranking, scalar_history = scalar_ratings(matches)
+
+    engine = EloEngine()
+    history = engine.apply_matches(matches)
+
+    assert engine.ranking() == ranking
+    assert list(zip([engine.players[idx] for idx in history["player"]], history["elo_before"], history["elo_after"])) == scalar_history
+
+def test_engine_resumed_in_chunks_matches_scalar_loop(rate_path, matches):
+    ranking, _ = scalar_ratings(matches)
+
+    engine = EloEngine()
+    engine.apply_matches(matches[:30])
+    engine = EloEngine.from_state(engine.state())
+    engine.apply_matches(matches[30:])
+
+    assert engine.ranking() == ranking
@@ -0,0 +1,28 @@
+import json_codec
+from player_history import HistoryWriter, iter_history, rebuild_path
+
+def record(player_id, match_id, result="won"):
+    return {"player_id": player_id, "match_id": match_id, "result": result}
+
+def test_append_skips_records_already_written(tmp_path):
+    path = str(tmp_path / "history.jsonl")
+    json_codec.append_lines([record("p1", "m1")], path)
+
+    history = HistoryWriter(path)
+    assert history.add("p1", [record("p1", "m1"), record("p1", "m2")]) == 1
+    history.commit()
+
+    assert [r["match_id"] for r in iter_history(path)] == ["m1", "m2"]
+
+def test_rebuild_replaces_records_and_keeps_unavailable_players(tmp_path):
+    path = str(tmp_path / "history.jsonl")
+    json_codec.append_lines([record("p1", "m1", "lost"), record("p2", "m2"), record("p3", "m3")], path)
+
+    history = HistoryWriter(path, rebuild=True)
+    assert history.add("p1", [record("p1", "m1", "won")]) == 1
+    assert history.keep_previous("p2") == 1
+    history.commit()
+
+    # p1 is reparsed, p2's profile was not cached and p3 is no longer on a roster
+    assert list(iter_history(path)) == [record("p1", "m1", "won"), record("p2", "m2"), record("p3", "m3")]
+    assert not (tmp_path / rebuild_path("history.jsonl")).exists()
@@ -0,0 +1,32 @@
+from validation import validate_matches
+
+def game(home_score, away_score, home_code="A", away_code="Y"):
+    sets = {3: [11, 11, 11, 0, 0], 0: [5, 5, 5, 0, 0]}
+    return {"home_code": home_code, "away_code": away_code, "home_player": "P1", "away_player": "P2",
+            "home_score": home_score, "away_score": away_score,
+            "home_sets": sets[home_score], "away_sets": sets[away_score]}
+
+def match(match_id, games, score_home, score_away):
+    return {"match_id": match_id, "home_team": "H", "away_team": "A",
+            "score_home": score_home, "score_away": score_away, "games": games}
+
+DOUBLE = game(0, 0, "ABC", "XYZ")
+DOUBLE["home_sets"] = DOUBLE["away_sets"] = []
+
+def quarantined(matches):
+    _, report = validate_matches(matches)
+    return [entry["match_id"] for entry in report["quarantined_matches"]]
+
+def test_complete_and_early_finished_actas_are_valid():
+    assert quarantined([
+        match("full", [game(3, 0)] * 4 + [game(0, 3)] * 2 + [DOUBLE], 4, 2),
+        match("early", [game(3, 0)] * 4 + [game(0, 3)] + [DOUBLE], 4, 1),
+        match("short_format", [DOUBLE, game(3, 0), game(3, 0), game(0, 3)], 2, 1)
+    ]) == []
+
+def test_truncated_actas_are_quarantined():
+    # 3-2 is not a finished 7-game match, so the missing games were lost by the parser
+    assert quarantined([
+        match("truncated", [game(3, 0)] * 3 + [game(0, 3)] * 2 + [DOUBLE], 3, 2),
+        match("too_long", [game(3, 0)] * 4 + [game(0, 3)] * 3 + [DOUBLE], 4, 3)
+    ]) == ["truncated", "too_long"]
@@ -1,5 +1,10 @@
 echo Lancement du script Python...
 python script-BDD.py
+if errorlevel 1 (
+    echo Echec du script, rien n'est publie.
+    pause
+    exit /b 1
+)
 
 echo.
 echo Ajout des fichiers du dossier data...
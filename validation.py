@@ -0,0 +1,156 @@
+from typing import Any, Callable, Dict, List, Tuple
+
+ABC_CODES: set = {"A", "B", "C", "ABC"}
+XYZ_CODES: set = {"X", "Y", "Z", "XYZ"}
+
+MAX_SETS: int = 5
+SETS_TO_WIN: int = 3
+MAX_GAMES: int = 7
+# Games listed in a complete acta -> wins that decide the match. The 7-game format
+# (six singles and the double) stops once a side reaches 4 wins, and the rest of
+# the acta is not listed; the 4-game format (three singles and the double) at 2.
+MATCH_FORMATS: Dict[int, int] = {MAX_GAMES: 4, 4: 2}
+
+MATCH_SCHEMA: Dict[str, Tuple[type, ...]] = {
+    "match_id": (str, int),
+    "home_team": (str,),
+    "away_team": (str,),
+    "score_home": (int,),
+    "score_away": (int,),
+    "games": (list,)
+}
+
+GAME_SCHEMA: Dict[str, Tuple[type, ...]] = {
+    "home_code": (str,),
+    "away_code": (str,),
+    "home_player": (str,),
+    "away_player": (str,),
+    "home_score": (int,),
+    "away_score": (int,),
+    "home_sets": (list,),
+    "away_sets": (list,)
+}
+
+def compile_schema(schema: Dict[str, Tuple[type, ...]]) -> Callable[[Dict[str, Any]], List[str]]:
+    """Turn a field -> types mapping into a single checking function, built once per schema"""
+    fields = tuple((field, types, bool in types) for field, types in schema.items())
+
+    def check(record: Dict[str, Any]) -> List[str]:
+        errors = []
+        for field, types, allows_bool in fields:
+            if field not in record:
+                errors.append(f"missing {field}")
+                continue
+            value = record[field]
+            if not isinstance(value, types) or (isinstance(value, bool) and not allows_bool):
+                errors.append(f"{field} is {type(value).__name__}")
+        return errors
+
+    return check
+
+check_match_fields = compile_schema(MATCH_SCHEMA)
+check_game_fields = compile_schema(GAME_SCHEMA)
+
+VALID_SCORES: set = {(0, 0)} | {(SETS_TO_WIN, lost) for lost in range(SETS_TO_WIN)} | {(lost, SETS_TO_WIN) for lost in range(SETS_TO_WIN)}
+
+def check_game(game: Dict[str, Any]) -> List[str]:
+    errors = check_game_fields(game)
+    if errors:
+        return errors
+
+    if game["home_code"] not in ABC_CODES:
+        errors.append(f"unknown home code {game['home_code']!r}")
+    if game["away_code"] not in XYZ_CODES:
+        errors.append(f"unknown away code {game['away_code']!r}")
+
+    score = (game["home_score"], game["away_score"])
+    if score not in VALID_SCORES:
+        errors.append(f"score {score[0]}-{score[1]} is not a best-of-{MAX_SETS} result")
+
+    h_sets = game["home_sets"]
+    a_sets = game["away_sets"]
+    if len(h_sets) != len(a_sets) or len(h_sets) not in (0, MAX_SETS):
+        errors.append(f"{len(h_sets)}/{len(a_sets)} sets instead of {MAX_SETS}/{MAX_SETS}")
+    elif h_sets:
+        home_won = sum(1 for h, a in zip(h_sets, a_sets) if (h or a) and h > a)
+        away_won = sum(1 for h, a in zip(h_sets, a_sets) if (h or a) and a > h)
+        if (home_won, away_won) != score:
+            errors.append(f"sets give {home_won}-{away_won} but the score is {score[0]}-{score[1]}")
+    return errors
+
+def fits_format(game_count: int, score_home: int, score_away: int) -> bool:
+    """Whether an acta with game_count games is complete for a match that ended score_home-score_away.
+
+    Fewer games than the format are only valid when the match stopped early,
+    i.e. the winner has exactly the wins that decide it; otherwise the acta was
+    truncated. Every game counted in the score must be listed in any case.
+    """
+    if game_count < score_home + score_away:
+        return False
+    for size, to_win in MATCH_FORMATS.items():
+        if game_count == size:
+            return True
+        if game_count < size and max(score_home, score_away) == to_win and min(score_home, score_away) < to_win:
+            return True
+    return False
+
+def check_match(match: Dict[str, Any]) -> List[str]:
+    """Match-level errors of an enriched match whose acta was parsed"""
+    errors = check_match_fields(match)
+    if errors:
+        return errors
+
+    games = match["games"]
+    if not fits_format(len(games), match["score_home"], match["score_away"]):
+        errors.append(f"{len(games)} games do not fit a {match['score_home']}-{match['score_away']} result "
+                      f"(complete actas have {' or '.join(str(size) for size in MATCH_FORMATS)} games)")
+
+    scores = [(g.get("home_score"), g.get("away_score")) for g in games if isinstance(g, dict)]
+    scores = [(h, a) for h, a in scores if isinstance(h, int) and isinstance(a, int)]
+    home_wins = sum(1 for h, a in scores if h > a)
+    away_wins = sum(1 for h, a in scores if a > h)
+    if sorted((home_wins, away_wins)) != sorted((match["score_home"], match["score_away"])):
+        errors.append(f"games give {home_wins}-{away_wins} but the match score is {match['score_home']}-{match['score_away']}")
+    return errors
+
+def validate_matches(matches: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """Return the matches with invalid records removed, and the quarantine report.
+
+    A match-level error quarantines every game of the match, because the side
+    mapping and the score cannot be trusted. Otherwise only the invalid games
+    are removed. Matches without games (not played, or no acta) pass through.
+    """
+    clean: List[Dict[str, Any]] = []
+    quarantined_matches: List[Dict[str, Any]] = []
+    quarantined_games: List[Dict[str, Any]] = []
+    checked_games = 0
+
+    for match in matches:
+        games = match.get("games") or []
+        if not games:
+            clean.append(match)
+            continue
+
+        checked_games += len(games)
+        match_errors = check_match(match)
+        if match_errors:
+            quarantined_matches.append({"match_id": match.get("match_id"), "errors": match_errors, "match": match})
+            clean.append({**match, "games": []})
+            continue
+
+        kept = []
+        for game_index, game in enumerate(games):
+            game_errors = check_game(game)
+            if game_errors:
+                quarantined_games.append({"match_id": match.get("match_id"), "game_index": game_index, "errors": game_errors, "game": game})
+            else:
+                kept.append(game)
+        clean.append(match if len(kept) == len(games) else {**match, "games": kept})
+
+    report = {
+        "checked_matches": len(matches),
+        "checked_games": checked_games,
+        "quarantined_matches": quarantined_matches,
+        "quarantined_games": quarantined_games
+    }
+    return clean, report